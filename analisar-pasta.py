@@ -7,41 +7,128 @@ Inventário de pasta com codec, resolução, FPS, bitrate,
 duração, tamanho e estimativa de compressão H.265.
 """
 
+import argparse
 import sys
 from pathlib import Path
-from media_tools.video.analyzer import AnalisadorMidia
+from media_tools.video.analyzer import AnalisadorMidia, _formatar_duracao, _formatar_tamanho
+from media_tools.video.inventory import InventarioMidia
+from media_tools.video.history import HistoricoEncode
+from media_tools.common.paths import obter_diretorio_base
 from media_tools.common.validators import verificar_ffmpeg
 
 
+def _exibir_consulta(inventario: InventarioMidia, args) -> None:
+    """Consulta o inventário SQLite sem varrer a pasta."""
+    pasta = Path(args.pasta) if args.pasta else None
+
+    if args.codec or args.altura_min or args.bitrate_min:
+        resultados = inventario.consultar(
+            codec=args.codec,
+            altura_min=args.altura_min,
+            bitrate_min_kbps=args.bitrate_min,
+            pasta=pasta,
+        )
+        print(f"\n🔎 {len(resultados)} arquivo(s) no inventário")
+        print("-" * 110)
+        for info in resultados:
+            bitrate_str = f"{info['bitrate_kbps']}k" if info["bitrate_kbps"] else "?"
+            print(
+                f"{info['codec']:<7} {info['resolucao']:<11} {info['fps']:<5} "
+                f"{bitrate_str:<9} {_formatar_duracao(info['duracao_s']):<9} "
+                f"{_formatar_tamanho(info['tamanho_bytes']):<9} {info['caminho']}"
+            )
+        total = sum(i["tamanho_bytes"] for i in resultados)
+        print("-" * 110)
+        print(f"📦 Total: {_formatar_tamanho(total)}")
+
+    if args.economia:
+        economia = inventario.economia_por_preset(AnalisadorMidia.BITRATES_PRESET, pasta=pasta)
+        print("\n💡 Economia estimada por preset (H.265)")
+        print("-" * 60)
+        for preset, valores in economia.items():
+            original = valores["original_bytes"]
+            percentual = valores["economia_bytes"] / original * 100 if original else 0
+            print(
+                f"  {preset:<12} {_formatar_tamanho(original)} → "
+                f"~{_formatar_tamanho(valores['estimado_bytes'])} "
+                f"(-{_formatar_tamanho(valores['economia_bytes'])}, {percentual:.0f}%)"
+            )
+
+
 def main():
     """Função principal."""
-    if len(sys.argv) > 1 and sys.argv[1] in ("--help", "-h", "--ajuda"):
-        print("\n📊 Analisador de Pasta de Vídeos")
-        print("=" * 50)
-        print("\nExibe inventário técnico da pasta entrada/videos/")
-        print("com estimativa de tamanho pós-compressão H.265.")
-        print("\nUso:")
-        print("  python analisar-pasta.py              # analisa entrada/videos/")
-        print("  python analisar-pasta.py /pasta/path  # analisa pasta específica")
-        print("\nInformações exibidas por arquivo:")
-        print("  codec, resolução, FPS, bitrate, duração, tamanho")
-        print("  estimativa pós H.265 stream_720p")
-        print("  recomendação de preset/workflow")
-        sys.exit(0)
-
-    if not verificar_ffmpeg():
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description=(
+            "📊 Analisador de Pasta de Vídeos\n"
+            "Exibe inventário técnico da pasta entrada/videos/\n"
+            "com estimativa de tamanho pós-compressão H.265."
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+        epilog=(
+            "Exemplos:\n"
+            "  python analisar-pasta.py                       # analisa entrada/videos/\n"
+            "  python analisar-pasta.py /pasta/path           # analisa pasta específica\n"
+            "  python analisar-pasta.py --inventario          # re-varredura incremental (SQLite)\n"
+            "  python analisar-pasta.py --deep --inventario   # + GOP/B-frames/pico de bitrate\n"
+            "  python analisar-pasta.py --codec h264 --altura-min 1081 --bitrate-min 8000\n"
+            "  python analisar-pasta.py --economia            # economia por preset (do banco)"
+        ),
+    )
+    parser.add_argument("pasta", nargs="?", default=None, help="Pasta a analisar (padrão: entrada/videos/)")
+    parser.add_argument("--sem-subpastas", action="store_true", help="Ignora subpastas")
+    parser.add_argument(
+        "--inventario", nargs="?", const="", default=None, metavar="BANCO",
+        help="Usa inventário SQLite: só re-analisa arquivos alterados\n"
+             f"(padrão: {InventarioMidia.NOME_BANCO} na raiz do projeto)",
+    )
+    parser.add_argument(
+        "--deep", "--profundo", dest="profundo", action="store_true",
+        help="Lê os pacotes do vídeo: intervalo de keyframes, B-frames,\n"
+             "pico vs média de bitrate e irregularidades de timestamp",
+    )
+    parser.add_argument(
+        "--sem-historico", action="store_true",
+        help="Ignora o histórico de encodes e usa os bitrates fixos por preset",
+    )
+    consulta = parser.add_argument_group("consultas ao inventário (sem varrer a pasta)")
+    consulta.add_argument("--codec", help="Filtra por codec de vídeo (ex: h264, hevc)")
+    consulta.add_argument("--altura-min", type=int, help="Altura mínima em pixels (ex: 1081 = acima de 1080p)")
+    consulta.add_argument("--bitrate-min", type=int, help="Bitrate total mínimo em kbps")
+    consulta.add_argument("--economia", action="store_true", help="Economia total estimada por preset")
+    args = parser.parse_args()
 
-    # Pasta opcional via argumento
     pasta = None
-    if len(sys.argv) > 1 and not sys.argv[1].startswith("--"):
-        pasta = Path(sys.argv[1])
+    if args.pasta:
+        pasta = Path(args.pasta)
         if not pasta.exists():
             print(f"❌ Pasta não encontrada: {pasta}")
             sys.exit(1)
 
+    consultando = args.codec or args.altura_min or args.bitrate_min or args.economia
+    inventario = None
+    historico = None
+    if args.inventario is not None or consultando:
+        inventario = InventarioMidia(Path(args.inventario) if args.inventario else None)
+
     try:
-        analisador = AnalisadorMidia(pasta=pasta)
+        if consultando:
+            _exibir_consulta(inventario, args)
+            return
+
+        if not verificar_ffmpeg():
+            sys.exit(1)
+
+        # Histórico só existe depois do primeiro encode do CompressorVideo
+        if not args.sem_historico and (obter_diretorio_base() / HistoricoEncode.NOME_BANCO).exists():
+            historico = HistoricoEncode()
+
+        analisador = AnalisadorMidia(
+            pasta=pasta,
+            recursivo=not args.sem_subpastas,
+            inventario=inventario,
+            historico=historico,
+            profundo=args.profundo,
+        )
         analisador.processar()
     except KeyboardInterrupt:
         print("\n\n⚠️  Processo interrompido pelo usuário (Ctrl+C)")
@@ -49,6 +136,11 @@ def main():
     except Exception as e:
         print(f"\n❌ Erro inesperado: {e}")
         sys.exit(1)
+    finally:
+        if inventario is not None:
+            inventario.fechar()
+        if historico is not None:
+            historico.fechar()
 
 
 if __name__ == "__main__":
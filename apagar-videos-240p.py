@@ -2,35 +2,63 @@
 Move para a lixeira todos os vídeos com resolução ≤ 240p
 em entrada/videos e saida/videos.
 
+A resolução vem do cabeçalho do contêiner (MP4/MOV e MKV/WebM lidos
+direto, demais formatos via ffprobe), com vários arquivos em paralelo.
+
 Uso:
-  python apagar-videos-240p.py           # prévia (dry-run)
-  python apagar-videos-240p.py --apagar  # move para lixeira
+  python apagar-videos-240p.py                     # prévia (dry-run)
+  python apagar-videos-240p.py --apagar            # move para lixeira
+  python apagar-videos-240p.py --limite 360        # lado curto ≤ 360
+  python apagar-videos-240p.py --codec mpeg4 h264  # só esses codecs
+  python apagar-videos-240p.py --duracao-max 60    # só vídeos de até 60 s
 """
 
 import argparse
+import os
 from pathlib import Path
+from typing import Dict, Optional
 
-import cv2
 from send2trash import send2trash
 
+from media_tools.common.scanner import mapear_paralelo, percorrer_arquivos
+from media_tools.video.header_probe import ler_info_cabecalho
+
 EXTENSOES = {".mp4", ".m4v", ".mov", ".webm", ".mkv", ".avi"}
 RESOLUCAO_MAX = 240  # lado curto ≤ 240 → 240p
 
+# Leitura de cabeçalho é só I/O: threads bem acima do número de cores
+WORKERS_PADRAO = min(32, (os.cpu_count() or 2) * 4)
+
 
-def obter_resolucao(arquivo: Path):
-    try:
-        cap = cv2.VideoCapture(str(arquivo))
-        w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        cap.release()
-        return w, h
-    except Exception:
-        return 0, 0
+def eh_candidato(info: Optional[Dict], args: argparse.Namespace) -> bool:
+    """Aplica as regras de limite, codec e duração a um cabeçalho lido."""
+    if not info or not info["largura"] or not info["altura"]:
+        return False
+    if min(info["largura"], info["altura"]) > args.limite:
+        return False
+    if args.codec and (info["codec"] or "").lower() not in args.codec:
+        return False
+    duracao = info["duracao"]
+    if args.duracao_max is not None and (duracao is None or duracao > args.duracao_max):
+        return False
+    if args.duracao_min is not None and (duracao is None or duracao < args.duracao_min):
+        return False
+    return True
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--apagar", action="store_true", help="Move para lixeira (sem flag = dry-run)")
+    parser.add_argument("--limite", type=int, default=RESOLUCAO_MAX,
+                        help=f"Lado curto máximo em pixels (padrão {RESOLUCAO_MAX})")
+    parser.add_argument("--codec", nargs="+", type=str.lower,
+                        help="Só vídeos com esses codecs (nomes do ffprobe: h264, hevc, mpeg4...)")
+    parser.add_argument("--duracao-max", type=float, help="Só vídeos com até N segundos")
+    parser.add_argument("--duracao-min", type=float, help="Só vídeos com pelo menos N segundos")
+    parser.add_argument("--workers", type=int, default=WORKERS_PADRAO,
+                        help=f"Arquivos lidos em paralelo (padrão {WORKERS_PADRAO})")
+    parser.add_argument("--sem-ffprobe", action="store_true",
+                        help="Não recorre ao ffprobe (AVI e cabeçalhos atípicos ficam de fora)")
     args = parser.parse_args()
 
     raiz = Path(__file__).parent
@@ -38,28 +66,39 @@ def main():
 
     todos = []
     for pasta in pastas:
-        if not pasta.exists():
-            continue
-        todos += [f for f in pasta.rglob("*") if f.suffix.lower() in EXTENSOES]
+        if pasta.exists():
+            todos.extend(percorrer_arquivos(pasta, EXTENSOES))
 
     total = len(todos)
     candidatos = []
+    ilegiveis = 0
 
-    for i, arquivo in enumerate(todos, 1):
-        print(f"\r  Verificando {i}/{total}...", end="", flush=True)
-        w, h = obter_resolucao(arquivo)
-        lado_curto = min(w, h) if w and h else 0
-        if lado_curto and lado_curto <= RESOLUCAO_MAX:
+    def _ler(arquivo: Path) -> Optional[Dict]:
+        return ler_info_cabecalho(arquivo, usar_ffprobe=not args.sem_ffprobe)
+
+    for i, (arquivo, info) in enumerate(mapear_paralelo(_ler, todos, args.workers), 1):
+        if info is None:
+            ilegiveis += 1
+        elif eh_candidato(info, args):
+            w, h = info["largura"], info["altura"]
             candidatos.append((arquivo, w, h))
-            print(f"\r  🎯 {w}x{h}  {arquivo.name:<60}")
+            print(f"\r  🎯 {w}x{h}  {info['codec'] or '?':<6} {arquivo.name:<60}")
+        if i % 100 == 0 or i == total:
+            print(f"\r  Verificando {i}/{total}...", end="", flush=True)
 
     print(f"\r{'':80}")  # limpa linha do contador
 
+    if ilegiveis:
+        print(f"⚠️  {ilegiveis} arquivo(s) sem cabeçalho legível foram ignorados.")
+
     if not candidatos:
-        print("Nenhum vídeo ≤ 240p encontrado.")
+        print(f"Nenhum vídeo ≤ {args.limite}p encontrado.")
         return
 
-    print(f"\n{'[DRY-RUN] ' if not args.apagar else ''}Total: {len(candidatos)} vídeos ≤ 240p\n")
+    # Saída estável: a verificação paralela termina fora de ordem
+    candidatos.sort(key=lambda c: str(c[0]))
+
+    print(f"\n{'[DRY-RUN] ' if not args.apagar else ''}Total: {len(candidatos)} vídeos ≤ {args.limite}p\n")
 
     if not args.apagar:
         print("⚠️  Dry-run — nenhum arquivo movido. Use --apagar para mover para a lixeira.")
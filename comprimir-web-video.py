@@ -39,6 +39,14 @@ def main():
         "--keep", "-k", action="store_true",
         help="Manter os arquivos originais após a conversão",
     )
+    parser.add_argument(
+        "--abr", action="store_true",
+        help="Gera escada HLS (fMP4/CMAF + master.m3u8) com degraus escolhidos pela resolução",
+    )
+    parser.add_argument(
+        "--segmento", type=int, default=6,
+        help="Duração dos segmentos HLS em segundos (modo --abr). Padrão: 6",
+    )
 
     args = parser.parse_args()
 
@@ -54,6 +62,8 @@ def main():
         crf=args.crf,
         preset=args.preset,
         audio_bitrate=args.audio_bitrate,
+        abr=args.abr,
+        segmento_s=args.segmento,
     )
 
     resultado = compressor.processar(deletar_originais=not args.keep)
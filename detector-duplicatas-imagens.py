@@ -3,11 +3,16 @@
 """
 Detector de Duplicatas de Imagens
 ==================================
-Encontra imagens duplicadas usando hash MD5.
+Encontra imagens duplicadas por tamanho + hashes em estágios (BLAKE2).
+Com --perceptual, também cópias redimensionadas, recomprimidas ou convertidas.
+Com --biblioteca, checa as imagens novas contra o índice persistente
+da biblioteca (montado com --indexar).
 """
 
 import sys
 import os
+from pathlib import Path
+from media_tools.common.library_index import IndiceBiblioteca
 from media_tools.image.duplicate_detector import DetectorDuplicatasImagens
 
 
@@ -16,20 +21,58 @@ def main():
     # Verifica se deve remover automaticamente
     remover = os.getenv("REMOVER_DUPLICATAS", "false").lower() == "true"
 
-    if len(sys.argv) > 1 and sys.argv[1] in ["--remover", "-r"]:
+    args = sys.argv[1:]
+    if "--remover" in args or "-r" in args:
         remover = True
 
+    # Leitores por disco — fotos são pequenas, a latência domina (NAS: 8+)
+    leitores = int(os.getenv("LEITORES_POR_DISCO", "4") or 4)
+
+    # Mesma imagem em outra resolução/formato (pHash + dHash)
+    perceptual = "--perceptual" in args or "-p" in args
+
+    # Índice da biblioteca: --indexar [PASTA], --biblioteca, --compactar
+    indexar = "--indexar" in args
+    pasta_biblioteca = None
+    if indexar:
+        posicao = args.index("--indexar")
+        if posicao + 1 < len(args) and not args[posicao + 1].startswith("-"):
+            pasta_biblioteca = Path(args[posicao + 1])
+    biblioteca = "--biblioteca" in args or "-b" in args
+    compactar = "--compactar" in args
+
+    indice = None
     try:
-        detector = DetectorDuplicatasImagens(remover_automaticamente=remover)
-        detector.processar()
+        detector = DetectorDuplicatasImagens(
+            remover_automaticamente=remover,
+            perceptual=perceptual,
+            leitores_por_dispositivo=leitores,
+        )
+        if not (indexar or biblioteca or compactar):
+            detector.processar()
+            return
+
+        indice = IndiceBiblioteca()
+        if indexar:
+            detector.indexar_biblioteca(indice, pasta_biblioteca)
+        if compactar:
+            resultado = indice.compactar()
+            print(
+                f"🧹 Índice compactado: {resultado['ausentes']} item(ns) ausente(s) removido(s), "
+                f"{resultado['bytes_antes'] / 1024 / 1024:.1f} MB → {resultado['bytes_depois'] / 1024 / 1024:.1f} MB"
+            )
+        if biblioteca:
+            detector.comparar_com_biblioteca(indice)
     except KeyboardInterrupt:
         print("\n\n⚠️  Processo interrompido pelo usuário (Ctrl+C)")
         sys.exit(130)
     except Exception as e:
         print(f"\n❌ Erro inesperado: {e}")
         sys.exit(1)
+    finally:
+        if indice is not None:
+            indice.fechar()
 
 
 if __name__ == "__main__":
     main()
-
@@ -3,12 +3,20 @@
 """
 Detector de Duplicatas de Vídeos
 =================================
-Encontra vídeos duplicados usando hash MD5 (amostra).
+Encontra vídeos duplicados por tamanho + hashes em estágios (BLAKE2).
+Com --perceptual, encontra também re-encodes, downscales e cortes;
+com --audio, vídeos que compartilham a faixa de áudio.
+Com --biblioteca, checa os vídeos novos contra o índice persistente
+da biblioteca (montado com --indexar).
 """
 
 import sys
 import os
+from pathlib import Path
+from media_tools.common.library_index import IndiceBiblioteca
 from media_tools.video.duplicate_detector import DetectorDuplicatasVideos
+from media_tools.video.perceptual_detector import DetectorDuplicatasPerceptuais
+from media_tools.video.audio_detector import DetectorDuplicatasAudio
 
 
 def main():
@@ -16,11 +24,63 @@ def main():
     # Verifica se deve remover automaticamente
     remover = os.getenv("REMOVER_DUPLICATAS", "false").lower() == "true"
 
-    if len(sys.argv) > 1 and sys.argv[1] in ["--remover", "-r"]:
+    args = sys.argv[1:]
+    if "--remover" in args or "-r" in args:
         remover = True
 
+    # Confirmação byte a byte (BLAKE2 do arquivo inteiro)
+    completo = "--completo" in args or "-c" in args
+
+    # Mesmo conteúdo com encode/resolução diferentes (assinatura de keyframes)
+    perceptual = "--perceptual" in args or "-p" in args
+
+    # Mesmo áudio com imagem diferente (marca d'água, crop, letterbox) — só reporta
+    audio = "--audio" in args or "-a" in args
+
+    # Índice da biblioteca: --indexar [PASTA], --biblioteca, --compactar
+    indexar = "--indexar" in args
+    pasta_biblioteca = None
+    if indexar:
+        posicao = args.index("--indexar")
+        if posicao + 1 < len(args) and not args[posicao + 1].startswith("-"):
+            pasta_biblioteca = Path(args[posicao + 1])
+    biblioteca = "--biblioteca" in args or "-b" in args
+    compactar = "--compactar" in args
+
+    # Leitores por disco — 1 preserva leitura sequencial em HDD
+    leitores = int(os.getenv("LEITORES_POR_DISCO", "1") or 1)
+
+    indice = None
     try:
-        detector = DetectorDuplicatasVideos(remover_automaticamente=remover)
+        if indexar or biblioteca or compactar:
+            detector = DetectorDuplicatasVideos(
+                remover_automaticamente=remover, confirmar_completo=completo
+            )
+            indice = IndiceBiblioteca()
+            if indexar:
+                detector.indexar_biblioteca(indice, pasta_biblioteca)
+            if compactar:
+                resultado = indice.compactar()
+                print(
+                    f"🧹 Índice compactado: {resultado['ausentes']} item(ns) ausente(s) removido(s), "
+                    f"{resultado['bytes_antes'] / 1024 / 1024:.1f} MB → {resultado['bytes_depois'] / 1024 / 1024:.1f} MB"
+                )
+            if biblioteca:
+                detector.comparar_com_biblioteca(indice)
+            return
+
+        if perceptual:
+            DetectorDuplicatasPerceptuais(remover_automaticamente=remover).processar()
+        if audio:
+            DetectorDuplicatasAudio().processar()
+        if perceptual or audio:
+            return
+
+        detector = DetectorDuplicatasVideos(
+            remover_automaticamente=remover,
+            confirmar_completo=completo,
+            leitores_por_dispositivo=leitores,
+        )
         detector.processar()
     except KeyboardInterrupt:
         print("\n\n⚠️  Processo interrompido pelo usuário (Ctrl+C)")
@@ -28,6 +88,9 @@ def main():
     except Exception as e:
         print(f"\n❌ Erro inesperado: {e}")
         sys.exit(1)
+    finally:
+        if indice is not None:
+            indice.fechar()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,35 @@
+"""
+Agrupamento de pares "parecidos" em grupos conectados (union-find).
+"""
+
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+
+def agrupar_conectados(pares: Iterable[Tuple[Hashable, Hashable]]) -> List[List[Hashable]]:
+    """
+    Une pares em componentes conectados: (a, b) e (b, c) → [a, b, c].
+
+    Usa union-find com compressão de caminho — linear no número de pares,
+    sem montar o grafo.
+
+    Returns:
+        Lista de grupos (cada um com 2+ itens).
+    """
+    pai: Dict[Hashable, Hashable] = {}
+
+    def raiz(item: Hashable) -> Hashable:
+        pai.setdefault(item, item)
+        while pai[item] != item:
+            pai[item] = pai[pai[item]]
+            item = pai[item]
+        return item
+
+    for a, b in pares:
+        raiz_a, raiz_b = raiz(a), raiz(b)
+        if raiz_a != raiz_b:
+            pai[raiz_b] = raiz_a
+
+    grupos: Dict[Hashable, List[Hashable]] = {}
+    for item in pai:
+        grupos.setdefault(raiz(item), []).append(item)
+    return [grupo for grupo in grupos.values() if len(grupo) > 1]
@@ -0,0 +1,141 @@
+"""
+Distância de Hamming vetorizada entre hashes perceptuais de 64 bits.
+"""
+
+from itertools import combinations
+from typing import Tuple
+
+import numpy as np
+
+# Multi-index hashing: 4 pedaços de 16 bits
+PEDACOS = 4
+BITS_PEDACO = 64 // PEDACOS
+
+# Consultas por bloco em pares_proximos (limita a memória dos candidatos)
+BLOCO_CONSULTAS = 20000
+
+# Buckets de pedaço com mais hashes distintos que isso não são sondados
+# (pedaço genérico); o par ainda aparece por outro pedaço abaixo do limite
+MAX_BUCKET = 256
+
+# popcount de 0..255 para Hamming vetorizado sem depender de numpy 2
+_POPCOUNT_BYTE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount64(valores: np.ndarray) -> np.ndarray:
+    """Número de bits ligados de cada uint64."""
+    bytes_ = np.ascontiguousarray(valores, dtype=np.uint64).view(np.uint8)
+    return _POPCOUNT_BYTE[bytes_].reshape(-1, 8).sum(axis=1)
+
+
+def distancia_hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Distância de Hamming elemento a elemento entre dois arrays uint64."""
+    return popcount64(np.bitwise_xor(a, b))
+
+
+def comparar_sequencias(
+    hashes_a: np.ndarray,
+    validos_a: np.ndarray,
+    hashes_b: np.ndarray,
+    validos_b: np.ndarray,
+    deslocamento: int,
+    limiar: int,
+) -> Tuple[float, int]:
+    """
+    Compara duas sequências de hashes com b[j] alinhado a a[j + deslocamento].
+
+    Só entram posições válidas nas duas sequências.
+
+    Returns:
+        (fração de posições a ≤ limiar bits, posições válidas sobrepostas)
+    """
+    inicio_b = max(0, -deslocamento)
+    fim_b = min(len(hashes_b), len(hashes_a) - deslocamento)
+    if fim_b <= inicio_b:
+        return 0.0, 0
+
+    fatia_b = slice(inicio_b, fim_b)
+    fatia_a = slice(inicio_b + deslocamento, fim_b + deslocamento)
+    validos = validos_a[fatia_a] & validos_b[fatia_b]
+    sobrepostos = int(validos.sum())
+    if sobrepostos == 0:
+        return 0.0, 0
+
+    distancias = distancia_hamming(hashes_a[fatia_a][validos], hashes_b[fatia_b][validos])
+    return float((distancias <= limiar).mean()), sobrepostos
+
+
+def _pares_distintos(hashes: np.ndarray, raio: int) -> np.ndarray:
+    """
+    Pares (i, j), i < j, a no máximo `raio` bits entre hashes distintos.
+
+    Multi-index hashing: se dois hashes diferem em ≤ raio bits, algum dos
+    PEDACOS pedaços de 16 bits difere em ≤ raio // PEDACOS bits. Cada pedaço
+    é agrupado em buckets uma vez e as sondagens (pedaço XOR máscara) viram
+    consultas vetorizadas à tabela — nada de comparar todos contra todos.
+    """
+    total = len(hashes)
+    raio_pedaco = raio // PEDACOS
+    mascaras = [0] + [
+        sum(1 << bit for bit in bits)
+        for quantidade in range(1, raio_pedaco + 1)
+        for bits in combinations(range(BITS_PEDACO), quantidade)
+    ]
+
+    encontrados = []
+    for indice_pedaco in range(PEDACOS):
+        pedacos = (
+            (hashes >> np.uint64(indice_pedaco * BITS_PEDACO)) & np.uint64((1 << BITS_PEDACO) - 1)
+        ).astype(np.int64)
+        # Pedaço de 16 bits → tabela direta de buckets (início e tamanho)
+        ordem = np.argsort(pedacos, kind="stable")
+        tamanhos = np.bincount(pedacos, minlength=1 << BITS_PEDACO)
+        inicios = np.cumsum(tamanhos) - tamanhos
+        sondados = np.where(tamanhos > MAX_BUCKET, 0, tamanhos)
+
+        for inicio in range(0, total, BLOCO_CONSULTAS):
+            consultas = np.arange(inicio, min(inicio + BLOCO_CONSULTAS, total))
+            for mascara in mascaras:
+                alvos = pedacos[consultas] ^ mascara
+                esquerda = inicios[alvos]
+                contagem = sondados[alvos]
+                if not contagem.any():
+                    continue
+                # Expande cada faixa [esquerda, direita) sem laço Python
+                deslocamento = np.arange(contagem.sum()) - np.repeat(np.cumsum(contagem) - contagem, contagem)
+                i = np.repeat(consultas, contagem)
+                j = ordem[np.repeat(esquerda, contagem) + deslocamento]
+                manter = i < j
+                i, j = i[manter], j[manter]
+                proximos = distancia_hamming(hashes[i], hashes[j]) <= raio
+                encontrados.append(np.stack([i[proximos], j[proximos]], axis=1))
+
+    if not encontrados:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(encontrados), axis=0)
+
+
+def pares_proximos(hashes: np.ndarray, raio: int) -> np.ndarray:
+    """
+    Pares (i, j), i < j, a no máximo `raio` bits — suficientes para montar
+    os componentes conectados.
+
+    Hashes repetidos são colapsados antes da busca: cada cópia é ligada só
+    ao primeiro índice com o mesmo valor (n - 1 pares, não n²/2) e a busca
+    roda sobre os valores distintos, ligando os primeiros índices de cada
+    valor. Buckets com mais de MAX_BUCKET valores distintos num pedaço não
+    são sondados por esse pedaço.
+
+    Returns:
+        Array (k, 2) de índices, sem repetição.
+    """
+    hashes = np.ascontiguousarray(hashes, dtype=np.uint64)
+    unicos, primeiro, inverso = np.unique(hashes, return_index=True, return_inverse=True)
+    inverso = inverso.reshape(-1)
+
+    copias = np.flatnonzero(primeiro[inverso] != np.arange(len(hashes)))
+    estrela = np.stack([primeiro[inverso[copias]], copias], axis=1)
+    entre = np.sort(primeiro[_pares_distintos(unicos, raio)], axis=1)
+
+    pares = np.concatenate([estrela, entre.reshape(-1, 2)]).astype(np.int64)
+    return np.unique(pares, axis=0)
@@ -0,0 +1,209 @@
+"""
+Detecção de arquivos idênticos em estágios (tamanho → cabeçalho → amostras → completo).
+Cada estágio só lê os arquivos que ainda colidem no estágio anterior, então
+arquivos com tamanho único nunca são abertos.
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Bloco lido no início do arquivo (estágio 2)
+BLOCO_CABECALHO = 64 * 1024
+
+# Blocos distribuídos ao longo do arquivo (estágio 3) — cobre o meio,
+# que a amostra início+fim deixava de fora
+NUM_AMOSTRAS = 16
+BLOCO_AMOSTRA = 256 * 1024
+
+# Leitura do hash completo (estágio 4)
+BLOCO_LEITURA = 1024 * 1024
+
+
+def _novo_hash():
+    """BLAKE2b de 128 bits — mais rápido que MD5 em CPUs de 64 bits."""
+    return hashlib.blake2b(digest_size=16)
+
+
+def hash_cabecalho(caminho: Path) -> Optional[str]:
+    """BLAKE2 dos primeiros BLOCO_CABECALHO bytes."""
+    h = _novo_hash()
+    try:
+        with open(caminho, "rb") as f:
+            h.update(f.read(BLOCO_CABECALHO))
+        return h.hexdigest()
+    except OSError:
+        return None
+
+
+def hash_amostras(caminho: Path) -> Optional[str]:
+    """
+    BLAKE2 de NUM_AMOSTRAS blocos espaçados uniformemente (inclui início e fim).
+
+    Arquivos menores que a soma dos blocos são lidos inteiros.
+    """
+    h = _novo_hash()
+    try:
+        tamanho = caminho.stat().st_size
+        with open(caminho, "rb") as f:
+            if tamanho <= NUM_AMOSTRAS * BLOCO_AMOSTRA:
+                h.update(f.read())
+                return h.hexdigest()
+            passo = (tamanho - BLOCO_AMOSTRA) / (NUM_AMOSTRAS - 1)
+            for i in range(NUM_AMOSTRAS):
+                f.seek(int(i * passo))
+                h.update(f.read(BLOCO_AMOSTRA))
+        return h.hexdigest()
+    except OSError:
+        return None
+
+
+def hash_completo(caminho: Path) -> Optional[str]:
+    """BLAKE2 do arquivo inteiro, em blocos de BLOCO_LEITURA."""
+    h = _novo_hash()
+    try:
+        with open(caminho, "rb", buffering=0) as f:
+            buffer = bytearray(BLOCO_LEITURA)
+            visao = memoryview(buffer)
+            while True:
+                lidos = f.readinto(buffer)
+                if not lidos:
+                    break
+                h.update(visao[:lidos])
+        return h.hexdigest()
+    except OSError:
+        return None
+
+
+def conteudo_identico(caminho_a: Path, caminho_b: Path) -> bool:
+    """
+    Compara dois arquivos byte a byte, em blocos de BLOCO_LEITURA.
+
+    Para no primeiro bloco diferente; arquivo ausente ou ilegível conta
+    como diferente.
+    """
+    try:
+        if caminho_a.stat().st_size != caminho_b.stat().st_size:
+            return False
+        with open(caminho_a, "rb") as a, open(caminho_b, "rb") as b:
+            while True:
+                bloco_a = a.read(BLOCO_LEITURA)
+                if bloco_a != b.read(BLOCO_LEITURA):
+                    return False
+                if not bloco_a:
+                    return True
+    except OSError:
+        return False
+
+
+def executar_por_dispositivo(
+    funcao: Callable[[Path], Optional[str]],
+    arquivos: Iterable[Path],
+    leitores_por_dispositivo: int = 1,
+) -> Dict[Path, Optional[str]]:
+    """
+    Aplica `funcao` a cada arquivo em threads, com leitura ordenada por dispositivo.
+
+    Arquivos são agrupados por st_dev e ordenados por inode (aproxima a
+    ordem física no disco). Cada dispositivo recebe `leitores_por_dispositivo`
+    threads com fatias contíguas da fila; dispositivos diferentes leem em paralelo.
+
+    Returns:
+        {arquivo: resultado}
+    """
+    filas: Dict[int, List[Tuple[int, Path]]] = {}
+    for arquivo in arquivos:
+        try:
+            stat = arquivo.stat()
+        except OSError:
+            continue
+        filas.setdefault(stat.st_dev, []).append((stat.st_ino, arquivo))
+
+    fatias = []
+    for fila in filas.values():
+        fila.sort()
+        caminhos = [arquivo for _, arquivo in fila]
+        leitores = max(1, min(leitores_por_dispositivo, len(caminhos)))
+        tamanho_fatia = -(-len(caminhos) // leitores)
+        for inicio in range(0, len(caminhos), tamanho_fatia):
+            fatias.append(caminhos[inicio:inicio + tamanho_fatia])
+
+    def _processar_fatia(fatia: List[Path]) -> List[Tuple[Path, Optional[str]]]:
+        return [(arquivo, funcao(arquivo)) for arquivo in fatia]
+
+    resultados: Dict[Path, Optional[str]] = {}
+    if not fatias:
+        return resultados
+    with ThreadPoolExecutor(max_workers=len(fatias)) as pool:
+        for parcial in pool.map(_processar_fatia, fatias):
+            resultados.update(parcial)
+    return resultados
+
+
+def _refinar(
+    grupos: List[List[Path]],
+    funcao: Callable[[Path], Optional[str]],
+    leitores_por_dispositivo: int,
+) -> List[List[Path]]:
+    """Re-divide cada grupo pela chave de `funcao`, descartando quem ficou sozinho."""
+    candidatos = [arquivo for grupo in grupos for arquivo in grupo]
+    chaves = executar_por_dispositivo(funcao, candidatos, leitores_por_dispositivo)
+
+    refinados = []
+    for grupo in grupos:
+        subgrupos: Dict[str, List[Path]] = {}
+        for arquivo in grupo:
+            chave = chaves.get(arquivo)
+            if chave:
+                subgrupos.setdefault(chave, []).append(arquivo)
+        refinados.extend(g for g in subgrupos.values() if len(g) > 1)
+    return refinados
+
+
+def encontrar_identicos(
+    arquivos: Iterable[Path],
+    confirmar_completo: bool = False,
+    leitores_por_dispositivo: int = 1,
+    ao_concluir_estagio: Callable[[str, int], None] = None,
+) -> List[List[Path]]:
+    """
+    Encontra grupos de arquivos byte-idênticos em estágios.
+
+    1. Tamanho exato (só stat).
+    2. Hash do cabeçalho — só dentro dos grupos de mesmo tamanho.
+    3. Hash de blocos amostrados ao longo do arquivo.
+    4. (opcional) BLAKE2 do arquivo inteiro para confirmação.
+
+    Args:
+        arquivos: Arquivos a comparar.
+        confirmar_completo: Se True, executa o estágio 4.
+        leitores_por_dispositivo: Threads de leitura por disco.
+        ao_concluir_estagio: Callback (nome_estagio, arquivos_candidatos).
+
+    Returns:
+        Lista de grupos (cada um com 2+ arquivos, ordenados por caminho).
+    """
+    por_tamanho: Dict[int, List[Path]] = {}
+    for arquivo in arquivos:
+        try:
+            por_tamanho.setdefault(arquivo.stat().st_size, []).append(arquivo)
+        except OSError:
+            continue
+
+    grupos = [g for g in por_tamanho.values() if len(g) > 1]
+    estagios = [("cabeçalho", hash_cabecalho), ("amostras", hash_amostras)]
+    if confirmar_completo:
+        estagios.append(("completo", hash_completo))
+
+    if ao_concluir_estagio:
+        ao_concluir_estagio("tamanho", sum(len(g) for g in grupos))
+
+    for nome, funcao in estagios:
+        if not grupos:
+            break
+        grupos = _refinar(grupos, funcao, leitores_por_dispositivo)
+        if ao_concluir_estagio:
+            ao_concluir_estagio(nome, sum(len(g) for g in grupos))
+
+    return [sorted(g) for g in sorted(grupos, key=lambda g: min(g))]
@@ -0,0 +1,408 @@
+"""
+Índice persistente de impressões digitais da biblioteca (SQLite).
+
+Guarda, por arquivo, o hash exato e a sequência de hashes perceptuais
+(1 dHash por imagem, 1 por ponto da grade de keyframes em vídeos), chaveados
+por caminho/tamanho/mtime. As bandas LSH dos hashes perceptuais ficam numa
+tabela indexada, então checar N arquivos novos contra a biblioteca custa
+consultas proporcionais a N — a biblioteca nunca é relida.
+"""
+
+import os
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .hamming import comparar_sequencias
+from .paths import obter_diretorio_base
+from .scanner import mapear_paralelo
+
+# Registros gravados por transação durante a sincronização
+LOTE_COMMIT = 200
+
+# Bandas LSH: o hash de 64 bits vira 4 chaves de 16 bits
+BANDAS = 4
+BITS_BANDA = 64 // BANDAS
+MASCARA_BANDA = (1 << BITS_BANDA) - 1
+
+# Buckets maiores que isso são quadros genéricos (tela preta, céu) e são ignorados
+MAX_BUCKET = 256
+
+# Deslocamentos mais votados verificados por candidato
+TOP_DESLOCAMENTOS = 3
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS itens (
+    id          INTEGER PRIMARY KEY,
+    caminho     TEXT UNIQUE NOT NULL,
+    tipo        TEXT NOT NULL,
+    tamanho     INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    hash_exato  TEXT,
+    largura     INTEGER,
+    altura      INTEGER,
+    duracao_s   REAL,
+    quadros     BLOB,
+    validos     BLOB,
+    visto_em    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_itens_exato ON itens (tipo, tamanho, hash_exato);
+CREATE TABLE IF NOT EXISTS bandas (
+    chave    INTEGER NOT NULL,
+    item_id  INTEGER NOT NULL,
+    posicao  INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bandas_chave ON bandas (chave);
+CREATE INDEX IF NOT EXISTS idx_bandas_item ON bandas (item_id);
+"""
+
+
+def _chaves_bandas(valor: int) -> List[int]:
+    """Chaves das bandas de um hash: (banda << 16) | 16 bits da banda."""
+    return [
+        (banda << BITS_BANDA) | ((valor >> (banda * BITS_BANDA)) & MASCARA_BANDA)
+        for banda in range(BANDAS)
+    ]
+
+
+def _vizinhos_banda(chave: int) -> List[int]:
+    """A própria chave e as que diferem dela em 1 bit (sondagem multi-probe)."""
+    return [chave] + [chave ^ (1 << bit) for bit in range(BITS_BANDA)]
+
+
+class IndiceBiblioteca:
+    """
+    Índice de impressões digitais de imagens e vídeos já arquivados.
+
+    - sincronizar(): adiciona/atualiza só o que mudou (tamanho, mtime_ns)
+      e apaga do índice o que sumiu da pasta;
+    - remover(): tira caminhos específicos;
+    - compactar(): limpa itens cujo arquivo não existe mais e faz VACUUM;
+    - verificar_arquivos(): compara arquivos novos com a biblioteca.
+    """
+
+    NOME_BANCO = "indice-biblioteca.db"
+
+    def __init__(self, caminho_banco: Path = None):
+        """
+        Args:
+            caminho_banco: Arquivo SQLite (None = indice-biblioteca.db na raiz do projeto).
+        """
+        self.caminho_banco = Path(caminho_banco or obter_diretorio_base() / self.NOME_BANCO)
+        self.caminho_banco.parent.mkdir(parents=True, exist_ok=True)
+        self.conexao = sqlite3.connect(str(self.caminho_banco))
+        self.conexao.row_factory = sqlite3.Row
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.executescript(ESQUEMA)
+
+    def fechar(self) -> None:
+        """Fecha a conexão com o banco."""
+        self.conexao.close()
+
+    def total(self, tipo: str = None) -> int:
+        """Número de itens indexados (de um tipo ou todos)."""
+        if tipo:
+            return self.conexao.execute("SELECT COUNT(*) FROM itens WHERE tipo = ?", (tipo,)).fetchone()[0]
+        return self.conexao.execute("SELECT COUNT(*) FROM itens").fetchone()[0]
+
+    def _carregar_estado(self, pasta: Path, tipo: str) -> Dict[str, Tuple[int, int]]:
+        """Carrega (tamanho, mtime_ns) dos itens já indexados sob a pasta."""
+        prefixo = str(pasta).rstrip(os.sep) + os.sep
+        cursor = self.conexao.execute(
+            "SELECT caminho, tamanho, mtime_ns FROM itens "
+            "WHERE tipo = ? AND substr(caminho, 1, ?) = ?",
+            (tipo, len(prefixo), prefixo),
+        )
+        return {linha[0]: (linha[1], linha[2]) for linha in cursor}
+
+    def _apagar(self, caminhos: Iterable[str]) -> int:
+        """Apaga itens e suas bandas (sem commit)."""
+        apagados = 0
+        for caminho in caminhos:
+            linha = self.conexao.execute("SELECT id FROM itens WHERE caminho = ?", (caminho,)).fetchone()
+            if linha is None:
+                continue
+            self.conexao.execute("DELETE FROM bandas WHERE item_id = ?", (linha[0],))
+            self.conexao.execute("DELETE FROM itens WHERE id = ?", (linha[0],))
+            apagados += 1
+        return apagados
+
+    def _gravar(self, arquivo: Path, stat: os.stat_result, tipo: str, impressao: Dict, agora: float) -> None:
+        """Substitui o item e suas bandas LSH."""
+        self._apagar([str(arquivo)])
+        quadros = impressao.get("quadros")
+        validos = impressao.get("validos")
+        cursor = self.conexao.execute(
+            "INSERT INTO itens (caminho, tipo, tamanho, mtime_ns, hash_exato, largura, altura, "
+            "duracao_s, quadros, validos, visto_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(arquivo), tipo, stat.st_size, stat.st_mtime_ns, impressao.get("hash_exato"),
+                impressao.get("largura"), impressao.get("altura"), impressao.get("duracao"),
+                quadros.astype("<u8").tobytes() if quadros is not None else None,
+                np.packbits(validos).tobytes() if validos is not None else None,
+                agora,
+            ),
+        )
+        if quadros is None:
+            return
+
+        item_id = cursor.lastrowid
+        linhas = [
+            (chave, item_id, int(posicao))
+            for posicao in np.flatnonzero(validos)
+            for chave in _chaves_bandas(int(quadros[posicao]))
+        ]
+        self.conexao.executemany(
+            "INSERT INTO bandas (chave, item_id, posicao) VALUES (?, ?, ?)", linhas
+        )
+
+    def sincronizar(
+        self,
+        pasta: Path,
+        arquivos: Iterable[Path],
+        tipo: str,
+        calcular: Callable[[Path], Optional[Dict]],
+        workers: int,
+        remover_ausentes: bool = True,
+        ao_progresso: Callable[[int], None] = None,
+    ) -> Dict[str, int]:
+        """
+        Sincroniza o índice com os arquivos da pasta.
+
+        Arquivos com (tamanho, mtime_ns) iguais aos do índice não são lidos;
+        os demais passam por `calcular` em paralelo. Toda escrita no SQLite
+        acontece nesta thread.
+
+        Args:
+            pasta: Pasta raiz (delimita a remoção de ausentes).
+            arquivos: Iterável de arquivos encontrados.
+            tipo: "imagem" ou "video".
+            calcular: Função de impressão (ex: impressao_imagem).
+            workers: Número de cálculos simultâneos.
+            remover_ausentes: Se True, apaga do índice o que não está mais na pasta.
+            ao_progresso: Callback chamado com o total de arquivos calculados.
+
+        Returns:
+            dict com novos, atualizados, inalterados, removidos e falhas.
+        """
+        agora = time.time()
+        conhecidos = self._carregar_estado(pasta, tipo)
+        estatisticas = {"novos": 0, "atualizados": 0, "inalterados": 0, "removidos": 0, "falhas": 0}
+        vistos: List[str] = []
+
+        def _alterados() -> Iterator[Tuple[Path, os.stat_result, str]]:
+            for arquivo in arquivos:
+                try:
+                    stat = arquivo.stat()
+                except OSError:
+                    continue
+                anterior = conhecidos.pop(str(arquivo), None)
+                if anterior == (stat.st_size, stat.st_mtime_ns):
+                    estatisticas["inalterados"] += 1
+                    vistos.append(str(arquivo))
+                    continue
+                chave = "atualizados" if anterior is not None else "novos"
+                yield arquivo, stat, chave
+
+        def _calcular(item: Tuple[Path, os.stat_result, str]) -> Optional[Dict]:
+            return calcular(item[0])
+
+        pendentes_commit = 0
+        calculados = 0
+        for (arquivo, stat, chave), impressao in mapear_paralelo(_calcular, _alterados(), workers):
+            calculados += 1
+            if impressao is None:
+                estatisticas["falhas"] += 1
+            else:
+                self._gravar(arquivo, stat, tipo, impressao, agora)
+                estatisticas[chave] += 1
+                pendentes_commit += 1
+                if pendentes_commit >= LOTE_COMMIT:
+                    self.conexao.commit()
+                    pendentes_commit = 0
+            if ao_progresso:
+                ao_progresso(calculados)
+
+        self.conexao.executemany(
+            "UPDATE itens SET visto_em = ? WHERE caminho = ?", ((agora, c) for c in vistos)
+        )
+        # O que sobrou em `conhecidos` não existe mais na pasta
+        if remover_ausentes and conhecidos:
+            estatisticas["removidos"] = self._apagar(conhecidos)
+        self.conexao.commit()
+        return estatisticas
+
+    def remover(self, caminhos: Iterable[Path]) -> int:
+        """Remove caminhos do índice (ex: arquivos apagados fora da ferramenta)."""
+        apagados = self._apagar(str(caminho) for caminho in caminhos)
+        self.conexao.commit()
+        return apagados
+
+    def compactar(self) -> Dict[str, int]:
+        """
+        Manutenção: apaga itens cujo arquivo não existe mais, bandas órfãs,
+        e reconstrói o arquivo do banco (VACUUM) liberando o espaço.
+
+        Returns:
+            dict com ausentes (itens removidos) e bytes_antes / bytes_depois.
+        """
+        self.conexao.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        bytes_antes = self.caminho_banco.stat().st_size
+        ausentes = [
+            caminho for (caminho,) in self.conexao.execute("SELECT caminho FROM itens")
+            if not os.path.exists(caminho)
+        ]
+        removidos = self._apagar(ausentes)
+        self.conexao.execute("DELETE FROM bandas WHERE item_id NOT IN (SELECT id FROM itens)")
+        self.conexao.commit()
+        self.conexao.execute("VACUUM")
+        self.conexao.execute("ANALYZE")
+        return {
+            "ausentes": removidos,
+            "bytes_antes": bytes_antes,
+            "bytes_depois": self.caminho_banco.stat().st_size,
+        }
+
+    def _candidatos_perceptuais(
+        self, quadros: np.ndarray, validos: np.ndarray, tipo: str, sondar_vizinhos: bool
+    ) -> Dict[int, Counter]:
+        """Votos por (item, deslocamento) a partir das bandas compartilhadas."""
+        votos: Dict[int, Counter] = {}
+        for posicao in np.flatnonzero(validos):
+            for chave in _chaves_bandas(int(quadros[posicao])):
+                for sondada in _vizinhos_banda(chave) if sondar_vizinhos else [chave]:
+                    linhas = self.conexao.execute(
+                        "SELECT b.item_id, b.posicao FROM bandas b JOIN itens i ON i.id = b.item_id "
+                        "WHERE b.chave = ? AND i.tipo = ? LIMIT ?",
+                        (sondada, tipo, MAX_BUCKET + 1),
+                    ).fetchall()
+                    if len(linhas) > MAX_BUCKET:
+                        continue
+                    for item_id, posicao_item in linhas:
+                        votos.setdefault(item_id, Counter())[posicao_item - int(posicao)] += 1
+        return votos
+
+    def verificar(
+        self,
+        impressao: Dict,
+        tipo: str,
+        limiar_hamming: int,
+        min_sobrepostos: int = 1,
+        min_fracao: float = 1.0,
+        sondar_vizinhos: bool = False,
+    ) -> List[Dict]:
+        """
+        Procura uma impressão na biblioteca.
+
+        1. Exato: mesmo tipo, tamanho e hash (consulta indexada).
+        2. Perceptual: itens que compartilham bandas LSH, com o deslocamento
+           mais votado verificado na sequência inteira.
+
+        Args:
+            impressao: dict com tamanho, hash_exato, quadros e validos.
+            tipo: "imagem" ou "video".
+            limiar_hamming: Distância máxima para dois hashes serem "iguais".
+            min_sobrepostos: Posições válidas sobrepostas exigidas.
+            min_fracao: Fração mínima de posições parecidas.
+            sondar_vizinhos: Consulta também chaves a 1 bit de distância —
+                recupera imagens com mais bits alterados (hash único).
+
+        Returns:
+            Lista de dicts (caminho, correspondencia "exata"/"perceptual",
+            fracao, deslocamento, largura, altura, duracao_s, tamanho).
+        """
+        resultados: List[Dict] = []
+        exatos = set()
+        if impressao.get("hash_exato"):
+            for linha in self.conexao.execute(
+                "SELECT * FROM itens WHERE tipo = ? AND tamanho = ? AND hash_exato = ?",
+                (tipo, impressao["tamanho"], impressao["hash_exato"]),
+            ):
+                exatos.add(linha["id"])
+                resultados.append(self._resultado(linha, "exata", 1.0, 0))
+
+        quadros = impressao.get("quadros")
+        if quadros is None:
+            return resultados
+
+        validos = impressao["validos"]
+        votos = self._candidatos_perceptuais(quadros, validos, tipo, sondar_vizinhos)
+        for item_id, contagem in votos.items():
+            if item_id in exatos:
+                continue
+            linha = self.conexao.execute("SELECT * FROM itens WHERE id = ?", (item_id,)).fetchone()
+            if linha is None or linha["quadros"] is None:
+                continue
+            quadros_item = np.frombuffer(linha["quadros"], dtype="<u8").astype(np.uint64)
+            validos_item = np.unpackbits(
+                np.frombuffer(linha["validos"], dtype=np.uint8), count=len(quadros_item)
+            ).astype(bool)
+
+            melhor = None
+            for deslocamento, _ in contagem.most_common(TOP_DESLOCAMENTOS):
+                fracao, sobrepostos = comparar_sequencias(
+                    quadros_item, validos_item, quadros, validos, deslocamento, limiar_hamming
+                )
+                if sobrepostos >= min_sobrepostos and fracao >= min_fracao:
+                    if melhor is None or fracao > melhor[0]:
+                        melhor = (fracao, deslocamento)
+            if melhor:
+                resultados.append(self._resultado(linha, "perceptual", *melhor))
+        return resultados
+
+    @staticmethod
+    def _resultado(linha: sqlite3.Row, correspondencia: str, fracao: float, deslocamento: int) -> Dict:
+        return {
+            "caminho": Path(linha["caminho"]),
+            "correspondencia": correspondencia,
+            "fracao": fracao,
+            "deslocamento": deslocamento,
+            "largura": linha["largura"] or 0,
+            "altura": linha["altura"] or 0,
+            "duracao_s": linha["duracao_s"] or 0.0,
+            "tamanho": linha["tamanho"],
+        }
+
+    def verificar_arquivos(
+        self,
+        arquivos: List[Path],
+        tipo: str,
+        calcular: Callable[[Path], Optional[Dict]],
+        workers: int,
+        **criterios,
+    ) -> Iterator[Tuple[Path, Optional[Dict], List[Dict]]]:
+        """
+        Checa arquivos novos contra a biblioteca sem indexá-los.
+
+        As impressões são calculadas em paralelo; as consultas ao SQLite
+        ficam nesta thread. O custo depende só do número de arquivos novos.
+
+        Args:
+            arquivos: Arquivos a verificar.
+            tipo: "imagem" ou "video".
+            calcular: Função de impressão.
+            workers: Cálculos simultâneos.
+            **criterios: Repassados a verificar() (limiar_hamming, ...).
+
+        Yields:
+            (arquivo, impressao, correspondencias) — impressao None se falhou.
+        """
+        for arquivo, impressao in mapear_paralelo(calcular, arquivos, workers):
+            if impressao is None:
+                yield arquivo, None, []
+                continue
+            try:
+                impressao["tamanho"] = arquivo.stat().st_size
+            except OSError:
+                yield arquivo, None, []
+                continue
+            correspondencias = [
+                c for c in self.verificar(impressao, tipo, **criterios)
+                if c["caminho"] != arquivo
+            ]
+            yield arquivo, impressao, correspondencias
@@ -0,0 +1,114 @@
+"""
+Execução em lote com pool de processos, para trabalho limitado por CPU
+(Pillow, OpenCV, OCR) onde threads ficariam presas no GIL.
+
+O processo principal só distribui itens e recebe resultados: mover
+arquivos, contar estatísticas e atualizar a barra de progresso continuam
+nele, na ordem em que os resultados chegam.
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Função do lote neste worker (enviada uma vez por processo, não por item)
+_FUNCAO_WORKER: Optional[Callable] = None
+
+
+def _iniciar_worker(funcao: Callable, inicializador: Optional[Callable], args: tuple) -> None:
+    global _FUNCAO_WORKER
+    _FUNCAO_WORKER = funcao
+    if inicializador is not None:
+        inicializador(*args)
+
+
+def _executar_item(item):
+    return _FUNCAO_WORKER(item)
+
+
+def executar_em_processos(
+    funcao: Callable[[T], R],
+    itens: Iterable[T],
+    workers: int,
+    ordenado: bool = False,
+    inicializador: Optional[Callable] = None,
+    args_inicializador: tuple = (),
+    max_pendentes: Optional[int] = None,
+) -> Iterator[Tuple[T, Optional[R]]]:
+    """
+    Aplica `funcao` em um pool de processos e devolve os resultados em fluxo.
+
+    `funcao` pode ser um método do próprio processador: ela é serializada
+    uma vez por worker (no inicializador do pool), não a cada item. O
+    `inicializador` roda em cada worker antes do primeiro item — lugar para
+    carregar modelos ou limitar threads internas das bibliotecas.
+
+    No máximo `max_pendentes` itens ficam em voo, então a memória não cresce
+    com o tamanho da pasta mesmo que o consumidor seja lento.
+
+    Args:
+        funcao: Função aplicada a cada item (exceções viram resultado None).
+        itens: Iterável (pode ser gerador) de entradas.
+        workers: Número de processos (≤ 1 = executa no próprio processo).
+        ordenado: Se True, devolve na ordem de entrada; senão, na ordem em que terminam.
+        inicializador: Chamado uma vez em cada worker.
+        args_inicializador: Argumentos do inicializador.
+        max_pendentes: Limite de itens em voo (None = 2 × workers).
+
+    Yields:
+        (item, resultado) de cada entrada.
+    """
+    if workers <= 1:
+        if inicializador is not None:
+            inicializador(*args_inicializador)
+        for item in itens:
+            try:
+                resultado = funcao(item)
+            except Exception:
+                resultado = None
+            yield item, resultado
+        return
+
+    limite = max_pendentes or workers * 2
+    iterador = iter(itens)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_iniciar_worker,
+        initargs=(funcao, inicializador, args_inicializador),
+    ) as executor:
+        fila = deque()
+        pendentes = {}
+
+        def _abastecer() -> None:
+            while len(pendentes) < limite:
+                try:
+                    item = next(iterador)
+                except StopIteration:
+                    return
+                futuro = executor.submit(_executar_item, item)
+                pendentes[futuro] = item
+                if ordenado:
+                    fila.append(futuro)
+
+        def _resultado(futuro):
+            try:
+                return futuro.result()
+            except Exception:
+                return None
+
+        _abastecer()
+        while pendentes:
+            if ordenado:
+                # Espera a cabeça da fila; os de trás seguem rodando
+                futuro = fila.popleft()
+                resultado = _resultado(futuro)
+                yield pendentes.pop(futuro), resultado
+            else:
+                prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    yield pendentes.pop(futuro), _resultado(futuro)
+            _abastecer()
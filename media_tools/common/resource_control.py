@@ -258,3 +258,37 @@ def obter_pausa_entre_videos() -> float:
             pass
     return 1.0
 
+
+def obter_workers_io() -> int:
+    """
+    Obtém quantos workers usar em tarefas limitadas por I/O (ffprobe, remux, hash).
+    Valor alto demais causa seek thrashing em HD/NAS; controle via env var WORKERS_IO.
+
+    Returns:
+        int: Número de workers de I/O.
+    """
+    env_workers = os.getenv("WORKERS_IO")
+    if env_workers:
+        try:
+            return max(1, int(env_workers))
+        except ValueError:
+            pass
+    return max(2, min(8, obter_cores_disponiveis()))
+
+
+def obter_workers_cpu() -> int:
+    """
+    Obtém quantos processos usar em lotes limitados por CPU (Pillow, OpenCV, OCR).
+    Padrão: cores físicos menos 1, para o processo principal mover arquivos e
+    atualizar a barra sem disputar núcleo; controle via env var WORKERS_CPU.
+
+    Returns:
+        int: Número de processos de trabalho.
+    """
+    env_workers = os.getenv("WORKERS_CPU")
+    if env_workers:
+        try:
+            return max(1, int(env_workers))
+        except ValueError:
+            pass
+    return max(1, obter_cores_fisicos() - 1)
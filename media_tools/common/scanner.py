@@ -0,0 +1,106 @@
+"""
+Varredura de pastas e execução paralela em fluxo (streaming).
+Usado por inventários de pastas grandes: os resultados chegam conforme
+ficam prontos e a memória não cresce com o tamanho da árvore.
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def percorrer_arquivos(
+    pasta: Path, extensoes: Optional[Set[str]] = None, recursivo: bool = True
+) -> Iterator[Path]:
+    """
+    Percorre a pasta com os.scandir (sem stat extra por entrada).
+
+    Pastas ocultas (iniciadas com '.') e links simbólicos de pasta são ignorados.
+    A ordem dentro de cada pasta é alfabética, para saída estável.
+
+    Args:
+        pasta: Pasta raiz.
+        extensoes: Extensões aceitas em minúsculas (ex: {".mp4"}). None = todas.
+        recursivo: Se True, desce nas subpastas.
+
+    Yields:
+        Path de cada arquivo encontrado.
+    """
+    pendentes = [str(pasta)]
+    while pendentes:
+        atual = pendentes.pop()
+        try:
+            with os.scandir(atual) as it:
+                entradas = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        subpastas = []
+        for entrada in entradas:
+            try:
+                if entrada.is_dir(follow_symlinks=False):
+                    if recursivo and not entrada.name.startswith("."):
+                        subpastas.append(entrada.path)
+                    continue
+                if not entrada.is_file():
+                    continue
+            except OSError:
+                continue
+            if extensoes is None or os.path.splitext(entrada.name)[1].lower() in extensoes:
+                yield Path(entrada.path)
+
+        # Pilha: inverte para visitar as subpastas em ordem alfabética
+        pendentes.extend(reversed(subpastas))
+
+
+def mapear_paralelo(
+    funcao: Callable[[T], R],
+    itens: Iterable[T],
+    workers: int,
+    max_pendentes: Optional[int] = None,
+) -> Iterator[Tuple[T, Optional[R]]]:
+    """
+    Aplica `funcao` em paralelo (threads) e devolve os resultados fora de ordem.
+
+    O iterável de entrada é consumido aos poucos: no máximo `max_pendentes`
+    tarefas ficam em voo, então um gerador de milhares de arquivos não é
+    materializado em memória.
+
+    Args:
+        funcao: Função aplicada a cada item (exceções viram resultado None).
+        itens: Iterável (pode ser gerador) de entradas.
+        workers: Número de threads.
+        max_pendentes: Limite de tarefas em voo (None = 2 × workers).
+
+    Yields:
+        (item, resultado) na ordem em que terminam.
+    """
+    workers = max(1, workers)
+    limite = max_pendentes or workers * 2
+    iterador = iter(itens)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        em_voo = {}
+        for item in iterador:
+            em_voo[pool.submit(funcao, item)] = item
+            if len(em_voo) >= limite:
+                break
+
+        while em_voo:
+            prontos, _ = wait(em_voo, return_when=FIRST_COMPLETED)
+            for fut in prontos:
+                item = em_voo.pop(fut)
+                try:
+                    resultado = fut.result()
+                except Exception:
+                    resultado = None
+                yield item, resultado
+
+                # Repõe uma tarefa para cada concluída
+                proximo = next(iterador, None)
+                if proximo is not None:
+                    em_voo[pool.submit(funcao, proximo)] = proximo
@@ -3,11 +3,28 @@ Removedor de fundo de imagens.
 """
 
 import shutil
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
+from ..common.parallel import executar_em_processos
 from ..common.paths import criar_pastas, obter_pastas_entrada_saida
 from ..common.progress import ProgressBar
+from ..common.resource_control import obter_workers_cpu
+
+# Sessão do modelo, criada uma vez por processo de trabalho
+_SESSAO = None
+
+
+def _iniciar_worker_rembg() -> None:
+    """Carrega o modelo uma vez por worker em vez de a cada imagem."""
+    global _SESSAO
+    try:
+        from rembg import new_session
+
+        _SESSAO = new_session()
+    except Exception:
+        _SESSAO = None
 
 
 class RemovedorFundo:
@@ -17,10 +34,15 @@ class RemovedorFundo:
 
     EXTENSOES_VALIDAS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
 
+    # O modelo (~170MB) fica em memória em cada worker e o onnxruntime já usa
+    # vários threads por inferência — poucos processos bastam
+    MAX_WORKERS = 2
+
     def __init__(
         self,
         pasta_entrada: Path = None,
         pasta_saida: Path = None,
+        workers: int = None,
     ):
         """
         Inicializa o removedor.
@@ -28,6 +50,7 @@ class RemovedorFundo:
         Args:
             pasta_entrada: Pasta de entrada (None = padrão).
             pasta_saida: Pasta de saída (None = padrão).
+            workers: Processos em paralelo (None = até MAX_WORKERS).
         """
         if pasta_entrada is None or pasta_saida is None:
             entrada, saida = obter_pastas_entrada_saida("imagens")
@@ -37,6 +60,8 @@ class RemovedorFundo:
             self.pasta_entrada = pasta_entrada
             self.pasta_saida = pasta_saida
 
+        self.workers = workers or min(self.MAX_WORKERS, obter_workers_cpu())
+
     def _verificar_rembg(self) -> bool:
         """Verifica se rembg está disponível."""
         try:
@@ -45,7 +70,9 @@ class RemovedorFundo:
         except ImportError:
             return False
 
-    def _remover_fundo(self, caminho_entrada: Path, caminho_saida: Path) -> bool:
+    def _remover_fundo(
+        self, caminho_entrada: Path, caminho_saida: Path
+    ) -> Tuple[bool, Optional[str]]:
         """
         Remove fundo de uma imagem.
 
@@ -54,7 +81,7 @@ class RemovedorFundo:
             caminho_saida: Caminho da imagem de saída (PNG com transparência).
 
         Returns:
-            bool: True se a remoção foi bem-sucedida.
+            Tuple[bool, Optional[str]]: (sucesso, mensagem de erro)
         """
         try:
             from rembg import remove
@@ -65,7 +92,7 @@ class RemovedorFundo:
                 input_data = f.read()
 
             # Remove fundo
-            output_data = remove(input_data)
+            output_data = remove(input_data, session=_SESSAO)
 
             # Salva como PNG com transparência
             nome_saida = caminho_saida.stem + ".png"
@@ -74,12 +101,17 @@ class RemovedorFundo:
             with open(caminho_saida_png, "wb") as f:
                 f.write(output_data)
 
-            return caminho_saida_png.exists()
+            return caminho_saida_png.exists(), None
         except ImportError:
-            return False
+            return False, "rembg não instalado"
         except Exception as e:
-            print(f"   ⚠️  Erro: {e}")
-            return False
+            return False, str(e)
+
+    def _remover_para_pasta(
+        self, arquivo: Path, pasta_saida: Path
+    ) -> Tuple[bool, Optional[str]]:
+        """Remove o fundo para `pasta_saida/<nome>.png` (executado nos workers)."""
+        return self._remover_fundo(arquivo, pasta_saida / (arquivo.stem + ".png"))
 
     def processar(self) -> dict:
         """
@@ -117,19 +149,28 @@ class RemovedorFundo:
         sucessos = 0
         falhas = 0
 
+        remover = partial(self._remover_para_pasta, pasta_saida=pasta_saida)
+
         with ProgressBar(
             total=len(arquivos), desc="Removendo fundo", unit="img"
         ).context() as pbar:
-            for arquivo in arquivos:
+            for arquivo, resultado in executar_em_processos(
+                remover,
+                arquivos,
+                self.workers,
+                inicializador=_iniciar_worker_rembg,
+            ):
+                sucesso, erro = resultado or (False, "falha no processo de trabalho")
                 nome_saida = arquivo.stem + ".png"
                 arquivo_saida = pasta_saida / nome_saida
 
-                if self._remover_fundo(arquivo, arquivo_saida):
+                if sucesso:
                     tamanho_kb = arquivo_saida.stat().st_size / 1024
                     print(f"\n✅ {arquivo.name} -> {nome_saida} ({tamanho_kb:.1f} KB)")
                     sucessos += 1
                 else:
-                    print(f"\n❌ Erro ao processar {arquivo.name}")
+                    detalhe = f": {erro}" if erro else ""
+                    print(f"\n❌ Erro ao processar {arquivo.name}{detalhe}")
                     falhas += 1
 
                 pbar.update(1)
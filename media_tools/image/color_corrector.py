@@ -3,13 +3,16 @@ Corretor de cores e filtros de imagens.
 """
 
 import numpy as np
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 from PIL import Image, ImageEnhance, ImageFilter
 
+from ..common.parallel import executar_em_processos
 from ..common.paths import criar_pastas, obter_pastas_entrada_saida
 from ..common.progress import ProgressBar
+from ..common.resource_control import obter_workers_cpu
 
 
 class CorretorCores:
@@ -28,6 +31,7 @@ class CorretorCores:
         contraste: float = 1.0,
         saturacao: float = 1.0,
         filtro: str = None,
+        workers: int = None,
     ):
         """
         Inicializa o corretor.
@@ -40,6 +44,7 @@ class CorretorCores:
             contraste: Fator de contraste (0.5-2.0, 1.0 = normal).
             saturacao: Fator de saturação (0.0-2.0, 1.0 = normal).
             filtro: Filtro a aplicar ('sepia', 'bw', 'vintage', None).
+            workers: Processos em paralelo (None = WORKERS_CPU ou cores físicos - 1).
         """
         if pasta_entrada is None or pasta_saida is None:
             entrada, saida = obter_pastas_entrada_saida("imagens")
@@ -54,6 +59,7 @@ class CorretorCores:
         self.contraste = contraste
         self.saturacao = saturacao
         self.filtro = filtro
+        self.workers = workers or obter_workers_cpu()
 
     def _aplicar_filtro(self, img: Image.Image, filtro_nome: str) -> Image.Image:
         """
@@ -99,7 +105,9 @@ class CorretorCores:
         img_array[mask, 0] = np.clip(img_array[mask, 0] * 0.7, 0, 255)
         return Image.fromarray(img_array.astype(np.uint8))
 
-    def _processar_imagem(self, caminho_entrada: Path, caminho_saida: Path) -> bool:
+    def _processar_imagem(
+        self, caminho_entrada: Path, caminho_saida: Path
+    ) -> Tuple[bool, Optional[str]]:
         """
         Processa uma imagem aplicando correções.
 
@@ -108,7 +116,7 @@ class CorretorCores:
             caminho_saida: Caminho da imagem de saída.
 
         Returns:
-            bool: True se o processamento foi bem-sucedido.
+            Tuple[bool, Optional[str]]: (sucesso, mensagem de erro)
         """
         try:
             img = Image.open(caminho_entrada)
@@ -146,10 +154,15 @@ class CorretorCores:
 
             # Salva
             img.save(caminho_saida, quality=95, optimize=True)
-            return True
+            return True, None
         except Exception as e:
-            print(f"   ⚠️  Erro: {e}")
-            return False
+            return False, str(e)
+
+    def _processar_para_pasta(
+        self, arquivo: Path, pasta_saida: Path
+    ) -> Tuple[bool, Optional[str]]:
+        """Corrige uma imagem para `pasta_saida/<nome>` (executado nos workers)."""
+        return self._processar_imagem(arquivo, pasta_saida / arquivo.name)
 
     def processar(self) -> dict:
         """
@@ -184,15 +197,20 @@ class CorretorCores:
         sucessos = 0
         falhas = 0
 
+        corrigir = partial(self._processar_para_pasta, pasta_saida=pasta_saida)
+
         with ProgressBar(
             total=len(arquivos), desc="Corrigindo", unit="img"
         ).context() as pbar:
-            for arquivo in arquivos:
-                caminho_saida = pasta_saida / arquivo.name
+            for arquivo, resultado in executar_em_processos(
+                corrigir, arquivos, self.workers
+            ):
+                sucesso, erro = resultado or (False, "falha no processo de trabalho")
 
-                if self._processar_imagem(arquivo, caminho_saida):
+                if sucesso:
                     sucessos += 1
                 else:
+                    print(f"\n   ⚠️  {arquivo.name}: {erro}")
                     falhas += 1
 
                 pbar.update(1)
@@ -2,13 +2,19 @@
 Conversor de WebP para JPG.
 """
 
+import shutil
+import subprocess
+from functools import partial
 from pathlib import Path
-from typing import Tuple
+from typing import Iterator, Tuple
 
 from PIL import Image
 
+from ..common.parallel import executar_em_processos
 from ..common.paths import criar_pastas, obter_pastas_entrada_saida
 from ..common.progress import ProgressBar
+from ..common.resource_control import obter_workers_cpu
+from .gif_stream import EscritorGif
 
 
 class ConversorWebP:
@@ -16,6 +22,10 @@ class ConversorWebP:
     Classe para converter WebP para JPG com alta qualidade.
     """
 
+    # Animações em MP4: taxa fixa de saída e qualidade do x264
+    FPS_MP4 = 30
+    CRF_MP4 = 20
+
     def __init__(
         self,
         pasta_entrada: Path = None,
@@ -24,6 +34,8 @@ class ConversorWebP:
         apagar_original: bool = True,
         preservar_qualidade: bool = True,
         suporte_animacoes: bool = True,
+        workers: int = None,
+        formato_animacao: str = "gif",
     ):
         """
         Inicializa o conversor.
@@ -35,6 +47,8 @@ class ConversorWebP:
             apagar_original: Se True, deleta o arquivo WebP após converter.
             preservar_qualidade: Se True, analisa qualidade antes de converter.
             suporte_animacoes: Se True, converte WebP animado para GIF/MP4.
+            workers: Processos em paralelo (None = WORKERS_CPU ou cores físicos - 1).
+            formato_animacao: "gif" (padrão, só Pillow) ou "mp4" (requer ffmpeg).
         """
         if pasta_entrada is None or pasta_saida is None:
             entrada, saida = obter_pastas_entrada_saida("imagens")
@@ -48,44 +62,35 @@ class ConversorWebP:
         self.apagar_original = apagar_original
         self.preservar_qualidade = preservar_qualidade
         self.suporte_animacoes = suporte_animacoes
+        self.formato_animacao = formato_animacao
+        self.workers = workers or obter_workers_cpu()
 
-    def _eh_animado(self, caminho: Path) -> bool:
+    def _eh_animado(self, img: Image.Image) -> bool:
         """
-        Verifica se o WebP é animado.
+        Verifica se o WebP é animado (só cabeçalho, sem decodificar frames).
 
         Args:
-            caminho: Caminho do arquivo WebP.
+            img: WebP já aberto.
 
         Returns:
             bool: True se for animado.
         """
-        try:
-            img = Image.open(caminho)
-            if hasattr(img, "is_animated"):
-                return img.is_animated
-            # Verifica se tem múltiplos frames
-            try:
-                img.seek(1)
-                return True
-            except EOFError:
-                return False
-        except Exception:
-            return False
+        if getattr(img, "is_animated", False):
+            return True
+        return getattr(img, "n_frames", 1) > 1
 
-    def _analisar_qualidade(self, caminho: Path) -> Tuple[int, dict]:
+    def _analisar_qualidade(self, img: Image.Image, tamanho_original: int) -> Tuple[int, dict]:
         """
         Analisa a qualidade da imagem WebP para determinar qualidade JPG ideal.
 
         Args:
-            caminho: Caminho do arquivo WebP.
+            img: WebP já aberto.
+            tamanho_original: Tamanho do arquivo em bytes.
 
         Returns:
             Tuple[int, dict]: (qualidade_recomendada, info)
         """
         try:
-            img = Image.open(caminho)
-            tamanho_original = caminho.stat().st_size
-
             # Analisa resolução
             largura, altura = img.size
             megapixels = (largura * altura) / 1_000_000
@@ -114,53 +119,127 @@ class ConversorWebP:
         except Exception:
             return self.qualidade, {}
 
-    def _converter_animacao(self, caminho_entrada: Path, caminho_saida: Path) -> bool:
+    def _iterar_frames(self, img: Image.Image) -> Iterator[Tuple[Image.Image, int]]:
         """
-        Converte WebP animado para GIF ou MP4.
+        Gera (frame RGBA, duração em ms) um de cada vez.
 
-        Args:
-            caminho_entrada: Caminho do arquivo WebP animado.
-            caminho_saida: Caminho do arquivo de saída.
-
-        Returns:
-            bool: True se a conversão foi bem-sucedida.
+        Só o frame atual fica em memória, qualquer que seja o número de frames.
         """
-        if not self.suporte_animacoes:
-            return False
+        for indice in range(getattr(img, "n_frames", 1)):
+            img.seek(indice)
+            frame = img.convert("RGBA")
+            # A duração do frame só é conhecida depois de decodificá-lo
+            yield frame, int(img.info.get("duration") or 100)
+
+    def _animacao_para_gif(self, img: Image.Image, caminho_gif: Path) -> Tuple[bool, str]:
+        """Grava a animação como GIF frame a frame, cada frame com a própria tabela de cores."""
+        escritor = EscritorGif(
+            caminho_gif,
+            *img.size,
+            loop=img.info.get("loop", 0),
+            transparencia=img.mode in ("RGBA", "LA") or "transparency" in img.info,
+        )
+        try:
+            for frame, duracao in self._iterar_frames(img):
+                escritor.adicionar(frame, duracao)
+        finally:
+            escritor.fechar()
+        return True, f"animação convertida para GIF ({escritor.frames} frames): {caminho_gif.name}"
 
-        # Tenta converter para GIF primeiro (mais simples)
-        caminho_gif = caminho_saida.with_suffix(".gif")
+    def _animacao_para_mp4(self, img: Image.Image, caminho_mp4: Path) -> Tuple[bool, str]:
+        """
+        Envia os frames decodificados ao ffmpeg por um pipe rawvideo.
 
+        O MP4 tem taxa fixa (FPS_MP4): cada frame é repetido conforme sua
+        duração, com o tempo acumulado para os arredondamentos não somarem.
+        """
+        if shutil.which("ffmpeg") is None:
+            return False, "ffmpeg não encontrado (necessário para animação em MP4)"
+
+        largura, altura = img.size
+        comando = [
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24",
+            "-s", f"{largura}x{altura}", "-r", str(self.FPS_MP4),
+            "-i", "-",
+            # yuv420p exige largura e altura pares
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", "libx264", "-crf", str(self.CRF_MP4), "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart",
+            str(caminho_mp4),
+        ]
+        processo = subprocess.Popen(
+            comando, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+
+        # Transparência vira fundo branco, como no JPG
+        fundo = Image.new("RGBA", img.size, (255, 255, 255, 255))
+        tempo_ms = 0
+        emitidos = 0
         try:
-            img = Image.open(caminho_entrada)
-            frames = []
+            for frame, duracao in self._iterar_frames(img):
+                tempo_ms += duracao
+                repeticoes = round(tempo_ms * self.FPS_MP4 / 1000) - emitidos
+                if emitidos == 0:
+                    repeticoes = max(1, repeticoes)
+                if repeticoes <= 0:
+                    continue
+                dados = Image.alpha_composite(fundo, frame).convert("RGB").tobytes()
+                for _ in range(repeticoes):
+                    processo.stdin.write(dados)
+                emitidos += repeticoes
+        except BrokenPipeError:
+            pass  # ffmpeg saiu antes; o erro vem no stderr
+        except BaseException:
+            # Falha do nosso lado (frame corrompido, Ctrl+C): não deixa o MP4 ser finalizado
+            processo.kill()
+            raise
+        finally:
+            # Sem fechar o stdin o ffmpeg espera mais frames e o read abaixo trava
             try:
-                while True:
-                    frames.append(img.copy())
-                    img.seek(img.tell() + 1)
-            except EOFError:
+                processo.stdin.close()
+            except BrokenPipeError:
                 pass
+            erro = processo.stderr.read().decode(errors="replace").strip()
+            processo.wait()
 
-            if frames:
-                frames[0].save(
-                    caminho_gif,
-                    save_all=True,
-                    append_images=frames[1:],
-                    duration=img.info.get("duration", 100),
-                    loop=img.info.get("loop", 0),
-                )
-                print(f"   🎬 Animação convertida para GIF: {caminho_gif.name}")
-                return True
-        except Exception as e:
-            print(f"   ⚠️  Erro ao converter animação: {e}")
-            return False
+        if processo.returncode != 0:
+            return False, f"ffmpeg falhou: {erro.splitlines()[-1] if erro else processo.returncode}"
+        return True, f"animação convertida para MP4 ({emitidos} frames): {caminho_mp4.name}"
+
+    def _converter_animacao(self, img: Image.Image, caminho_saida: Path) -> Tuple[bool, str]:
+        """
+        Converte WebP animado para GIF ou MP4 (conforme formato_animacao).
 
-        return False
+        Args:
+            img: WebP animado já aberto.
+            caminho_saida: Caminho de saída (a extensão é trocada).
+
+        Returns:
+            Tuple[bool, str]: (sucesso, mensagem)
+        """
+        if self.formato_animacao == "mp4":
+            caminho = caminho_saida.with_suffix(".mp4")
+            converter = self._animacao_para_mp4
+        else:
+            caminho = caminho_saida.with_suffix(".gif")
+            converter = self._animacao_para_gif
+
+        try:
+            sucesso, mensagem = converter(img, caminho)
+        except Exception as e:
+            sucesso, mensagem = False, f"erro ao converter animação: {e}"
+        if not sucesso and caminho.exists():
+            caminho.unlink()
+        return sucesso, mensagem
 
     def _converter_imagem(self, caminho_entrada: Path, caminho_saida: Path) -> Tuple[bool, str]:
         """
         Converte uma imagem WebP para JPG.
 
+        O arquivo é aberto uma única vez: detecção de animação, análise de
+        qualidade e conversão usam o mesmo handle.
+
         Args:
             caminho_entrada: Caminho do arquivo WebP.
             caminho_saida: Caminho do arquivo JPG de saída.
@@ -169,40 +248,41 @@ class ConversorWebP:
             Tuple[bool, str]: (sucesso, mensagem)
         """
         try:
-            # Verifica se é animado
-            if self._eh_animado(caminho_entrada):
-                if self.suporte_animacoes:
-                    if self._converter_animacao(caminho_entrada, caminho_saida):
-                        return True, "animação convertida"
-                    return False, "erro ao converter animação"
-                return False, "WebP animado detectado (use suporte_animacoes=True)"
-
-            # Analisa qualidade se solicitado
-            qualidade_usar = self.qualidade
-            info_qualidade = {}
-            if self.preservar_qualidade:
-                qualidade_usar, info_qualidade = self._analisar_qualidade(caminho_entrada)
-
-            img = Image.open(caminho_entrada)
-
-            # O WebP pode ter transparência (RGBA). O JPG não aceita (só RGB).
-            if img.mode in ("RGBA", "LA"):
-                # Cria um fundo branco
-                fundo = Image.new(img.mode[:-1], img.size, (255, 255, 255))
-                # Cola a imagem original por cima do fundo branco usando a máscara de transparência
-                fundo.paste(img, img.split()[-1])
-                img = fundo
-
-            # Converte para RGB simples
-            img = img.convert("RGB")
-
-            # Salva como JPG com qualidade otimizada
-            img.save(
-                caminho_saida,
-                "JPEG",
-                quality=qualidade_usar,
-                subsampling=0,  # Mantém fidelidade das cores
-            )
+            with Image.open(caminho_entrada) as img:
+                # Verifica se é animado
+                if self._eh_animado(img):
+                    if self.suporte_animacoes:
+                        return self._converter_animacao(img, caminho_saida)
+                    return False, "WebP animado detectado (use suporte_animacoes=True)"
+
+                # Analisa qualidade se solicitado
+                qualidade_usar = self.qualidade
+                info_qualidade = {}
+                if self.preservar_qualidade:
+                    qualidade_usar, info_qualidade = self._analisar_qualidade(
+                        img, caminho_entrada.stat().st_size
+                    )
+
+                # O WebP pode ter transparência (RGBA). O JPG não aceita (só RGB).
+                if img.mode in ("RGBA", "LA"):
+                    # Cria um fundo branco
+                    fundo = Image.new(img.mode[:-1], img.size, (255, 255, 255))
+                    # Cola a imagem original por cima do fundo branco usando a máscara de transparência
+                    fundo.paste(img, img.split()[-1])
+                    convertida = fundo
+                else:
+                    convertida = img
+
+                # Converte para RGB simples
+                convertida = convertida.convert("RGB")
+
+                # Salva como JPG com qualidade otimizada
+                convertida.save(
+                    caminho_saida,
+                    "JPEG",
+                    quality=qualidade_usar,
+                    subsampling=0,  # Mantém fidelidade das cores
+                )
 
             mensagem = ""
             if self.preservar_qualidade and info_qualidade:
@@ -212,6 +292,10 @@ class ConversorWebP:
         except Exception as e:
             return False, str(e)
 
+    def _converter_para_pasta(self, arquivo: Path, pasta_saida: Path) -> Tuple[bool, str]:
+        """Converte um WebP para `pasta_saida/<nome>.jpg` (executado nos workers)."""
+        return self._converter_imagem(arquivo, pasta_saida / (arquivo.stem + ".jpg"))
+
     def processar(self) -> dict:
         """
         Processa todos os arquivos WebP na pasta de entrada.
@@ -242,15 +326,16 @@ class ConversorWebP:
         sucessos = 0
         falhas = 0
 
+        converter = partial(self._converter_para_pasta, pasta_saida=pasta_saida)
+
         # Barra de progresso
         with ProgressBar(
             total=len(arquivos), desc="Convertendo", unit="arquivo"
         ).context() as pbar:
-            for arquivo in arquivos:
-                nome_jpg = arquivo.stem + ".jpg"
-                caminho_destino = pasta_saida / nome_jpg
-
-                sucesso, mensagem = self._converter_imagem(arquivo, caminho_destino)
+            for arquivo, resultado in executar_em_processos(
+                converter, arquivos, self.workers
+            ):
+                sucesso, mensagem = resultado or (False, "falha no processo de trabalho")
 
                 if sucesso:
                     if mensagem:
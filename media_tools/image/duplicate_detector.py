@@ -2,12 +2,26 @@
 Detector de imagens duplicadas.
 """
 
-import hashlib
+import os
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import List
 
+import numpy as np
+
+from ..common.grouping import agrupar_conectados
+from ..common.hamming import distancia_hamming, pares_proximos, popcount64
+from ..common.hashing import conteudo_identico, encontrar_identicos
+from ..common.library_index import IndiceBiblioteca
 from ..common.paths import obter_pastas_entrada_saida
 from ..common.progress import ProgressBar
+from ..common.scanner import mapear_paralelo, percorrer_arquivos
+from .fingerprint import (
+    LIMIAR_HAMMING_IMAGEM,
+    LIMIAR_PHASH,
+    MIN_BITS_HASH_IMAGEM,
+    hashes_imagem,
+    impressao_imagem,
+)
 
 
 class DetectorDuplicatasImagens:
@@ -21,6 +35,8 @@ class DetectorDuplicatasImagens:
         self,
         pasta_origem: Path = None,
         remover_automaticamente: bool = False,
+        perceptual: bool = False,
+        leitores_por_dispositivo: int = 4,
     ):
         """
         Inicializa o detector.
@@ -28,6 +44,10 @@ class DetectorDuplicatasImagens:
         Args:
             pasta_origem: Pasta com imagens para verificar (None = padrão).
             remover_automaticamente: Se True, remove duplicatas automaticamente.
+            perceptual: Se True, agrupa também cópias redimensionadas,
+                        recomprimidas ou convertidas (pHash + dHash).
+            leitores_por_dispositivo: Threads de leitura por disco — fotos são
+                                      pequenas, então a latência domina (NAS: 8+).
         """
         if pasta_origem is None:
             entrada, _ = obter_pastas_entrada_saida("imagens")
@@ -36,25 +56,8 @@ class DetectorDuplicatasImagens:
             self.pasta_origem = pasta_origem
 
         self.remover_automaticamente = remover_automaticamente
-
-    def _calcular_hash_arquivo(self, caminho: Path) -> str:
-        """
-        Calcula hash MD5 do arquivo.
-
-        Args:
-            caminho: Caminho do arquivo.
-
-        Returns:
-            str: Hash MD5.
-        """
-        hash_md5 = hashlib.md5()
-        try:
-            with open(caminho, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        except Exception:
-            return ""
+        self.perceptual = perceptual
+        self.leitores_por_dispositivo = leitores_por_dispositivo
 
     def processar(self) -> dict:
         """
@@ -69,33 +72,32 @@ class DetectorDuplicatasImagens:
             print(f"❌ Erro: Pasta não encontrada: {pasta_origem}")
             return {"duplicatas": 0, "removidos": 0}
 
-        arquivos = [
-            f
-            for f in pasta_origem.iterdir()
-            if f.is_file() and f.suffix.lower() in self.EXTENSOES_VALIDAS
-        ]
+        arquivos = list(percorrer_arquivos(pasta_origem, self.EXTENSOES_VALIDAS, recursivo=False))
 
         if len(arquivos) < 2:
             print("ℹ️  É necessário pelo menos 2 imagens para detectar duplicatas.")
             return {"duplicatas": 0, "removidos": 0}
 
+        if self.perceptual:
+            return self._processar_perceptual(arquivos)
+
         print(f"🚀 Analisando {len(arquivos)} imagem(ns) para duplicatas...")
+        print("   (Tamanho → cabeçalho → amostras → BLAKE2 completo)")
         print("-" * 60)
 
-        # Mapa de hash -> lista de arquivos
-        hash_map: Dict[str, List[Path]] = {}
+        def _relatar_estagio(estagio: str, candidatos: int) -> None:
+            print(f"   🔎 {estagio:<10} {candidatos} candidato(s)")
 
-        # Calcula hashes
-        with ProgressBar(
-            total=len(arquivos), desc="Calculando hashes", unit="img"
-        ).context() as pbar:
-            for arquivo in arquivos:
-                hash_val = self._calcular_hash_arquivo(arquivo)
-                if hash_val:
-                    if hash_val not in hash_map:
-                        hash_map[hash_val] = []
-                    hash_map[hash_val].append(arquivo)
-                pbar.update(1)
+        # Só arquivos com tamanho repetido são lidos; leitura em blocos de 1 MB
+        # por um pool de threads por disco. O hash completo é sempre feito:
+        # imagens até 4 MB já foram lidas inteiras nas amostras, e scans
+        # maiores (BMP/TIFF/PNG) podem diferir fora dos blocos amostrados
+        grupos = encontrar_identicos(
+            arquivos,
+            confirmar_completo=True,
+            leitores_por_dispositivo=self.leitores_por_dispositivo,
+            ao_concluir_estagio=_relatar_estagio,
+        )
 
         # Encontra duplicatas
         duplicatas_encontradas = 0
@@ -104,7 +106,7 @@ class DetectorDuplicatasImagens:
         print("\n📊 Analisando resultados...")
         print("-" * 60)
 
-        for hash_val, arquivos_duplicados in hash_map.items():
+        for arquivos_duplicados in grupos:
             if len(arquivos_duplicados) > 1:
                 duplicatas_encontradas += len(arquivos_duplicados) - 1
 
@@ -138,3 +140,220 @@ class DetectorDuplicatasImagens:
 
         return {"duplicatas": duplicatas_encontradas, "removidos": removidos}
 
+    def _processar_perceptual(self, arquivos: List[Path]) -> dict:
+        """
+        Agrupa imagens visualmente iguais (redimensionadas, recomprimidas,
+        convertidas de formato).
+
+        1. pHash + dHash de cada imagem, decodificada reduzida, em paralelo;
+           imagens lisas/em branco (pHash quase sem bits) ficam de fora.
+        2. Pares com pHash a ≤ LIMIAR_PHASH bits (multi-index hashing, sem O(n²)).
+        3. Confirmação pelo dHash e agrupamento por componentes conectados.
+        4. Em cada grupo mantém a maior resolução (empate: maior arquivo); só
+           é duplicata quem está dentro dos dois limiares do mantido — o
+           agrupamento é transitivo e pode juntar imagens mais distantes.
+
+        Returns:
+            dict: Estatísticas do processamento.
+        """
+        print(f"🚀 Analisando {len(arquivos)} imagem(ns) por hash perceptual...")
+        print(f"   (pHash ≤ {LIMIAR_PHASH} bits, confirmado por dHash ≤ {LIMIAR_HAMMING_IMAGEM} bits)")
+        print("-" * 60)
+
+        caminhos: List[Path] = []
+        infos: List[dict] = []
+        with ProgressBar(
+            total=len(arquivos), desc="Calculando hashes", unit="img"
+        ).context() as pbar:
+            for arquivo, info in mapear_paralelo(hashes_imagem, arquivos, os.cpu_count() or 4):
+                if info is not None:
+                    caminhos.append(arquivo)
+                    infos.append(info)
+                pbar.update(1)
+
+        phashes = np.array([info["phash"] for info in infos], dtype=np.uint64)
+        dhashes = np.array([info["dhash"] for info in infos], dtype=np.uint64)
+
+        # Imagens lisas, em branco ou só gradiente dividem o mesmo pHash
+        bits = popcount64(phashes)
+        comparaveis = np.flatnonzero((bits >= MIN_BITS_HASH_IMAGEM) & (bits <= 64 - MIN_BITS_HASH_IMAGEM))
+        sem_detalhe = len(infos) - len(comparaveis)
+
+        pares = comparaveis[pares_proximos(phashes[comparaveis], LIMIAR_PHASH)]
+        if len(pares):
+            confirmados = distancia_hamming(dhashes[pares[:, 0]], dhashes[pares[:, 1]]) <= LIMIAR_HAMMING_IMAGEM
+            pares = pares[confirmados]
+
+        duplicatas_encontradas = 0
+        removidos = 0
+
+        print("\n📊 Analisando resultados...")
+        print("-" * 60)
+
+        grupos = agrupar_conectados(map(tuple, pares.tolist()))
+        for grupo in sorted(grupos, key=lambda g: min(caminhos[i] for i in g)):
+            # Mantém a maior resolução; empate → maior arquivo
+            grupo.sort(
+                key=lambda i: (infos[i]["largura"] * infos[i]["altura"], infos[i]["tamanho"]),
+                reverse=True,
+            )
+            original, outros = grupo[0], np.array(grupo[1:])
+
+            # Só é duplicata quem está perto do mantido (não só de outro membro)
+            perto = (
+                (distancia_hamming(phashes[outros], phashes[original]) <= LIMIAR_PHASH)
+                & (distancia_hamming(dhashes[outros], dhashes[original]) <= LIMIAR_HAMMING_IMAGEM)
+            )
+            duplicados = outros[perto].tolist()
+            duplicatas_encontradas += len(duplicados)
+
+            info = infos[original]
+            print(f"\n🔍 Imagens iguais ({len(grupo)} arquivos):")
+            print(f"   ✅ Mantido: {caminhos[original].name} ({info['largura']}x{info['altura']})")
+            for parecida in outros[~perto].tolist():
+                info_par = infos[parecida]
+                print(f"   ≈ Parecida (longe do mantido, não removida): {caminhos[parecida].name} "
+                      f"({info_par['largura']}x{info_par['altura']})")
+            for dup in duplicados:
+                info_dup = infos[dup]
+                print(f"   ❌ Duplicata: {caminhos[dup].name} ({info_dup['largura']}x{info_dup['altura']})")
+                if self.remover_automaticamente:
+                    try:
+                        caminhos[dup].unlink()
+                        print(f"      🗑️  Removido")
+                        removidos += 1
+                    except Exception as e:
+                        print(f"      ⚠️  Erro ao remover: {e}")
+
+        print("\n" + "=" * 60)
+        print("📊 RESUMO")
+        print("-" * 60)
+        print(f"🔍 Duplicatas perceptuais: {duplicatas_encontradas}")
+        if sem_detalhe:
+            print(f"⬜ Sem detalhe para comparar (lisas/em branco): {sem_detalhe}")
+        if len(infos) < len(arquivos):
+            print(f"⚠️  Não foi possível ler: {len(arquivos) - len(infos)}")
+        if self.remover_automaticamente:
+            print(f"🗑️  Arquivos removidos: {removidos}")
+        else:
+            print("💡 Use --remover para remover duplicatas automaticamente")
+        print("-" * 60)
+
+        return {"duplicatas": duplicatas_encontradas, "removidos": removidos}
+
+    def indexar_biblioteca(self, indice: IndiceBiblioteca, pasta: Path = None) -> dict:
+        """
+        Adiciona/atualiza a biblioteca no índice (só arquivos novos ou alterados).
+
+        Args:
+            indice: Índice persistente.
+            pasta: Pasta da biblioteca (None = saida/imagens, com subpastas).
+
+        Returns:
+            dict: Estatísticas da sincronização.
+        """
+        if pasta is None:
+            _, pasta = obter_pastas_entrada_saida("imagens")
+        pasta = Path(pasta).resolve()
+        if not pasta.exists():
+            print(f"❌ Erro: Pasta não encontrada: {pasta}")
+            return {}
+
+        print(f"📚 Indexando biblioteca: {pasta}")
+        estatisticas = indice.sincronizar(
+            pasta,
+            percorrer_arquivos(pasta, self.EXTENSOES_VALIDAS),
+            "imagem",
+            impressao_imagem,
+            workers=os.cpu_count() or 4,
+            ao_progresso=lambda n: print(f"\r   {n} imagem(ns) lida(s)", end="", flush=True),
+        )
+        print(
+            f"\r   ✅ {estatisticas['novos']} nova(s), {estatisticas['atualizados']} atualizada(s), "
+            f"{estatisticas['inalterados']} inalterada(s), {estatisticas['removidos']} removida(s) do índice"
+        )
+        if estatisticas["falhas"]:
+            print(f"   ⚠️  {estatisticas['falhas']} arquivo(s) não puderam ser lidos")
+        return estatisticas
+
+    def comparar_com_biblioteca(self, indice: IndiceBiblioteca) -> dict:
+        """
+        Checa as imagens da pasta de origem contra a biblioteca indexada.
+
+        Só as imagens novas são lidas — a biblioteca é consultada pelo índice.
+        O hash do índice é amostrado, então cada correspondência exata é
+        confirmada byte a byte contra o arquivo da biblioteca. Com
+        remover_automaticamente, remove as cópias exatas (as parecidas são
+        apenas reportadas).
+
+        Returns:
+            dict: Estatísticas do processamento.
+        """
+        pasta_origem = Path(self.pasta_origem).resolve()
+        if not pasta_origem.exists():
+            print(f"❌ Erro: Pasta não encontrada: {pasta_origem}")
+            return {"duplicatas": 0, "similares": 0, "removidos": 0}
+
+        arquivos = [
+            f
+            for f in pasta_origem.iterdir()
+            if f.is_file() and f.suffix.lower() in self.EXTENSOES_VALIDAS
+        ]
+        print(f"🚀 Comparando {len(arquivos)} imagem(ns) com a biblioteca ({indice.total('imagem')} indexadas)...")
+        print("-" * 60)
+
+        duplicatas = 0
+        similares = 0
+        removidos = 0
+        for arquivo, impressao, correspondencias in indice.verificar_arquivos(
+            arquivos,
+            "imagem",
+            impressao_imagem,
+            workers=os.cpu_count() or 4,
+            limiar_hamming=LIMIAR_HAMMING_IMAGEM,
+            sondar_vizinhos=True,
+        ):
+            if impressao is None:
+                print(f"   ⚠️  {arquivo.name}: não foi possível ler")
+                continue
+            if not correspondencias:
+                continue
+
+            exatas = [c for c in correspondencias if c["correspondencia"] == "exata"]
+            if exatas:
+                confirmadas = [c for c in exatas if conteudo_identico(arquivo, c["caminho"])]
+                for c in exatas:
+                    if c not in confirmadas:
+                        print(f"\n⚠️  {arquivo.name}: mesmo hash amostrado que {c['caminho']}, mas o conteúdo difere")
+                correspondencias = [c for c in correspondencias if c not in exatas]
+                exatas = confirmadas
+            if exatas:
+                duplicatas += 1
+                print(f"\n❌ {arquivo.name} já está na biblioteca:")
+                print(f"   ✅ {exatas[0]['caminho']}")
+                if self.remover_automaticamente:
+                    try:
+                        arquivo.unlink()
+                        print(f"      🗑️  Removido")
+                        removidos += 1
+                    except Exception as e:
+                        print(f"      ⚠️  Erro ao remover: {e}")
+                continue
+            if not correspondencias:
+                continue
+
+            similares += 1
+            print(f"\n🔍 {arquivo.name} ({impressao['largura']}x{impressao['altura']}) parece com:")
+            for c in correspondencias[:5]:
+                print(f"   ≈ {c['caminho']} ({c['largura']}x{c['altura']})")
+
+        print("\n" + "=" * 60)
+        print("📊 RESUMO")
+        print("-" * 60)
+        print(f"🔍 Já na biblioteca (exatas): {duplicatas}")
+        print(f"≈  Parecidas com a biblioteca: {similares}")
+        if self.remover_automaticamente:
+            print(f"🗑️  Arquivos removidos: {removidos}")
+        print("-" * 60)
+
+        return {"duplicatas": duplicatas, "similares": similares, "removidos": removidos}
@@ -0,0 +1,116 @@
+"""
+Hashes perceptuais de imagem (pHash e dHash, 64 bits cada).
+
+Os dois saem da mesma decodificação reduzida: JPEGs usam Image.draft, que
+decodifica direto em 1/2, 1/4 ou 1/8 da resolução — os hashes só precisam
+de 32x32 pixels, então não há por que montar a imagem inteira.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import imagehash
+import numpy as np
+from PIL import Image
+
+from ..common.hashing import hash_amostras
+
+# dHash 9x8 → 64 bits
+LARGURA_HASH = 9
+ALTURA_HASH = 8
+
+# pHash: DCT de 32x32, 8x8 coeficientes de baixa frequência → 64 bits
+LADO_PHASH = 32
+
+# Distância de Hamming máxima (dHash) para duas imagens serem "a mesma"
+LIMIAR_HAMMING_IMAGEM = 10
+
+# Distância máxima de pHash no agrupamento (≤ 7 → busca exata com 4 pedaços)
+LIMIAR_PHASH = 7
+
+# pHash com menos bits ligados (ou desligados) que isso vem de imagem lisa,
+# em branco ou só gradiente — todas caem no mesmo hash e não são comparáveis
+MIN_BITS_HASH_IMAGEM = 6
+
+
+def _bits_para_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def _abrir_reduzida(caminho: Path) -> Optional[Tuple[Image.Image, int, int]]:
+    """Imagem em cinza, decodificada o mais reduzida possível (≥ 32x32)."""
+    try:
+        with Image.open(caminho) as img:
+            largura, altura = img.size
+            img.draft("L", (LADO_PHASH * 2, LADO_PHASH * 2))
+            return img.convert("L"), largura, altura
+    except Exception:
+        return None
+
+
+def _dhash(reduzida: Image.Image) -> int:
+    """dHash: cada bit = pixel mais claro que o vizinho da direita."""
+    pixels = np.asarray(reduzida.resize((LARGURA_HASH, ALTURA_HASH), Image.BILINEAR), dtype=np.int16)
+    return _bits_para_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def dhash_imagem(caminho: Path) -> Optional[Tuple[int, int, int]]:
+    """
+    dHash da imagem.
+
+    Returns:
+        (hash, largura, altura) com as dimensões originais, ou None se a
+        imagem não puder ser lida.
+    """
+    aberta = _abrir_reduzida(caminho)
+    if aberta is None:
+        return None
+    reduzida, largura, altura = aberta
+    return _dhash(reduzida), largura, altura
+
+
+def hashes_imagem(caminho: Path) -> Optional[Dict]:
+    """
+    pHash + dHash de uma única decodificação reduzida.
+
+    Returns:
+        dict com phash, dhash, largura, altura (originais) e tamanho,
+        ou None se a imagem não puder ser lida.
+    """
+    aberta = _abrir_reduzida(caminho)
+    if aberta is None:
+        return None
+    reduzida, largura, altura = aberta
+    try:
+        phash = _bits_para_int(imagehash.phash(reduzida).hash)
+        tamanho = caminho.stat().st_size
+    except Exception:
+        return None
+    return {
+        "phash": phash,
+        "dhash": _dhash(reduzida),
+        "largura": largura,
+        "altura": altura,
+        "tamanho": tamanho,
+    }
+
+
+def impressao_imagem(caminho: Path) -> Optional[Dict]:
+    """
+    Impressão para o índice da biblioteca: hash exato (amostrado) + dHash.
+
+    Returns:
+        dict com hash_exato, quadros (1 hash), validos, largura, altura e
+        duracao — ou None se o arquivo não puder ser lido.
+    """
+    hash_exato = hash_amostras(caminho)
+    if hash_exato is None:
+        return None
+    perceptual = dhash_imagem(caminho)
+    impressao = {"hash_exato": hash_exato, "quadros": None, "validos": None,
+                 "largura": 0, "altura": 0, "duracao": 0.0}
+    if perceptual is not None:
+        valor, impressao["largura"], impressao["altura"] = perceptual
+        impressao["quadros"] = np.array([valor], dtype=np.uint64)
+        impressao["validos"] = np.ones(1, dtype=bool)
+    return impressao
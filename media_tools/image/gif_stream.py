@@ -0,0 +1,148 @@
+"""
+Escrita de GIF animado frame a frame, com memória constante.
+
+O `save(save_all=True)` do Pillow guarda todos os frames antes de gravar.
+Aqui o cabeçalho é gravado uma vez e cada frame é quantizado com a própria
+paleta (tabela de cores local), codificado e despejado no arquivo assim que
+chega — a compressão LZW continua sendo a do Pillow (C), extraída de um GIF
+de um frame só.
+"""
+
+import io
+import struct
+from pathlib import Path
+
+from PIL import Image
+
+# Alfa abaixo disso vira transparente (GIF só tem transparência binária)
+LIMIAR_ALFA = 128
+
+
+def _pular_sub_blocos(dados: bytes, pos: int) -> int:
+    """Avança sobre uma sequência de sub-blocos GIF (terminada por bloco vazio)."""
+    while dados[pos]:
+        pos += dados[pos] + 1
+    return pos + 1
+
+
+def _bloco_imagem(dados: bytes) -> bytes:
+    """
+    Descritor de imagem + dados LZW do primeiro frame de um GIF.
+
+    A tabela global do arquivo (a paleta do frame) vira a tabela local do
+    descritor, para o bloco poder entrar em outro GIF.
+    """
+    flags = dados[10]
+    pos = 13
+    tabela = b""
+    if flags & 0x80:
+        tabela = dados[pos:pos + (3 << ((flags & 0x07) + 1))]
+        pos += len(tabela)
+    while pos < len(dados):
+        marcador = dados[pos]
+        if marcador == 0x21:  # extensão
+            pos = _pular_sub_blocos(dados, pos + 2)
+        elif marcador == 0x2C:  # descritor de imagem
+            inicio = pos
+            flags_imagem = dados[pos + 9]
+            pos += 10
+            if flags_imagem & 0x80 or not tabela:
+                # Já tem tabela local (ou não há o que mover)
+                if flags_imagem & 0x80:
+                    pos += 3 << ((flags_imagem & 0x07) + 1)
+                fim = _pular_sub_blocos(dados, pos + 1)  # +1: tamanho mínimo do código LZW
+                return dados[inicio:fim]
+            fim = _pular_sub_blocos(dados, pos + 1)
+            # Mantém o entrelaçamento (0x40); liga a tabela local com o tamanho da global
+            flags_local = (flags_imagem & 0x40) | 0x80 | (flags & 0x07)
+            return dados[inicio:inicio + 9] + bytes([flags_local]) + tabela + dados[pos:fim]
+        else:
+            break
+    raise ValueError("GIF sem bloco de imagem")
+
+
+class EscritorGif:
+    """
+    GIF animado gravado incrementalmente.
+
+    Cada frame leva a própria paleta (até 256 cores; com transparência, 255
+    mais o índice transparente logo depois delas): fades e trocas de cena
+    mantêm a fidelidade sem uma passada prévia pela animação.
+    """
+
+    def __init__(self, caminho: Path, largura: int, altura: int, loop: int = 0,
+                 transparencia: bool = False):
+        """
+        Args:
+            caminho: Arquivo GIF de saída.
+            largura: Largura do canvas.
+            altura: Altura do canvas.
+            loop: Repetições (0 = infinito).
+            transparencia: Pixels com alfa < LIMIAR_ALFA ficam transparentes.
+        """
+        self.caminho = Path(caminho)
+        self.tamanho = (largura, altura)
+        self.loop = loop
+        self.transparencia = transparencia
+        self.frames = 0
+        self._tempo_ms = 0
+        self._tempo_cs = 0
+        self._arquivo = open(self.caminho, "wb")
+        self._iniciar()
+
+    def _iniciar(self) -> None:
+        """Grava o cabeçalho: tela lógica sem tabela global e repetições."""
+        largura, altura = self.tamanho
+        self._arquivo.write(b"GIF89a")
+        # Tela lógica: sem tabela global (cada frame tem a sua), resolução de cor 8 bits
+        self._arquivo.write(struct.pack("<HHBBB", largura, altura, 0x70, 0, 0))
+        # NETSCAPE2.0: número de repetições
+        self._arquivo.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01")
+        self._arquivo.write(struct.pack("<H", self.loop) + b"\x00")
+
+    def adicionar(self, frame: Image.Image, duracao_ms: int) -> None:
+        """
+        Quantiza o frame com paleta própria e grava no arquivo.
+
+        Args:
+            frame: Frame RGB ou RGBA do tamanho do canvas.
+            duracao_ms: Duração do frame em milissegundos.
+        """
+        transparente = self.transparencia and frame.mode == "RGBA"
+        indices = frame.convert("RGB").quantize(colors=255 if transparente else 256)
+
+        indice_transparente = 0
+        if transparente:
+            # Índice transparente logo após as cores usadas, com cor de enchimento
+            cores = indices.getpalette() or []
+            indice_transparente = len(cores) // 3
+            indices.putpalette(cores + [0, 0, 0])
+            mascara = frame.getchannel("A").point(lambda a: 255 if a < LIMIAR_ALFA else 0)
+            indices.paste(indice_transparente, mask=mascara)
+
+        buffer = io.BytesIO()
+        indices.save(buffer, "GIF", optimize=False)
+
+        # Atraso em centésimos acumulado, para o erro de arredondamento não somar
+        self._tempo_ms += max(0, int(duracao_ms))
+        tempo_cs = round(self._tempo_ms / 10)
+        atraso, self._tempo_cs = tempo_cs - self._tempo_cs, tempo_cs
+
+        # Com transparência, cada frame é completo: limpa o anterior (disposal 2)
+        if self.transparencia:
+            flags = (2 << 2) | (0x01 if transparente else 0)
+        else:
+            flags = 1 << 2
+        self._arquivo.write(
+            b"\x21\xf9\x04"
+            + struct.pack("<BHB", flags, atraso, indice_transparente)
+            + b"\x00"
+        )
+        self._arquivo.write(_bloco_imagem(buffer.getvalue()))
+        self.frames += 1
+
+    def fechar(self) -> None:
+        """Grava o terminador e fecha o arquivo."""
+        if not self._arquivo.closed:
+            self._arquivo.write(b";")
+            self._arquivo.close()
@@ -0,0 +1,171 @@
+"""
+Reescrita de metadados JPEG sem decodificar pixels.
+
+Percorre os segmentos de marcador até o primeiro SOS, descarta os APPn e
+COM indesejados e copia o restante do arquivo (dados entrópicos, scans
+progressivos, EOI) byte a byte. Sem perda de geração: os pixels são
+exatamente os da origem.
+"""
+
+import shutil
+import struct
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+SOI = 0xD8
+SOS = 0xDA
+COM = 0xFE
+APP0 = 0xE0
+APP1 = 0xE1
+APP2 = 0xE2
+APP14 = 0xEE
+APP15 = 0xEF
+
+# Assinaturas no início do payload de cada APPn
+ASSINATURA_EXIF = b"Exif\x00\x00"
+ASSINATURA_ICC = b"ICC_PROFILE\x00"
+ASSINATURA_JFIF = b"JFIF\x00"
+ASSINATURA_ADOBE = b"Adobe"
+
+# Tag TIFF de orientação no IFD0
+TAG_ORIENTACAO = 0x0112
+
+
+def _ler_segmentos(f: BinaryIO) -> Iterator[Tuple[int, bytes]]:
+    """
+    Gera (marcador, payload) de cada segmento até o SOS, inclusive.
+
+    Ao terminar, o arquivo está posicionado logo após o cabeçalho do SOS.
+
+    Raises:
+        ValueError: Se a estrutura não for de um JPEG válido.
+    """
+    if f.read(2) != b"\xff\xd8":
+        raise ValueError("não é JPEG (SOI ausente)")
+
+    while True:
+        byte = f.read(1)
+        if byte != b"\xff":
+            raise ValueError("marcador esperado")
+        # Bytes 0xFF extras são preenchimento permitido antes do marcador
+        marcador = 0xFF
+        while marcador == 0xFF:
+            lido = f.read(1)
+            if not lido:
+                raise ValueError("arquivo truncado")
+            marcador = lido[0]
+
+        cabecalho = f.read(2)
+        if len(cabecalho) != 2:
+            raise ValueError("arquivo truncado")
+        (comprimento,) = struct.unpack(">H", cabecalho)
+        if comprimento < 2:
+            raise ValueError("segmento com comprimento inválido")
+        payload = f.read(comprimento - 2)
+        if len(payload) != comprimento - 2:
+            raise ValueError("arquivo truncado")
+
+        yield marcador, payload
+        if marcador == SOS:
+            return
+
+
+def _orientacao_exif(payload: bytes) -> Optional[int]:
+    """Orientação (1-8) do IFD0 de um APP1 EXIF, ou None."""
+    tiff = payload[len(ASSINATURA_EXIF):]
+    if len(tiff) < 8 or tiff[:2] not in (b"II", b"MM"):
+        return None
+    ordem = "<" if tiff[:2] == b"II" else ">"
+    try:
+        (offset_ifd,) = struct.unpack(ordem + "I", tiff[4:8])
+        (entradas,) = struct.unpack(ordem + "H", tiff[offset_ifd:offset_ifd + 2])
+        for i in range(entradas):
+            inicio = offset_ifd + 2 + i * 12
+            tag, tipo, _, valor = struct.unpack(ordem + "HHIH", tiff[inicio:inicio + 10])
+            if tag == TAG_ORIENTACAO and tipo == 3:
+                return valor if 1 <= valor <= 8 else None
+    except struct.error:
+        return None
+    return None
+
+
+def _app1_orientacao(orientacao: int) -> bytes:
+    """Payload APP1 EXIF mínimo: um IFD0 só com a orientação."""
+    return (
+        ASSINATURA_EXIF
+        + b"II*\x00\x08\x00\x00\x00"  # TIFF little-endian, IFD0 no offset 8
+        + struct.pack("<H", 1)
+        + struct.pack("<HHIHH", TAG_ORIENTACAO, 3, 1, orientacao, 0)
+        + struct.pack("<I", 0)  # sem IFD1 (miniatura)
+    )
+
+
+def _segmento(marcador: int, payload: bytes) -> bytes:
+    return struct.pack(">BBH", 0xFF, marcador, len(payload) + 2) + payload
+
+
+def reescrever_jpeg(
+    origem: Path,
+    destino: Path,
+    manter_exif: bool = False,
+    manter_orientacao: bool = True,
+    manter_icc: bool = True,
+) -> bool:
+    """
+    Copia o JPEG removendo metadados, sem decodificar nem recomprimir.
+
+    Sempre mantém JFIF (APP0), Adobe (APP14, define a transformação de cor
+    de CMYK/YCCK) e todos os marcadores que não são APPn/COM. Descarta XMP,
+    IPTC/Photoshop, MPF, comentários e outros APPn.
+
+    Args:
+        origem: JPEG de entrada.
+        destino: Arquivo de saída (sobrescrito).
+        manter_exif: Mantém o APP1 EXIF inteiro (GPS e miniatura inclusos).
+        manter_orientacao: Sem o EXIF, grava um EXIF mínimo só com a orientação
+                           (se for diferente de 1).
+        manter_icc: Mantém o perfil de cor ICC (APP2, pode ocupar vários segmentos).
+
+    Returns:
+        bool: True se gravou; False se a origem não pôde ser lida como JPEG
+        (nada é deixado no destino).
+    """
+    try:
+        with open(origem, "rb") as entrada, open(destino, "wb") as saida:
+            saida.write(b"\xff\xd8")
+            orientacao_pendente = None
+
+            for marcador, payload in _ler_segmentos(entrada):
+                if marcador == APP1 and payload.startswith(ASSINATURA_EXIF):
+                    if manter_exif:
+                        saida.write(_segmento(marcador, payload))
+                    elif manter_orientacao:
+                        orientacao = _orientacao_exif(payload)
+                        if orientacao and orientacao != 1:
+                            orientacao_pendente = orientacao
+                    continue
+
+                manter = (
+                    not (APP0 <= marcador <= APP15 or marcador == COM)
+                    or (marcador == APP0 and payload.startswith(ASSINATURA_JFIF))
+                    or (marcador == APP14 and payload.startswith(ASSINATURA_ADOBE))
+                    or (marcador == APP2 and manter_icc and payload.startswith(ASSINATURA_ICC))
+                )
+                if not manter:
+                    continue
+
+                # EXIF mínimo entra antes do primeiro segmento que não é APPn
+                if orientacao_pendente and not (APP0 <= marcador <= APP15):
+                    saida.write(_segmento(APP1, _app1_orientacao(orientacao_pendente)))
+                    orientacao_pendente = None
+                saida.write(_segmento(marcador, payload))
+
+            # Dados entrópicos e o que vier depois (outros scans, EOI) sem alteração
+            shutil.copyfileobj(entrada, saida, 1024 * 1024)
+        return True
+    except (OSError, ValueError):
+        try:
+            Path(destino).unlink()
+        except OSError:
+            pass
+        return False
@@ -0,0 +1,186 @@
+"""
+Manifesto persistente do OtimizadorImagens em SQLite.
+
+Cada imagem otimizada grava origem (caminho, tamanho, mtime, hash do
+conteúdo), os parâmetros usados e a saída gerada (caminho, tamanho, mtime,
+hash). Numa nova execução, um stat da origem e da saída basta para pular
+o que já foi otimizado com os mesmos parâmetros. Na corrida de formatos, o
+formato vencedor também fica gravado.
+"""
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+from ..common.paths import obter_diretorio_base
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS otimizadas (
+    origem          TEXT PRIMARY KEY,
+    tamanho         INTEGER NOT NULL,
+    mtime_ns        INTEGER NOT NULL,
+    hash_origem     TEXT NOT NULL,
+    parametros      TEXT NOT NULL,
+    saida           TEXT NOT NULL,
+    tamanho_saida   INTEGER NOT NULL,
+    mtime_saida_ns  INTEGER NOT NULL,
+    hash_saida      TEXT,
+    processado_em   REAL NOT NULL,
+    formato         TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_otimizadas_conteudo
+    ON otimizadas (hash_origem, tamanho, parametros);
+"""
+
+# Colunas adicionadas depois da primeira versão do esquema
+COLUNAS_NOVAS = {"formato": "TEXT"}
+
+# Formato gravado a partir da extensão da saída
+FORMATO_POR_EXTENSAO = {
+    ".jpg": "jpeg",
+    ".jpeg": "jpeg",
+    ".png": "png",
+    ".webp": "webp",
+    ".avif": "avif",
+}
+
+
+def _saida_intacta(saida: str, tamanho_saida: int, mtime_saida_ns: int) -> bool:
+    """A saída ainda existe e não foi modificada desde que foi gravada."""
+    try:
+        st = os.stat(saida)
+    except OSError:
+        return False
+    return st.st_size == tamanho_saida and st.st_mtime_ns == mtime_saida_ns
+
+
+class ManifestoOtimizacao:
+    """
+    Store SQLite origem → saída do otimizador de imagens.
+
+    Uma entrada só vale se os parâmetros forem os mesmos e a saída estiver
+    intacta; origem alterada (tamanho/mtime) cai na busca por conteúdo,
+    que reconhece o mesmo arquivo copiado de novo para a entrada.
+    """
+
+    NOME_BANCO = "manifesto-imagens.db"
+
+    def __init__(self, caminho_banco: Path = None, somente_leitura: bool = False):
+        """
+        Args:
+            caminho_banco: Arquivo SQLite (None = manifesto-imagens.db na raiz do projeto).
+            somente_leitura: Abre sem escrita (consultas nos processos de trabalho).
+        """
+        self.caminho_banco = Path(caminho_banco or obter_diretorio_base() / self.NOME_BANCO)
+        if somente_leitura:
+            self.conexao = sqlite3.connect(f"file:{self.caminho_banco}?mode=ro", uri=True)
+        else:
+            self.caminho_banco.parent.mkdir(parents=True, exist_ok=True)
+            self.conexao = sqlite3.connect(str(self.caminho_banco))
+            self.conexao.execute("PRAGMA journal_mode=WAL")
+            self.conexao.executescript(ESQUEMA)
+            self._migrar()
+
+    def _migrar(self) -> None:
+        """Adiciona colunas novas em bancos criados por versões anteriores."""
+        existentes = {linha[1] for linha in self.conexao.execute("PRAGMA table_info(otimizadas)")}
+        for coluna, tipo in COLUNAS_NOVAS.items():
+            if coluna not in existentes:
+                self.conexao.execute(f"ALTER TABLE otimizadas ADD COLUMN {coluna} {tipo}")
+        self.conexao.commit()
+
+    def fechar(self) -> None:
+        """Fecha a conexão com o banco."""
+        self.conexao.close()
+
+    def consultar_stat(self, origem: Path, st: os.stat_result, parametros: str) -> Optional[Path]:
+        """
+        Verificação barata: mesma origem, mesmo tamanho/mtime, mesmos parâmetros.
+
+        Returns:
+            Path da saída se a imagem já foi otimizada e a saída está intacta.
+        """
+        linha = self.conexao.execute(
+            "SELECT saida, tamanho_saida, mtime_saida_ns FROM otimizadas "
+            "WHERE origem = ? AND tamanho = ? AND mtime_ns = ? AND parametros = ?",
+            (str(origem), st.st_size, st.st_mtime_ns, parametros),
+        ).fetchone()
+        if linha and _saida_intacta(*linha):
+            return Path(linha[0])
+        return None
+
+    def consultar_conteudo(
+        self, hash_origem: str, tamanho: int, parametros: str, saida: Path
+    ) -> bool:
+        """
+        Mesmo conteúdo de origem já otimizado para `saida` com esses parâmetros.
+
+        Returns:
+            True se existe registro e a saída está intacta.
+        """
+        linhas = self.conexao.execute(
+            "SELECT saida, tamanho_saida, mtime_saida_ns FROM otimizadas "
+            "WHERE hash_origem = ? AND tamanho = ? AND parametros = ? AND saida = ?",
+            (hash_origem, tamanho, parametros, str(saida)),
+        ).fetchall()
+        return any(_saida_intacta(*linha) for linha in linhas)
+
+    def consultar_formato(self, hash_origem: str, tamanho: int, parametros: str) -> Optional[str]:
+        """
+        Formato que venceu a corrida para este conteúdo com esses parâmetros.
+
+        Returns:
+            "jpeg", "webp", "avif"... ou None se o conteúdo nunca foi processado.
+        """
+        linha = self.conexao.execute(
+            "SELECT formato FROM otimizadas WHERE hash_origem = ? AND tamanho = ? "
+            "AND parametros = ? AND formato IS NOT NULL ORDER BY processado_em DESC LIMIT 1",
+            (hash_origem, tamanho, parametros),
+        ).fetchone()
+        return linha[0] if linha else None
+
+    def registrar(
+        self,
+        origem: Path,
+        st: os.stat_result,
+        hash_origem: str,
+        parametros: str,
+        saida: Path,
+        hash_saida: Optional[str],
+    ) -> bool:
+        """
+        Grava (ou substitui) o registro de uma origem otimizada.
+
+        Args:
+            origem: Caminho da imagem original.
+            st: stat da origem no momento do processamento.
+            hash_origem: Hash do conteúdo da origem.
+            parametros: Assinatura dos parâmetros do otimizador.
+            saida: Caminho da imagem gerada.
+            hash_saida: Hash do conteúdo da saída (None = mantém o já registrado).
+
+        Returns:
+            bool: True se gravou.
+        """
+        try:
+            st_saida = saida.stat()
+            # Sem hash da saída (origem pulada), reaproveita o de um registro da mesma saída
+            self.conexao.execute(
+                "INSERT OR REPLACE INTO otimizadas (origem, tamanho, mtime_ns, hash_origem, "
+                "parametros, saida, tamanho_saida, mtime_saida_ns, hash_saida, processado_em, "
+                "formato) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, (SELECT hash_saida FROM otimizadas "
+                "WHERE saida = ? AND hash_saida IS NOT NULL LIMIT 1)), ?, ?)",
+                (
+                    str(origem), st.st_size, st.st_mtime_ns, hash_origem, parametros,
+                    str(saida), st_saida.st_size, st_saida.st_mtime_ns, hash_saida,
+                    str(saida), time.time(), FORMATO_POR_EXTENSAO.get(saida.suffix.lower()),
+                ),
+            )
+            self.conexao.commit()
+        except (OSError, sqlite3.Error) as e:
+            print(f"\n   ⚠️  Manifesto não gravado ({origem.name}): {e}")
+            return False
+        return True
@@ -2,11 +2,19 @@
 OCR de imagens - Detecção de texto legível.
 """
 
+import os
 from pathlib import Path
 from typing import Dict, Optional
 
+from ..common.parallel import executar_em_processos
 from ..common.paths import obter_pastas_entrada_saida
 from ..common.progress import ProgressBar
+from ..common.resource_control import obter_workers_cpu
+
+
+def _iniciar_worker_ocr() -> None:
+    """Tesseract com um thread por processo — o paralelismo vem do pool."""
+    os.environ["OMP_THREAD_LIMIT"] = "1"
 
 
 class OCRImagens:
@@ -21,6 +29,7 @@ class OCRImagens:
         pasta_origem: Path = None,
         pasta_com_texto: Path = None,
         pasta_sem_texto: Path = None,
+        workers: int = None,
     ):
         """
         Inicializa o OCR.
@@ -29,6 +38,7 @@ class OCRImagens:
             pasta_origem: Pasta com imagens para analisar (None = padrão).
             pasta_com_texto: Pasta para imagens com texto (None = padrão).
             pasta_sem_texto: Pasta para imagens sem texto (None = padrão).
+            workers: Processos em paralelo (None = WORKERS_CPU ou cores físicos - 1).
         """
         if pasta_origem is None:
             entrada, _ = obter_pastas_entrada_saida("imagens")
@@ -46,6 +56,8 @@ class OCRImagens:
             self.pasta_com_texto = pasta_com_texto
             self.pasta_sem_texto = pasta_sem_texto
 
+        self.workers = workers or obter_workers_cpu()
+
     def _verificar_tesseract(self) -> bool:
         """Verifica se Tesseract está disponível."""
         try:
@@ -160,8 +172,13 @@ class OCRImagens:
         with ProgressBar(
             total=len(arquivos), desc="Analisando OCR", unit="img"
         ).context() as pbar:
-            for arquivo in arquivos:
-                resultado = self._analisar_imagem(arquivo)
+            for arquivo, resultado in executar_em_processos(
+                self._analisar_imagem,
+                arquivos,
+                self.workers,
+                inicializador=_iniciar_worker_ocr,
+            ):
+                resultado = resultado or {"erro": "falha no processo de trabalho"}
 
                 if resultado.get("erro"):
                     print(f"\n⚠️  {arquivo.name}: {resultado['erro']}")
@@ -2,22 +2,81 @@
 Otimizador de imagens (JPG, PNG, WebP, AVIF, HEIC).
 """
 
-import hashlib
+import io
+import multiprocessing
 import os
 import subprocess
 import shutil
+from contextlib import nullcontext
+from functools import lru_cache, partial
 from pathlib import Path
 from typing import List, Tuple, Optional
 
-from PIL import Image
+from PIL import Image, features
 
 try:
     from PIL.ExifTags import TAGS
 except ImportError:
     TAGS = {}
 
+from ..common.hashing import hash_amostras
+from ..common.parallel import executar_em_processos
 from ..common.paths import criar_pastas, obter_pastas_entrada_saida
 from ..common.progress import ProgressBar
+from ..common.resource_control import obter_workers_cpu
+from ..common.scanner import mapear_paralelo
+from .jpeg_markers import reescrever_jpeg
+from .manifest import ManifestoOtimizacao
+from .png_lossless import otimizar_png_sem_perdas
+from .quality import (
+    QUALIDADE_MAX,
+    QUALIDADE_MIN,
+    buscar_qualidade,
+    buscar_qualidade_jpeg,
+    codificar,
+    estimar_qualidade_jpeg,
+    luma_reduzida,
+    medir_ssim,
+)
+
+@lru_cache(maxsize=1)
+def _caminho_pngquant() -> Optional[str]:
+    """Caminho do pngquant, procurado no PATH uma vez por processo."""
+    return shutil.which("pngquant")
+
+
+def _profundidade_png(caminho: Path) -> Optional[int]:
+    """Bits por canal declarados no IHDR do PNG (byte 24 do arquivo)."""
+    try:
+        with open(caminho, "rb") as f:
+            cabecalho = f.read(26)
+    except OSError:
+        return None
+    if len(cabecalho) < 26 or not cabecalho.startswith(b"\x89PNG"):
+        return None
+    return cabecalho[24]
+
+
+# Conexão somente leitura ao manifesto, aberta uma vez por processo de trabalho
+_MANIFESTO_WORKER: Optional[ManifestoOtimizacao] = None
+
+# Semáforo compartilhado: imagens acima do orçamento de pixels, uma por vez
+_TRAVA_GRANDES = None
+
+
+def _iniciar_worker_otimizador(
+    caminho_banco: Optional[Path], trava_grandes, max_pixels: int
+) -> None:
+    global _MANIFESTO_WORKER, _TRAVA_GRANDES
+    # Panoramas e scans legítimos passam do limite anti-"decompression bomb" do Pillow
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    _TRAVA_GRANDES = trava_grandes
+    if caminho_banco is None:
+        return
+    try:
+        _MANIFESTO_WORKER = ManifestoOtimizacao(caminho_banco, somente_leitura=True)
+    except Exception:
+        _MANIFESTO_WORKER = None
 
 
 class OtimizadorImagens:
@@ -32,7 +91,28 @@ class OtimizadorImagens:
     QUALIDADE_JPG = 85
     PRESERVAR_EXIF = True
     COMPRIMIR_PNG = True
+    PNG_SEM_PERDAS = False  # Busca filtro/zlib/paleta em vez do pngquant (com perdas)
     BATCH_INTELIGENTE = True  # Pular arquivos já processados
+    SOMENTE_METADADOS = False  # JPEG → JPEG só remove metadados, nunca recomprime
+    CORRIDA_FORMATOS = False  # Codifica em JPEG, WebP e AVIF e fica com o menor
+
+    # Concorrentes da corrida: (formato do Pillow, extensão, opções do encoder)
+    FORMATOS_CORRIDA = {
+        "jpeg": ("JPEG", ".jpg", {"optimize": True}),
+        "webp": ("WEBP", ".webp", {"method": 6}),
+        "avif": ("AVIF", ".avif", {}),
+    }
+
+    # Incrementar quando a forma de gerar a saída mudar (invalida o manifesto)
+    VERSAO_PIPELINE = 6
+
+    # Mensagem de JPEG gravado sem recompressão (qualidade já ≤ alvo ou só metadados)
+    JA_OTIMIZADO = "já otimizado"
+
+    # Imagens decodificadas acima disso (~200 MB em RGB) não rodam em paralelo
+    # entre si; acima do limite absoluto são recusadas
+    ORCAMENTO_PIXELS = 64_000_000
+    MAX_PIXELS_ABSOLUTO = 1_000_000_000
 
     def __init__(
         self,
@@ -42,6 +122,13 @@ class OtimizadorImagens:
         preservar_exif: bool = None,
         comprimir_png: bool = None,
         batch_inteligente: bool = None,
+        workers: int = None,
+        ssim_alvo: float = None,
+        dimensao_max: int = None,
+        orcamento_pixels: int = None,
+        somente_metadados: bool = None,
+        corrida_formatos: bool = None,
+        png_sem_perdas: bool = None,
     ):
         """
         Inicializa o otimizador.
@@ -53,6 +140,21 @@ class OtimizadorImagens:
             preservar_exif: Se True, preserva metadados EXIF.
             comprimir_png: Se True, tenta comprimir PNGs adicionalmente.
             batch_inteligente: Se True, pula arquivos já processados.
+            workers: Processos em paralelo (None = WORKERS_CPU ou cores físicos - 1).
+            ssim_alvo: Se definido (ex: 0.985), cada JPEG usa a menor qualidade
+                       (até qualidade_jpg) com SSIM ≥ alvo em vez da qualidade fixa.
+            dimensao_max: Se definido, reduz o lado maior para até esse valor
+                          (JPEGs já são decodificados reduzidos, via draft).
+            orcamento_pixels: Pixels decodificados acima dos quais a imagem vai
+                              para o modo de pouca memória (None = ORCAMENTO_PIXELS).
+            somente_metadados: Se True, JPEGs não são recomprimidos: só os
+                               segmentos de metadados são reescritos.
+            corrida_formatos: Se True, cada imagem é codificada em JPEG, WebP e
+                              AVIF (os disponíveis no Pillow) com qualidade
+                              perceptual equivalente e fica a menor.
+            png_sem_perdas: Se True, PNGs não passam pelo pngquant: testa
+                            filtros, estratégias zlib e redução para paleta
+                            (só quando não perde nada) e fica o menor.
         """
         if pasta_entrada is None or pasta_saida is None:
             entrada, saida = obter_pastas_entrada_saida("imagens")
@@ -74,52 +176,54 @@ class OtimizadorImagens:
             if batch_inteligente is not None
             else self.BATCH_INTELIGENTE
         )
+        self.workers = workers or obter_workers_cpu()
+        self.ssim_alvo = ssim_alvo
+        self.dimensao_max = dimensao_max
+        self.orcamento_pixels = orcamento_pixels or self.ORCAMENTO_PIXELS
+        self.somente_metadados = (
+            somente_metadados
+            if somente_metadados is not None
+            else self.SOMENTE_METADADOS
+        )
+        self.png_sem_perdas = (
+            png_sem_perdas if png_sem_perdas is not None else self.PNG_SEM_PERDAS
+        )
+        self.corrida_formatos = (
+            corrida_formatos if corrida_formatos is not None else self.CORRIDA_FORMATOS
+        )
+        # JPEG sempre existe; WebP e AVIF dependem de como o Pillow foi compilado
+        self.formatos_corrida = [
+            formato
+            for formato in self.FORMATOS_CORRIDA
+            if formato == "jpeg" or features.check(formato)
+        ]
 
-    def _calcular_hash_arquivo(self, caminho: Path) -> str:
-        """
-        Calcula hash MD5 do arquivo para comparação.
-
-        Args:
-            caminho: Caminho do arquivo.
-
-        Returns:
-            str: Hash MD5 do arquivo.
-        """
-        hash_md5 = hashlib.md5()
-        try:
-            with open(caminho, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        except Exception:
-            return ""
+    def _parametros(self) -> str:
+        """Assinatura dos parâmetros que afetam a saída (chave do manifesto)."""
+        return (
+            f"v{self.VERSAO_PIPELINE}|q{self.qualidade_jpg}|"
+            f"exif{int(self.preservar_exif)}|png{int(self.comprimir_png)}|"
+            f"pngsp{int(self.png_sem_perdas)}|"
+            f"ssim{self.ssim_alvo or 0}|max{self.dimensao_max or 0}|"
+            f"meta{int(self.somente_metadados)}|"
+            f"corrida{'.'.join(self.formatos_corrida) if self.corrida_formatos else 0}"
+        )
 
-    def _arquivo_ja_processado(self, caminho_origem: Path, caminho_saida: Path) -> bool:
+    def _caminho_saida(
+        self, caminho_origem: Path, pasta_destino: Path, formato: str = None
+    ) -> Path:
         """
-        Verifica se o arquivo já foi processado (batch inteligente).
+        WebP, AVIF, HEIC/HEIF → .jpg; demais mantêm a extensão.
 
-        Args:
-            caminho_origem: Caminho do arquivo original.
-            caminho_saida: Caminho do arquivo de saída.
-
-        Returns:
-            bool: True se já foi processado.
+        Com `formato` (vencedor da corrida), usa a extensão desse formato.
         """
-        if not self.batch_inteligente:
-            return False
-
-        if not caminho_saida.exists():
-            return False
-
-        # Compara hash dos arquivos
-        hash_origem = self._calcular_hash_arquivo(caminho_origem)
-        hash_saida = self._calcular_hash_arquivo(caminho_saida)
-
-        # Se os hashes são iguais, já foi processado
-        if hash_origem == hash_saida and hash_origem != "":
-            return True
-
-        return False
+        if formato:
+            extensao = self.FORMATOS_CORRIDA[formato][1]
+        else:
+            extensao = caminho_origem.suffix.lower()
+            if extensao in {".webp", ".avif", ".heic", ".heif"}:
+                extensao = ".jpg"
+        return pasta_destino / f"{caminho_origem.stem}{extensao}"
 
     def _preservar_exif(self, img: Image.Image) -> dict:
         """
@@ -142,62 +246,245 @@ class OtimizadorImagens:
             pass
         return exif_data
 
-    def _comprimir_png(self, caminho: Path) -> bool:
+    def _reescrever_metadados(self, caminho_origem: Path, caminho_saida: Path) -> None:
+        """
+        Grava o JPEG sem decodificar: remove XMP, IPTC, comentários e (sem
+        preservar_exif) o EXIF, mantendo orientação e perfil ICC.
         """
-        Tenta comprimir PNG usando pngquant (se disponível).
+        if not reescrever_jpeg(
+            caminho_origem, caminho_saida, manter_exif=self.preservar_exif
+        ):
+            # Estrutura que o leitor de marcadores não entende: cópia fiel
+            shutil.copyfile(caminho_origem, caminho_saida)
+
+    def _quantizar_png(self, dados: bytes) -> Optional[bytes]:
+        """
+        Passa o PNG pelo pngquant via stdin/stdout (se disponível).
 
         Args:
-            caminho: Caminho do arquivo PNG.
+            dados: PNG já codificado pelo Pillow.
 
         Returns:
-            bool: True se conseguiu comprimir.
+            bytes do PNG quantizado, ou None se pngquant não estiver
+            disponível, falhar ou não atingir a qualidade mínima.
         """
-        if not self.comprimir_png:
-            return False
-
-        # Verifica se pngquant está disponível
-        if shutil.which("pngquant") is None:
-            return False
+        executavel = _caminho_pngquant()
+        if executavel is None:
+            return None
 
         try:
-            # Cria arquivo temporário
-            temp_path = caminho.with_suffix(".tmp.png")
-            caminho.rename(temp_path)
-
-            # Executa pngquant
             resultado = subprocess.run(
-                [
-                    "pngquant",
-                    "--quality=65-80",
-                    "--force",
-                    "--output",
-                    str(caminho),
-                    str(temp_path),
-                ],
+                [executavel, "--quality=65-80", "-"],
+                input=dados,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 timeout=30,
             )
+        except (OSError, subprocess.SubprocessError):
+            return None
 
-            if resultado.returncode == 0 and caminho.exists():
-                # Remove temporário
-                if temp_path.exists():
-                    temp_path.unlink()
-                return True
-            else:
-                # Restaura original se falhou
-                if temp_path.exists():
-                    temp_path.rename(caminho)
-        except Exception:
-            # Restaura original em caso de erro
-            temp_path = caminho.with_suffix(".tmp.png")
-            if temp_path.exists():
-                temp_path.rename(caminho)
+        # 99 = qualidade mínima não atingida (pngquant não gera saída)
+        if resultado.returncode != 0 or not resultado.stdout:
+            return None
+        return resultado.stdout
+
+    def _salvar_jpeg_por_ssim(
+        self,
+        img: Image.Image,
+        caminho_origem: Path,
+        caminho_saida: Path,
+        qualidade_origem: Optional[int] = None,
+        reduzida: bool = False,
+    ) -> None:
+        """
+        Grava o JPEG com a menor qualidade que mantém SSIM ≥ ssim_alvo.
+
+        A busca nunca passa de qualidade_jpg nem da qualidade estimada da
+        origem JPEG. Se o alvo não for atingível (origem já degradada), ou se
+        o resultado não ficar menor que a origem JPEG, grava a origem como está
+        — a não ser que a imagem tenha sido reduzida (dimensao_max): aí a
+        origem tem o tamanho errado e vale o encode reduzido.
+        """
+        origem_jpeg = caminho_origem.suffix.lower() in {".jpg", ".jpeg"} and not reduzida
+        qualidade_max = self.qualidade_jpg
+        if qualidade_origem is not None:
+            qualidade_max = max(QUALIDADE_MIN, min(qualidade_max, qualidade_origem))
+        busca = buscar_qualidade_jpeg(
+            img, self.ssim_alvo, qualidade_max=qualidade_max, optimize=True
+        )
+
+        if busca is None:
+            if origem_jpeg:
+                shutil.copyfile(caminho_origem, caminho_saida)
+                return
+            # Origem sem perdas ou reduzida: alvo inatingível, usa a qualidade
+            # configurada (limitada à da origem JPEG)
+            img.save(caminho_saida, "JPEG", quality=qualidade_max, optimize=True)
+            return
+
+        _, dados, _ = busca
+        if origem_jpeg and len(dados) >= caminho_origem.stat().st_size:
+            shutil.copyfile(caminho_origem, caminho_saida)
+            return
+        caminho_saida.write_bytes(dados)
+
+    def _salvar_menor_formato(
+        self,
+        img: Image.Image,
+        caminho_origem: Path,
+        pasta_destino: Path,
+        formatos: List[str],
+        reduzida: bool = False,
+    ) -> Optional[Path]:
+        """
+        Corrida de formatos: codifica em memória em cada formato e grava o menor.
+
+        A imagem é decodificada uma vez; cada thread recebe uma cópia dos
+        pixels (save() grava estado no objeto, então não dá para compartilhar).
+        A régua de qualidade é o SSIM: ssim_alvo, se definido, senão o SSIM
+        do próprio JPEG em qualidade_jpg — cada formato usa a menor qualidade
+        que o alcança. Uma origem JPEG concorre também como está, exceto
+        quando dimensao_max reduziu a imagem (a origem tem o tamanho errado).
+
+        Returns:
+            Path da saída gravada, ou None se nenhum formato atingiu a régua.
+        """
+        tem_alfa = img.mode in ("RGBA", "LA", "PA") or (
+            img.mode == "P" and "transparency" in img.info
+        )
+        if tem_alfa:
+            # JPEG não tem canal alfa: só WebP/AVIF disputam
+            formatos = [f for f in formatos if f != "jpeg"]
+            img = img.convert("RGBA")
+        elif img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        if not formatos:
+            return None
+        referencia = luma_reduzida(img)
+
+        candidatos = {}
+        if self.ssim_alvo:
+            alvo = self.ssim_alvo
+        else:
+            # A régua vem sempre do JPEG, mesmo quando ele não concorre (alfa, ou
+            # só o vencedor registrado no manifesto) — assim a saída não muda
+            formato_pil, _, opcoes = self.FORMATOS_CORRIDA["jpeg"]
+            dados = codificar(
+                img.convert("RGB") if tem_alfa else img,
+                formato_pil, self.qualidade_jpg, **opcoes
+            )
+            alvo = medir_ssim(referencia, dados)
+            if "jpeg" in formatos:
+                candidatos["jpeg"] = dados
+
+        def _codificar(formato: str) -> Optional[bytes]:
+            formato_pil, _, opcoes = self.FORMATOS_CORRIDA[formato]
+            qualidade_max = self.qualidade_jpg if formato == "jpeg" else QUALIDADE_MAX
+            busca = buscar_qualidade(
+                img.copy(), formato_pil, alvo,
+                qualidade_max=qualidade_max, referencia=referencia, **opcoes
+            )
+            return busca[1] if busca else None
+
+        pendentes = [f for f in formatos if f not in candidatos]
+        for formato, dados in mapear_paralelo(_codificar, pendentes, len(pendentes)):
+            if dados:
+                candidatos[formato] = dados
+
+        tamanho_origem = None
+        if caminho_origem.suffix.lower() in {".jpg", ".jpeg"} and "jpeg" in formatos and not reduzida:
+            tamanho_origem = caminho_origem.stat().st_size
+        if not candidatos and tamanho_origem is None:
+            return None
+
+        vencedor = min(candidatos, key=lambda f: len(candidatos[f]), default=None)
+        if tamanho_origem is not None and (
+            vencedor is None or tamanho_origem <= len(candidatos[vencedor])
+        ):
+            # A própria origem JPEG é a menor: só reescreve os metadados
+            caminho_saida = self._caminho_saida(caminho_origem, pasta_destino, "jpeg")
+            self._reescrever_metadados(caminho_origem, caminho_saida)
+            return caminho_saida
+
+        caminho_saida = self._caminho_saida(caminho_origem, pasta_destino, vencedor)
+        caminho_saida.write_bytes(candidatos[vencedor])
+        return caminho_saida
+
+    def _converter_e_salvar(
+        self,
+        img: Image.Image,
+        extensao: str,
+        caminho_origem: Path,
+        caminho_saida: Path,
+        qualidade_origem: Optional[int],
+        reduzida: bool = False,
+    ) -> None:
+        """Converte o modo de cor conforme o destino e grava a saída otimizada."""
+        nova_extensao = caminho_saida.suffix
+
+        # Preserva EXIF se solicitado
+        exif_data = None
+        if self.preservar_exif:
+            exif_data = self._preservar_exif(img)
+
+        # Se a imagem for RGBA (com transparência) e o destino for JPG,
+        # precisamos converter para RGB (fundo branco)
+        if (
+            extensao in {".webp", ".png", ".avif", ".heic", ".heif"}
+        ) and nova_extensao == ".jpg":
+            if img.mode in ("RGBA", "LA", "P"):
+                # Cria fundo branco
+                if img.mode == "P":
+                    img = img.convert("RGBA")
+                fundo = Image.new("RGB", img.size, (255, 255, 255))
+                if img.mode == "RGBA":
+                    fundo.paste(
+                        img, mask=img.split()[3] if len(img.split()) == 4 else None
+                    )
+                else:
+                    fundo.paste(img)
+                img = fundo
+            elif img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
 
-        return False
+        # Salva com otimização
+        save_kwargs = {"optimize": True}
+
+        if nova_extensao in [".jpg", ".jpeg"] and self.ssim_alvo:
+            self._salvar_jpeg_por_ssim(
+                img, caminho_origem, caminho_saida, qualidade_origem, reduzida
+            )
+        elif nova_extensao in [".jpg", ".jpeg"]:
+            save_kwargs["quality"] = self.qualidade_jpg
+            if exif_data and hasattr(img, "save"):
+                # Tenta preservar EXIF (Pillow preserva automaticamente se disponível)
+                try:
+                    img.save(caminho_saida, "JPEG", **save_kwargs)
+                except Exception:
+                    img.save(caminho_saida, "JPEG", **save_kwargs)
+            else:
+                img.save(caminho_saida, "JPEG", **save_kwargs)
+        elif nova_extensao == ".png":
+            # Codifica em memória e grava uma vez só a menor versão
+            buffer = io.BytesIO()
+            img.save(buffer, "PNG", **save_kwargs)
+            dados = buffer.getvalue()
+            if self.png_sem_perdas:
+                # PNG de 16 bits chega ao Pillow já em 8: a busca perderia precisão
+                if not (extensao == ".png" and _profundidade_png(caminho_origem) == 16):
+                    otimizado = otimizar_png_sem_perdas(img)
+                    if otimizado is not None and len(otimizado) < len(dados):
+                        dados = otimizado
+            elif self.comprimir_png:
+                quantizado = self._quantizar_png(dados)
+                if quantizado is not None and len(quantizado) < len(dados):
+                    dados = quantizado
+            caminho_saida.write_bytes(dados)
+        else:
+            img.save(caminho_saida, **save_kwargs)
 
     def _otimizar_imagem(
-        self, caminho_origem: Path, pasta_destino: Path
+        self, caminho_origem: Path, pasta_destino: Path, formatos: List[str] = None
     ) -> Tuple[bool, Path, Optional[str]]:
         """
         Processa uma imagem: converte WebP para JPG e otimiza.
@@ -205,26 +492,15 @@ class OtimizadorImagens:
         Args:
             caminho_origem: Caminho da imagem original.
             pasta_destino: Pasta de destino.
+            formatos: Concorrentes da corrida (None = formatos_corrida); só
+                      usado com corrida_formatos.
 
         Returns:
             Tuple[bool, Path, Optional[str]]: (sucesso, caminho_saida, mensagem)
         """
         try:
             extensao = caminho_origem.suffix.lower()
-            nome_arquivo = caminho_origem.stem
-
-            # Define o nome de saída
-            # WebP, AVIF, HEIC/HEIF → JPG
-            if extensao in {".webp", ".avif", ".heic", ".heif"}:
-                nova_extensao = ".jpg"
-            else:
-                nova_extensao = extensao
-
-            caminho_saida = pasta_destino / f"{nome_arquivo}{nova_extensao}"
-
-            # Verifica se já foi processado (batch inteligente)
-            if self._arquivo_ja_processado(caminho_origem, caminho_saida):
-                return True, caminho_saida, "já processado"
+            caminho_saida = self._caminho_saida(caminho_origem, pasta_destino)
 
             # Tenta abrir a imagem
             try:
@@ -246,51 +522,53 @@ class OtimizadorImagens:
                     except Exception:
                         return False, None, f"Erro ao abrir HEIC/HEIF: {e}"
 
-            # Preserva EXIF se solicitado
-            exif_data = None
-            if self.preservar_exif:
-                exif_data = self._preservar_exif(img)
-
-            # Se a imagem for RGBA (com transparência) e o destino for JPG,
-            # precisamos converter para RGB (fundo branco)
-            if (
-                extensao in {".webp", ".png", ".avif", ".heic", ".heif"}
-            ) and nova_extensao == ".jpg":
-                if img.mode in ("RGBA", "LA", "P"):
-                    # Cria fundo branco
-                    if img.mode == "P":
-                        img = img.convert("RGBA")
-                    fundo = Image.new("RGB", img.size, (255, 255, 255))
-                    if img.mode == "RGBA":
-                        fundo.paste(
-                            img, mask=img.split()[3] if len(img.split()) == 4 else None
-                        )
-                    else:
-                        fundo.paste(img)
-                    img = fundo
-                elif img.mode not in ("RGB", "L"):
-                    img = img.convert("RGB")
-
-            # Salva com otimização
-            save_kwargs = {"optimize": True}
-
-            if nova_extensao in [".jpg", ".jpeg"]:
-                save_kwargs["quality"] = self.qualidade_jpg
-                if exif_data and hasattr(img, "save"):
-                    # Tenta preservar EXIF (Pillow preserva automaticamente se disponível)
-                    try:
-                        img.save(caminho_saida, "JPEG", **save_kwargs)
-                    except Exception:
-                        img.save(caminho_saida, "JPEG", **save_kwargs)
+            # JPEG → JPEG: a tabela de quantização (só cabeçalho) diz a qualidade
+            # de origem; recomprimir algo já abaixo do alvo só aumenta e piora.
+            # Nesses casos só os metadados são reescritos, byte a byte
+            qualidade_origem = None
+            reduzir = bool(self.dimensao_max) and max(img.size) > self.dimensao_max
+            if extensao in {".jpg", ".jpeg"}:
+                qualidade_origem = estimar_qualidade_jpeg(img)
+                ja_otimizado = (
+                    qualidade_origem is not None
+                    and not self.ssim_alvo
+                    and qualidade_origem <= self.qualidade_jpg
+                )
+                if not reduzir and not self.corrida_formatos and (
+                    self.somente_metadados or ja_otimizado
+                ):
+                    img.close()
+                    self._reescrever_metadados(caminho_origem, caminho_saida)
+                    return True, caminho_saida, self.JA_OTIMIZADO
+
+            # Redução no domínio DCT: o JPEG já é decodificado em 1/2, 1/4 ou 1/8
+            largura, altura = img.size
+            if reduzir:
+                escala = self.dimensao_max / max(largura, altura)
+                img.draft(img.mode, (int(largura * escala), int(altura * escala)))
+
+            pixels = img.size[0] * img.size[1]
+            if pixels > self.MAX_PIXELS_ABSOLUTO:
+                img.close()
+                return False, None, f"imagem grande demais ({pixels / 1e6:.0f} MP)"
+
+            # Acima do orçamento, uma imagem por vez entre todos os workers
+            grande = pixels > self.orcamento_pixels and _TRAVA_GRANDES is not None
+            with _TRAVA_GRANDES if grande else nullcontext():
+                if reduzir and max(img.size) > self.dimensao_max:
+                    img.thumbnail((self.dimensao_max, self.dimensao_max), Image.LANCZOS)
+                vencedor = None
+                if self.corrida_formatos:
+                    vencedor = self._salvar_menor_formato(
+                        img, caminho_origem, pasta_destino,
+                        formatos or self.formatos_corrida, reduzir,
+                    )
+                if vencedor is not None:
+                    caminho_saida = vencedor
                 else:
-                    img.save(caminho_saida, "JPEG", **save_kwargs)
-            elif nova_extensao == ".png":
-                img.save(caminho_saida, "PNG", **save_kwargs)
-                # Tenta comprimir PNG adicionalmente
-                if self.comprimir_png:
-                    self._comprimir_png(caminho_saida)
-            else:
-                img.save(caminho_saida, **save_kwargs)
+                    self._converter_e_salvar(
+                        img, extensao, caminho_origem, caminho_saida, qualidade_origem, reduzir
+                    )
 
             img.close()
 
@@ -298,6 +576,47 @@ class OtimizadorImagens:
         except Exception as e:
             return False, None, str(e)
 
+    def _otimizar_incremental(
+        self, caminho_origem: Path, pasta_destino: Path
+    ) -> Tuple[bool, Path, Optional[str], Optional[str], Optional[str]]:
+        """
+        Otimiza uma imagem consultando o manifesto pelo conteúdo (executado nos workers).
+
+        Returns:
+            (sucesso, caminho_saida, mensagem, hash_origem, hash_saida)
+        """
+        hash_origem = None
+        formatos = None
+        if self.batch_inteligente:
+            hash_origem = hash_amostras(caminho_origem)
+            tamanho = caminho_origem.stat().st_size
+            parametros = self._parametros()
+            formato = None
+            if self.corrida_formatos and hash_origem and _MANIFESTO_WORKER is not None:
+                # Corrida já decidida para este conteúdo: só o vencedor é codificado
+                formato = _MANIFESTO_WORKER.consultar_formato(hash_origem, tamanho, parametros)
+                if formato in self.formatos_corrida:
+                    formatos = [formato]
+                else:
+                    formato = None
+            caminho_saida = self._caminho_saida(caminho_origem, pasta_destino, formato)
+            if (
+                hash_origem
+                and _MANIFESTO_WORKER is not None
+                and _MANIFESTO_WORKER.consultar_conteudo(
+                    hash_origem, tamanho, parametros, caminho_saida
+                )
+            ):
+                return True, caminho_saida, "já processado", hash_origem, None
+
+        sucesso, caminho_saida, mensagem = self._otimizar_imagem(
+            caminho_origem, pasta_destino, formatos
+        )
+        hash_saida = None
+        if sucesso and caminho_saida and self.batch_inteligente:
+            hash_saida = hash_amostras(caminho_saida)
+        return sucesso, caminho_saida, mensagem, hash_origem, hash_saida
+
     def processar(self, deletar_originais: bool = True) -> dict:
         """
         Processa todas as imagens na pasta de entrada.
@@ -309,7 +628,7 @@ class OtimizadorImagens:
             dict: Estatísticas do processamento.
         """
         if not criar_pastas(self.pasta_entrada, self.pasta_saida):
-            return {"sucessos": 0, "falhas": 0, "economia_mb": 0.0, "pulados": 0}
+            return {"sucessos": 0, "falhas": 0, "economia_mb": 0.0, "pulados": 0, "ja_otimizados": 0}
 
         pasta_entrada = Path(self.pasta_entrada).resolve()
         pasta_saida = Path(self.pasta_saida).resolve()
@@ -323,59 +642,113 @@ class OtimizadorImagens:
 
         if not arquivos:
             print(f"ℹ️  Nenhuma imagem encontrada em {pasta_entrada}")
-            return {"sucessos": 0, "falhas": 0, "economia_mb": 0.0, "pulados": 0}
+            return {"sucessos": 0, "falhas": 0, "economia_mb": 0.0, "pulados": 0, "ja_otimizados": 0}
 
         print(f"🚀 Iniciando processamento de {len(arquivos)} imagem(ns)...")
         print(
             f"⚙️  Configuração: Qualidade JPG {self.qualidade_jpg}% | "
             f"EXIF: {'Preservado' if self.preservar_exif else 'Removido'} | "
-            f"Batch Inteligente: {'Ativo' if self.batch_inteligente else 'Inativo'}"
+            f"Batch Inteligente: {'Ativo' if self.batch_inteligente else 'Inativo'} | "
+            f"JPEG: {'Só metadados' if self.somente_metadados else 'Recomprimir'} | "
+            f"Processos: {self.workers}"
         )
         print("-" * 60)
 
         sucessos = 0
         falhas = 0
         pulados = 0
+        ja_otimizados = 0
         total_economizado = 0
+        vencedores = {}
 
-        # Barra de progresso
-        with ProgressBar(
-            total=len(arquivos), desc="Progresso", unit="img"
-        ).context() as pbar:
-            for arquivo in arquivos:
-                tamanho_original = arquivo.stat().st_size
+        manifesto = ManifestoOtimizacao() if self.batch_inteligente else None
+        parametros = self._parametros()
 
-                sucesso, caminho_saida, mensagem = self._otimizar_imagem(
-                    arquivo, pasta_saida
-                )
+        # Encode nos workers; manifesto, exclusão dos originais e estatísticas aqui
+        otimizar = partial(self._otimizar_incremental, pasta_destino=pasta_saida)
+        args_inicializador = (
+            manifesto.caminho_banco if manifesto else None,
+            multiprocessing.Semaphore(1),
+            self.MAX_PIXELS_ABSOLUTO,
+        )
 
-                if sucesso and caminho_saida:
-                    if mensagem == "já processado":
+        try:
+            # Barra de progresso
+            with ProgressBar(
+                total=len(arquivos), desc="Progresso", unit="img"
+            ).context() as pbar:
+                # Verificação barata (só stat): mesma origem, parâmetros e saída intacta
+                pendentes = []
+                for arquivo in arquivos:
+                    if manifesto and manifesto.consultar_stat(
+                        arquivo, arquivo.stat(), parametros
+                    ):
                         pulados += 1
-                        pbar.set_postfix({"Pulados": pulados})
-                    elif caminho_saida.exists():
-                        tamanho_novo = caminho_saida.stat().st_size
-                        economia = tamanho_original - tamanho_novo
-                        total_economizado += economia
-
-                        # Deleta o original após sucesso
-                        if deletar_originais:
-                            try:
-                                arquivo.unlink()
-                            except OSError:
-                                pass
-
-                        sucessos += 1
+                        pbar.update(1)
+                    else:
+                        pendentes.append(arquivo)
+                if pulados:
+                    pbar.set_postfix({"Pulados": pulados})
+
+                for arquivo, resultado in executar_em_processos(
+                    otimizar,
+                    pendentes,
+                    self.workers,
+                    inicializador=_iniciar_worker_otimizador,
+                    args_inicializador=args_inicializador,
+                ):
+                    sucesso, caminho_saida, mensagem, hash_origem, hash_saida = resultado or (
+                        False, None, "falha no processo de trabalho", None, None
+                    )
+
+                    if sucesso and caminho_saida:
+                        if mensagem == "já processado":
+                            # Mesmo conteúdo em outro caminho/mtime: atualiza o registro
+                            pulados += 1
+                            pbar.set_postfix({"Pulados": pulados})
+                            if manifesto and caminho_saida.exists():
+                                manifesto.registrar(
+                                    arquivo, arquivo.stat(), hash_origem, parametros,
+                                    caminho_saida, None,
+                                )
+                        elif caminho_saida.exists():
+                            st_original = arquivo.stat()
+                            tamanho_novo = caminho_saida.stat().st_size
+                            economia = st_original.st_size - tamanho_novo
+                            total_economizado += economia
+
+                            if manifesto and hash_origem:
+                                manifesto.registrar(
+                                    arquivo, st_original, hash_origem, parametros,
+                                    caminho_saida, hash_saida,
+                                )
+
+                            # Deleta o original após sucesso
+                            if deletar_originais:
+                                try:
+                                    arquivo.unlink()
+                                except OSError:
+                                    pass
+
+                            sucessos += 1
+                            if self.corrida_formatos:
+                                formato = caminho_saida.suffix.lstrip(".")
+                                vencedores[formato] = vencedores.get(formato, 0) + 1
+                            if mensagem == self.JA_OTIMIZADO:
+                                ja_otimizados += 1
+                        else:
+                            falhas += 1
+                            if mensagem:
+                                print(f"\n⚠️  {arquivo.name}: {mensagem}")
                     else:
                         falhas += 1
                         if mensagem:
-                            print(f"\n⚠️  {arquivo.name}: {mensagem}")
-                else:
-                    falhas += 1
-                    if mensagem:
-                        print(f"\n❌ {arquivo.name}: {mensagem}")
+                            print(f"\n❌ {arquivo.name}: {mensagem}")
 
-                pbar.update(1)
+                    pbar.update(1)
+        finally:
+            if manifesto:
+                manifesto.fechar()
 
         # Resumo Final
         economia_mb = total_economizado / (1024 * 1024)
@@ -385,6 +758,11 @@ class OtimizadorImagens:
         print(f"✅ Sucessos: {sucessos}")
         if pulados > 0:
             print(f"⏭️  Pulados (já processados): {pulados}")
+        if ja_otimizados > 0:
+            print(f"📋 Sem recomprimir (só metadados reescritos): {ja_otimizados}")
+        if vencedores:
+            resumo = " | ".join(f"{f}: {n}" for f, n in sorted(vencedores.items()))
+            print(f"🏁 Formatos vencedores: {resumo}")
         print(f"❌ Falhas: {falhas}")
         print(f"💾 Espaço total liberado: {economia_mb:.2f} MB")
         print("-" * 60)
@@ -394,5 +772,6 @@ class OtimizadorImagens:
             "sucessos": sucessos,
             "falhas": falhas,
             "pulados": pulados,
+            "ja_otimizados": ja_otimizados,
             "economia_mb": economia_mb,
         }
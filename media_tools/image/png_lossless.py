@@ -0,0 +1,320 @@
+"""
+Otimização de PNG sem perdas, em processo (sem optipng/oxipng).
+
+Os pixels são reduzidos com NumPy quando isso não perde informação (alfa
+todo opaco, RGB cinza, até 256 cores → paleta de 1/2/4/8 bits) e cada
+representação é filtrada (None, Sub, Up, Paeth ou adaptativo por linha) e
+comprimida com estratégias diferentes do zlib. Fica o menor PNG.
+"""
+
+import os
+import struct
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from ..common.scanner import mapear_paralelo
+
+ASSINATURA_PNG = b"\x89PNG\r\n\x1a\n"
+
+# Tipos de cor do IHDR
+COR_CINZA = 0
+COR_RGB = 2
+COR_PALETA = 3
+COR_CINZA_ALFA = 4
+COR_RGBA = 6
+
+# Filtros de linha do PNG; ADAPTATIVO escolhe por linha o de menor soma |byte|
+FILTRO_NONE, FILTRO_SUB, FILTRO_UP, FILTRO_AVG, FILTRO_PAETH = range(5)
+ADAPTATIVO = -1
+
+# (filtro, estratégia zlib) testados em cada representação. Com menos de 8
+# bits por pixel só sem filtro (como na libpng); truecolor costuma ganhar
+# com Paeth ou adaptativo
+COMBINACOES = (
+    (FILTRO_NONE, zlib.Z_DEFAULT_STRATEGY),
+    (FILTRO_NONE, zlib.Z_RLE),
+    (FILTRO_SUB, zlib.Z_DEFAULT_STRATEGY),
+    (FILTRO_UP, zlib.Z_DEFAULT_STRATEGY),
+    (FILTRO_PAETH, zlib.Z_DEFAULT_STRATEGY),
+    (ADAPTATIVO, zlib.Z_DEFAULT_STRATEGY),
+    (ADAPTATIVO, zlib.Z_FILTERED),
+    (ADAPTATIVO, zlib.Z_RLE),
+)
+
+# Candidatos são comparados no nível 6 (ordem quase igual à do 9, fração do
+# tempo: o 9 degenera em dados com poucos símbolos); só o vencedor vai ao 9
+NIVEL_TESTE = 6
+NIVEL_FINAL = 9
+
+# Acima disso (bytes de pixel) a busca não roda: cada filtro é uma cópia inteira
+MAX_BYTES_BUSCA = 48 * 1024 * 1024
+
+# Amostra para descartar cedo a paleta em fotos (milhões de cores)
+LINHAS_AMOSTRA = 64
+
+# zlib e NumPy liberam o GIL: threads bastam para comprimir em paralelo
+THREADS_BUSCA = min(8, os.cpu_count() or 1)
+
+
+class _Representacao:
+    """Pixels prontos para o IDAT: linhas de bytes + metadados do IHDR."""
+
+    def __init__(self, linhas: np.ndarray, bpp: int, tipo_cor: int, bits: int,
+                 paleta: bytes = None, trns: bytes = None):
+        self.linhas = linhas  # (altura, bytes por linha) uint8
+        self.bpp = bpp  # bytes por pixel para os filtros (mínimo 1)
+        self.tipo_cor = tipo_cor
+        self.bits = bits
+        self.paleta = paleta
+        self.trns = trns
+
+
+def _empacotar_bits(indices: np.ndarray, bits: int) -> np.ndarray:
+    """Empacota índices (altura, largura) de 1/2/4 bits em bytes, MSB primeiro."""
+    if bits == 8:
+        return indices
+    por_byte = 8 // bits
+    altura, largura = indices.shape
+    resto = (-largura) % por_byte
+    if resto:
+        indices = np.pad(indices, ((0, 0), (0, resto)))
+    grupos = indices.reshape(altura, -1, por_byte).astype(np.uint8)
+    deslocamentos = np.arange(8 - bits, -1, -bits, dtype=np.uint8)
+    return np.bitwise_or.reduce(grupos << deslocamentos, axis=2).astype(np.uint8)
+
+
+def _bits_paleta(cores: int) -> int:
+    for bits in (1, 2, 4):
+        if cores <= 1 << bits:
+            return bits
+    return 8
+
+
+def _paleta(pixels: np.ndarray) -> Optional[_Representacao]:
+    """Representação em paleta se houver até 256 cores; alfas < 255 primeiro (tRNS curto)."""
+    altura, largura, canais = pixels.shape
+    if canais == 2:
+        # Cinza + alfa: vira RGBA para montar a paleta
+        pixels = np.concatenate([pixels[..., :1]] * 3 + [pixels[..., 1:]], axis=2)
+        canais = 4
+
+    # Descarte barato: mais de 256 cores já na amostra
+    passo = max(1, altura // LINHAS_AMOSTRA)
+    amostra = pixels[::passo]
+    if len(np.unique(amostra.reshape(-1, canais), axis=0)) > 256:
+        return None
+
+    empacotado = np.zeros((altura, largura), dtype=np.uint32)
+    for c in range(canais):
+        empacotado |= pixels[..., c].astype(np.uint32) << (8 * (3 - c))
+    cores, inversos = np.unique(empacotado, return_inverse=True)
+    if len(cores) > 256:
+        return None
+
+    alfa = (cores & 0xFF).astype(np.uint8) if canais == 4 else np.full(len(cores), 255, np.uint8)
+    ordem = np.argsort(alfa == 255, kind="stable")
+    posicao = np.empty_like(ordem)
+    posicao[ordem] = np.arange(len(ordem))
+    indices = posicao[inversos.reshape(altura, largura)].astype(np.uint8)
+    cores, alfa = cores[ordem], alfa[ordem]
+
+    rgb = np.stack([(cores >> 24) & 0xFF, (cores >> 16) & 0xFF, (cores >> 8) & 0xFF], axis=1)
+    transparentes = int(np.count_nonzero(alfa < 255))
+    bits = _bits_paleta(len(cores))
+    return _Representacao(
+        _empacotar_bits(indices, bits), 1, COR_PALETA, bits,
+        paleta=rgb.astype(np.uint8).tobytes(),
+        trns=alfa[:transparentes].tobytes() if transparentes else None,
+    )
+
+
+def _representacoes(img: Image.Image) -> Optional[List[_Representacao]]:
+    """
+    Formas sem perdas de gravar os pixels: a menor direta e, se couber, paleta.
+
+    Returns:
+        Lista de representações, ou None para modos não suportados (16 bits, float).
+    """
+    if img.mode == "P" or "transparency" in img.info:
+        img = img.convert("RGBA")
+    elif img.mode == "1":
+        img = img.convert("L")
+    if img.mode not in ("L", "LA", "RGB", "RGBA"):
+        return None
+
+    pixels = np.asarray(img)
+    if pixels.ndim == 2:
+        pixels = pixels[..., np.newaxis]
+    canais = pixels.shape[2]
+
+    # Alfa todo opaco não carrega informação
+    if canais in (2, 4) and np.all(pixels[..., -1] == 255):
+        pixels = pixels[..., :-1]
+        canais -= 1
+    # RGB com R == G == B é cinza
+    if canais in (3, 4):
+        cor = pixels[..., :3]
+        if np.array_equal(cor[..., 0], cor[..., 1]) and np.array_equal(cor[..., 1], cor[..., 2]):
+            pixels = pixels[..., [0, 3]] if canais == 4 else pixels[..., :1]
+            canais -= 2
+
+    altura, largura = pixels.shape[:2]
+    tipo_cor = {1: COR_CINZA, 2: COR_CINZA_ALFA, 3: COR_RGB, 4: COR_RGBA}[canais]
+    direta = _Representacao(
+        np.ascontiguousarray(pixels).reshape(altura, largura * canais), canais, tipo_cor, 8
+    )
+
+    representacoes = [direta]
+    if canais > 1:
+        paleta = _paleta(pixels)
+        if paleta is not None:
+            representacoes.append(paleta)
+    else:
+        # Cinza com poucos níveis também cabe em paleta de 1/2/4 bits
+        niveis = np.unique(pixels[::max(1, altura // LINHAS_AMOSTRA)])
+        if len(niveis) <= 16:
+            paleta = _paleta(np.concatenate([pixels] * 3, axis=2))
+            if paleta is not None:
+                representacoes.append(paleta)
+    return representacoes
+
+
+def _filtrar(linhas: np.ndarray, bpp: int, filtro: int) -> np.ndarray:
+    """Aplica um filtro PNG a todas as linhas; devolve (altura, 1 + bytes) com o tipo na frente."""
+    x = linhas.astype(np.int16)
+    esquerda = np.zeros_like(x)
+    esquerda[:, bpp:] = x[:, :-bpp]
+    cima = np.zeros_like(x)
+    cima[1:] = x[:-1]
+
+    if filtro == FILTRO_NONE:
+        filtrado = x
+    elif filtro == FILTRO_SUB:
+        filtrado = x - esquerda
+    elif filtro == FILTRO_UP:
+        filtrado = x - cima
+    elif filtro == FILTRO_AVG:
+        filtrado = x - ((esquerda + cima) >> 1)
+    else:
+        diagonal = np.zeros_like(x)
+        diagonal[1:, bpp:] = x[:-1, :-bpp]
+        p = esquerda + cima - diagonal
+        pa = np.abs(p - esquerda)
+        pb = np.abs(p - cima)
+        pc = np.abs(p - diagonal)
+        previsao = np.where((pa <= pb) & (pa <= pc), esquerda, np.where(pb <= pc, cima, diagonal))
+        filtrado = x - previsao
+
+    saida = np.empty((linhas.shape[0], linhas.shape[1] + 1), dtype=np.uint8)
+    saida[:, 0] = filtro
+    saida[:, 1:] = filtrado.astype(np.uint8)  # módulo 256
+    return saida
+
+
+def _filtrar_adaptativo(linhas: np.ndarray, bpp: int) -> np.ndarray:
+    """Por linha, o filtro de menor soma de |byte com sinal| (heurística da libpng)."""
+    candidatos = [_filtrar(linhas, bpp, f) for f in range(5)]
+    custos = np.stack([
+        np.abs(c[:, 1:].view(np.int8).astype(np.int32)).sum(axis=1) for c in candidatos
+    ])
+    escolha = np.argmin(custos, axis=0)
+    saida = candidatos[0]
+    for filtro in range(1, 5):
+        linhas_filtro = escolha == filtro
+        saida[linhas_filtro] = candidatos[filtro][linhas_filtro]
+    return saida
+
+
+def _chunk(tipo: bytes, dados: bytes) -> bytes:
+    return struct.pack(">I", len(dados)) + tipo + dados + struct.pack(">I", zlib.crc32(tipo + dados))
+
+
+def _custo_chunks(rep: _Representacao) -> int:
+    """Bytes de PLTE/tRNS que a representação soma ao arquivo (12 por chunk)."""
+    custo = 0
+    if rep.paleta is not None:
+        custo += 12 + len(rep.paleta)
+    if rep.trns:
+        custo += 12 + len(rep.trns)
+    return custo
+
+
+def _comprimir(dados: bytes, nivel: int, estrategia: int) -> bytes:
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 15, 9, estrategia)
+    return compressor.compress(dados) + compressor.flush()
+
+
+def _montar_png(rep: _Representacao, largura: int, altura: int, idat: bytes,
+                icc: Optional[bytes]) -> bytes:
+    partes = [
+        ASSINATURA_PNG,
+        _chunk(b"IHDR", struct.pack(">IIBBBBB", largura, altura, rep.bits, rep.tipo_cor, 0, 0, 0)),
+    ]
+    if icc:
+        partes.append(_chunk(b"iCCP", b"ICC Profile\x00\x00" + zlib.compress(icc, 9)))
+    if rep.paleta is not None:
+        partes.append(_chunk(b"PLTE", rep.paleta))
+    if rep.trns:
+        partes.append(_chunk(b"tRNS", rep.trns))
+    partes.append(_chunk(b"IDAT", idat))
+    partes.append(_chunk(b"IEND", b""))
+    return b"".join(partes)
+
+
+def otimizar_png_sem_perdas(img: Image.Image, threads: int = None) -> Optional[bytes]:
+    """
+    Menor PNG sem perdas entre reduções de cor, filtros e estratégias zlib.
+
+    Args:
+        img: Imagem em modo 1, L, LA, P, RGB ou RGBA (8 bits por canal).
+        threads: Compressões simultâneas (None = THREADS_BUSCA).
+
+    Returns:
+        bytes do PNG, ou None se o modo não for suportado ou a imagem for
+        grande demais para a busca (MAX_BYTES_BUSCA).
+    """
+    largura, altura = img.size
+    if largura * altura * len(img.getbands()) > MAX_BYTES_BUSCA:
+        return None
+    representacoes = _representacoes(img)
+    if not representacoes:
+        return None
+
+    # Filtragem (NumPy) uma vez por (representação, filtro); compressão em paralelo
+    filtrados: Dict[Tuple[int, int], bytes] = {}
+    tarefas = []
+    for i, rep in enumerate(representacoes):
+        for filtro, estrategia in COMBINACOES:
+            if rep.bits < 8 and filtro != FILTRO_NONE:
+                continue
+            if (i, filtro) not in filtrados:
+                if filtro == ADAPTATIVO:
+                    dados = _filtrar_adaptativo(rep.linhas, rep.bpp)
+                else:
+                    dados = _filtrar(rep.linhas, rep.bpp, filtro)
+                filtrados[(i, filtro)] = dados.tobytes()
+            tarefas.append((i, filtro, estrategia))
+
+    def _testar(tarefa: Tuple[int, int, int]) -> int:
+        i, filtro, estrategia = tarefa
+        idat = _comprimir(filtrados[(i, filtro)], NIVEL_TESTE, estrategia)
+        return len(idat) + _custo_chunks(representacoes[i])
+
+    melhor = None
+    for tarefa, custo in mapear_paralelo(_testar, tarefas, threads or THREADS_BUSCA):
+        if custo is not None and (melhor is None or custo < melhor[1]):
+            melhor = (tarefa, custo)
+    if melhor is None:
+        return None
+
+    i, filtro, estrategia = melhor[0]
+    dados = filtrados[(i, filtro)]
+    idat = min(
+        _comprimir(dados, NIVEL_TESTE, estrategia),
+        _comprimir(dados, NIVEL_FINAL, estrategia),
+        key=len,
+    )
+    return _montar_png(representacoes[i], largura, altura, idat, img.info.get("icc_profile"))
@@ -0,0 +1,215 @@
+"""
+Qualidade JPEG: estimativa pela tabela de quantização e busca da menor
+qualidade que mantém a imagem visualmente igual (também para WebP e AVIF).
+
+Os candidatos são codificados em memória (BytesIO) e comparados com a
+origem por SSIM na luminância reduzida — NumPy puro, sem disco.
+"""
+
+import io
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Lado maior da luminância usada no SSIM (artefatos de bloco ainda visíveis)
+LADO_SSIM = 1024
+
+# Janela do SSIM (média móvel quadrada) e constantes da definição original
+JANELA_SSIM = 8
+C1 = (0.01 * 255) ** 2
+C2 = (0.03 * 255) ** 2
+
+# Faixa da busca binária
+QUALIDADE_MIN = 40
+QUALIDADE_MAX = 95
+
+# SSIM mínimo padrão — abaixo disso a diferença começa a ser perceptível em fotos
+SSIM_ALVO = 0.985
+
+# Tabela de quantização de luminância padrão do IJG (qualidade 50), Anexo K do JPEG
+TABELA_LUMA_IJG = (
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99,
+)
+SOMA_LUMA_IJG = sum(TABELA_LUMA_IJG)
+
+
+def luma_reduzida(img: Image.Image, tamanho: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """
+    Luminância em float32, reduzida para caber em LADO_SSIM (ou em `tamanho`).
+
+    Args:
+        img: Imagem PIL (qualquer modo).
+        tamanho: Tamanho exato de saída (para comparar com outra luma).
+
+    Returns:
+        Array 2D float32.
+    """
+    luma = img.convert("L")
+    if tamanho is None:
+        largura, altura = luma.size
+        escala = min(1.0, LADO_SSIM / max(largura, altura))
+        tamanho = (max(1, round(largura * escala)), max(1, round(altura * escala)))
+    if luma.size != tamanho:
+        luma = luma.resize(tamanho, Image.BOX)
+    return np.asarray(luma, dtype=np.float32)
+
+
+def _media_janela(plano: np.ndarray) -> np.ndarray:
+    """Média em janelas JANELA_SSIM x JANELA_SSIM (imagem integral, só janelas completas)."""
+    integral = np.zeros((plano.shape[0] + 1, plano.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(plano, axis=0), axis=1, out=integral[1:, 1:])
+    j = JANELA_SSIM
+    soma = integral[j:, j:] - integral[:-j, j:] - integral[j:, :-j] + integral[:-j, :-j]
+    return soma / (j * j)
+
+
+def ssim(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    SSIM médio entre dois planos de mesmo tamanho (valores 0-255).
+
+    Returns:
+        float em [-1, 1]; 1.0 = idênticos.
+    """
+    if a.shape != b.shape:
+        raise ValueError("planos com tamanhos diferentes")
+    if min(a.shape) < JANELA_SSIM:
+        return 1.0 if np.array_equal(a, b) else 0.0
+
+    a = a.astype(np.float64)
+    b = b.astype(np.float64)
+    mu_a = _media_janela(a)
+    mu_b = _media_janela(b)
+    var_a = _media_janela(a * a) - mu_a * mu_a
+    var_b = _media_janela(b * b) - mu_b * mu_b
+    cov = _media_janela(a * b) - mu_a * mu_b
+
+    mapa = ((2 * mu_a * mu_b + C1) * (2 * cov + C2)) / (
+        (mu_a * mu_a + mu_b * mu_b + C1) * (var_a + var_b + C2)
+    )
+    return float(mapa.mean())
+
+
+def estimar_qualidade_jpeg(img: Image.Image) -> Optional[int]:
+    """
+    Estima a qualidade (escala IJG 1-100) de um JPEG pelas tabelas de quantização.
+
+    Só lê o cabeçalho: `img.quantization` está disponível logo após
+    Image.open, sem decodificar pixels. Tabelas de câmeras e editores não
+    seguem exatamente a escala IJG, então o valor é aproximado (±2).
+
+    Args:
+        img: Imagem aberta com Image.open (formato JPEG).
+
+    Returns:
+        Qualidade estimada, ou None se a imagem não tiver tabelas.
+    """
+    tabelas = getattr(img, "quantization", None)
+    if not tabelas or 0 not in tabelas:
+        return None
+    luma = list(tabelas[0])
+    if len(luma) != 64:
+        return None
+
+    # Inverso do escalonamento IJG: fator < 100 ↔ qualidade > 50
+    fator = sum(luma) * 100.0 / SOMA_LUMA_IJG
+    if fator <= 100:
+        qualidade = (200 - fator) / 2
+    else:
+        qualidade = 5000 / fator
+    return int(min(100, max(1, round(qualidade))))
+
+
+def codificar(img: Image.Image, formato: str, qualidade: int, **opcoes) -> bytes:
+    """Codifica a imagem em memória no formato do Pillow ("JPEG", "WEBP", "AVIF")."""
+    buffer = io.BytesIO()
+    img.save(buffer, formato, quality=qualidade, **opcoes)
+    return buffer.getvalue()
+
+
+def codificar_jpeg(img: Image.Image, qualidade: int, **opcoes) -> bytes:
+    """Codifica a imagem como JPEG em memória."""
+    return codificar(img, "JPEG", qualidade, **opcoes)
+
+
+def medir_ssim(referencia: np.ndarray, dados: bytes) -> float:
+    """SSIM entre a luma de referência e a imagem codificada em `dados`."""
+    tamanho = (referencia.shape[1], referencia.shape[0])
+    with Image.open(io.BytesIO(dados)) as candidato:
+        return ssim(referencia, luma_reduzida(candidato, tamanho))
+
+
+def buscar_qualidade(
+    img: Image.Image,
+    formato: str,
+    ssim_alvo: float = SSIM_ALVO,
+    qualidade_min: int = QUALIDADE_MIN,
+    qualidade_max: int = QUALIDADE_MAX,
+    referencia: Optional[np.ndarray] = None,
+    **opcoes,
+) -> Optional[Tuple[int, bytes, float]]:
+    """
+    Busca binária da menor qualidade com SSIM ≥ alvo, em qualquer formato.
+
+    Sai cedo nos dois extremos: se nem `qualidade_max` atinge o alvo (fonte
+    já degradada ou ruidosa demais), devolve None; se `qualidade_min` já
+    atinge, não testa mais nada.
+
+    Args:
+        img: Imagem RGB ou L (RGBA também para WebP/AVIF).
+        formato: Formato do Pillow ("JPEG", "WEBP", "AVIF").
+        ssim_alvo: SSIM mínimo aceito contra a imagem original.
+        qualidade_min: Menor qualidade testada.
+        qualidade_max: Maior qualidade testada.
+        referencia: luma_reduzida(img) já calculada (reaproveitada entre formatos).
+        **opcoes: Repassadas ao encoder (optimize, subsampling, exif...).
+
+    Returns:
+        (qualidade, bytes codificados, ssim) do melhor candidato, ou None se
+        o alvo não for atingível na faixa.
+    """
+    if referencia is None:
+        referencia = luma_reduzida(img)
+
+    def _avaliar(qualidade: int) -> Tuple[bytes, float]:
+        dados = codificar(img, formato, qualidade, **opcoes)
+        return dados, medir_ssim(referencia, dados)
+
+    dados, valor = _avaliar(qualidade_max)
+    if valor < ssim_alvo:
+        return None
+    melhor = (qualidade_max, dados, valor)
+
+    dados, valor = _avaliar(qualidade_min)
+    if valor >= ssim_alvo:
+        return qualidade_min, dados, valor
+
+    # Invariante: baixo reprova, melhor[0] aprova
+    baixo, alto = qualidade_min, qualidade_max
+    while alto - baixo > 1:
+        meio = (baixo + alto) // 2
+        dados, valor = _avaliar(meio)
+        if valor >= ssim_alvo:
+            alto = meio
+            melhor = (meio, dados, valor)
+        else:
+            baixo = meio
+    return melhor
+
+
+def buscar_qualidade_jpeg(
+    img: Image.Image,
+    ssim_alvo: float = SSIM_ALVO,
+    qualidade_min: int = QUALIDADE_MIN,
+    qualidade_max: int = QUALIDADE_MAX,
+    **opcoes,
+) -> Optional[Tuple[int, bytes, float]]:
+    """Busca binária da menor qualidade JPEG com SSIM ≥ alvo (ver buscar_qualidade)."""
+    return buscar_qualidade(img, "JPEG", ssim_alvo, qualidade_min, qualidade_max, **opcoes)
@@ -2,6 +2,7 @@
 Validador de imagens (verifica se são legíveis).
 """
 
+import math
 import os
 import shutil
 from pathlib import Path
@@ -10,8 +11,15 @@ from typing import Dict, Tuple
 import cv2
 import numpy as np
 
+from ..common.parallel import executar_em_processos
 from ..common.paths import obter_diretorio_base, obter_pastas_entrada_saida
 from ..common.progress import ProgressBar
+from ..common.resource_control import obter_workers_cpu
+
+
+def _iniciar_worker_opencv() -> None:
+    """Um thread de OpenCV por processo — o paralelismo vem do pool."""
+    cv2.setNumThreads(1)
 
 
 class ValidadorImagens:
@@ -27,6 +35,12 @@ class ValidadorImagens:
     LIMIAR_FOCO = 110
     LIMIAR_BORDAS_PCT = 0.005
 
+    # Acima disso a imagem é lida só em cinza e as métricas saem por faixas:
+    # BGR + cinza + Laplaciano float64 de um scan de 200 MP passam de 2 GB
+    ORCAMENTO_PIXELS = 40_000_000
+    ALTURA_FAIXA = 1024
+    MARGEM_FAIXA = 8  # linhas vizinhas para os kernels 3x3 não verem a emenda
+
     def __init__(
         self,
         pasta_origem: Path = None,
@@ -34,6 +48,7 @@ class ValidadorImagens:
         pasta_ilegiveis: Path = None,
         arquivo_log: Path = None,
         gerar_relatorio_html: bool = False,
+        workers: int = None,
     ):
         """
         Inicializa o validador.
@@ -44,6 +59,7 @@ class ValidadorImagens:
             pasta_ilegiveis: Pasta para imagens ilegíveis (None = padrão).
             arquivo_log: Caminho do arquivo de log (None = padrão).
             gerar_relatorio_html: Se True, gera relatório HTML com previews.
+            workers: Processos em paralelo (None = WORKERS_CPU ou cores físicos - 1).
         """
         if pasta_origem is None:
             base = obter_diretorio_base()
@@ -67,6 +83,48 @@ class ValidadorImagens:
 
         self.gerar_relatorio_html = gerar_relatorio_html
         self.resultados = []  # Armazena resultados para relatório HTML
+        self.workers = workers or obter_workers_cpu()
+
+    def _metricas_em_faixas(self, gray: np.ndarray) -> Tuple[float, float, float, float]:
+        """
+        Brilho, desvio, foco (variância do Laplaciano) e razão de bordas por faixas.
+
+        Cada faixa de ALTURA_FAIXA linhas é filtrada com MARGEM_FAIXA linhas
+        das vizinhas e só as linhas úteis entram nas somas, então média, desvio
+        e Laplaciano batem com o cálculo na imagem inteira. No Canny a histerese
+        pode diferir nas emendas — irrelevante para uma razão de bordas.
+
+        Returns:
+            (brilho_medio, desvio_padrao, foco, ratio_bordas)
+        """
+        h, w = gray.shape
+        total_pixels = h * w
+        soma = soma_q = 0.0
+        soma_lap = soma_q_lap = 0.0
+        pixels_borda = 0
+
+        for inicio in range(0, h, self.ALTURA_FAIXA):
+            fim = min(h, inicio + self.ALTURA_FAIXA)
+            topo = max(0, inicio - self.MARGEM_FAIXA)
+            base = min(h, fim + self.MARGEM_FAIXA)
+            faixa = gray[topo:base]
+            uteis = slice(inicio - topo, fim - topo)
+
+            linhas = gray[inicio:fim].astype(np.float64)
+            soma += linhas.sum()
+            soma_q += np.square(linhas).sum()
+
+            lap = cv2.Laplacian(faixa, cv2.CV_64F)[uteis]
+            soma_lap += lap.sum()
+            soma_q_lap += np.square(lap).sum()
+
+            pixels_borda += np.count_nonzero(cv2.Canny(faixa, 50, 150)[uteis])
+
+        brilho_medio = soma / total_pixels
+        desvio_padrao = math.sqrt(max(0.0, soma_q / total_pixels - brilho_medio**2))
+        media_lap = soma_lap / total_pixels
+        foco = max(0.0, soma_q_lap / total_pixels - media_lap**2)
+        return brilho_medio, desvio_padrao, foco, pixels_borda / total_pixels
 
     def _analisar_imagem(self, caminho_imagem: Path) -> Dict:
         """
@@ -79,12 +137,13 @@ class ValidadorImagens:
             dict: Resultado da análise com status e motivo.
         """
         try:
-            img = cv2.imread(str(caminho_imagem))
-            if img is None:
+            # Decodifica direto em cinza (1 byte/pixel), na resolução cheia:
+            # reduzir apagaria o desfoque que o validador existe para pegar
+            gray_full = cv2.imread(str(caminho_imagem), cv2.IMREAD_GRAYSCALE)
+            if gray_full is None:
                 return {"status": False, "motivo": "Erro Leitura"}
-
-            gray_full = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
             h, w = gray_full.shape
+            grande = h * w > self.ORCAMENTO_PIXELS
 
             # CROP (Recorte do Topo)
             crop_start = int(h * self.CROP_TOP_PCT)
@@ -96,14 +155,18 @@ class ValidadorImagens:
                 return {"status": False, "motivo": "Erro crop"}
 
             # MÉTRICAS
-            brilho_medio = np.mean(gray)
-            desvio_padrao = np.std(gray)
-            foco = cv2.Laplacian(gray, cv2.CV_64F).var()
+            if grande:
+                brilho_medio, desvio_padrao, foco, ratio_bordas = self._metricas_em_faixas(gray)
+            else:
+                brilho_medio = np.mean(gray)
+                desvio_padrao = np.std(gray)
+                foco = cv2.Laplacian(gray, cv2.CV_64F).var()
+
+                # Detecção de Bordas
+                bordas = cv2.Canny(gray, 50, 150)
+                pixels_borda = np.count_nonzero(bordas)
+                ratio_bordas = pixels_borda / total_pixels
 
-            # Detecção de Bordas
-            bordas = cv2.Canny(gray, 50, 150)
-            pixels_borda = np.count_nonzero(bordas)
-            ratio_bordas = pixels_borda / total_pixels
 
             motivos = []
             is_legivel = True
@@ -203,8 +266,15 @@ class ValidadorImagens:
         with ProgressBar(
             total=total_arquivos, desc="Analisando", unit="img"
         ).context() as pbar:
-            for arq in arquivos:
-                res = self._analisar_imagem(arq)
+            # Ordenado: log e relatório seguem a ordem da pasta
+            for arq, res in executar_em_processos(
+                self._analisar_imagem,
+                arquivos,
+                self.workers,
+                ordenado=True,
+                inicializador=_iniciar_worker_opencv,
+            ):
+                res = res or {"status": False, "motivo": "Erro: falha no processo de trabalho"}
 
                 if res["status"]:
                     dest = pasta_legiveis / arq.name
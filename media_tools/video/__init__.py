@@ -9,6 +9,8 @@ from .extractor import ExtratorAudio, ExtratorThumbnails
 from .merger import MergerVideos
 from .stabilizer import EstabilizadorVideo
 from .duplicate_detector import DetectorDuplicatasVideos
+from .perceptual_detector import DetectorDuplicatasPerceptuais
+from .audio_detector import DetectorDuplicatasAudio
 from .corrector import CorretorVideo
 from .cutter import CortadorVideo
 from .analyzer import AnalisadorMidia
@@ -27,6 +29,8 @@ __all__ = [
     "MergerVideos",
     "EstabilizadorVideo",
     "DetectorDuplicatasVideos",
+    "DetectorDuplicatasPerceptuais",
+    "DetectorDuplicatasAudio",
     "CorretorVideo",
     "CortadorVideo",
     "AnalisadorMidia",
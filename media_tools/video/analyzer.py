@@ -4,12 +4,15 @@ Usa ffprobe para extrair codec, resolução, FPS, bitrate, duração e tamanho.
 """
 
 import json
+import os
 import subprocess
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from ..common.paths import obter_pastas_entrada_saida
+from ..common.scanner import mapear_paralelo, percorrer_arquivos
 from ..common.validators import verificar_ffmpeg
+from .packet_stats import analisar_pacotes
 
 
 def _formatar_tamanho(bytes_: float) -> str:
@@ -48,12 +51,46 @@ class AnalisadorMidia:
     # Bitrate médio estimado para stream_720p (vídeo ~700k + áudio ~96k)
     BITRATE_STREAM_720P_BPS = 800_000
 
-    def __init__(self, pasta: Path = None):
+    # Bitrates médios por preset (vídeo + áudio)
+    BITRATES_PRESET = {
+        "stream_720p": 800_000,   # 700k vídeo + 96k áudio
+        "stream_540p": 500_000,   # 404k vídeo + 96k áudio
+        "stream_480p": 300_000,   # 204k vídeo + 96k áudio
+    }
+
+    def __init__(
+        self,
+        pasta: Path = None,
+        recursivo: bool = True,
+        workers: int = None,
+        inventario=None,
+        historico=None,
+        profundo: bool = False,
+    ):
+        """
+        Args:
+            pasta: Pasta a analisar (None = entrada/videos).
+            recursivo: Se True, inclui subpastas.
+            workers: Processos ffprobe simultâneos (None = automático).
+            inventario: InventarioMidia opcional — só re-analisa arquivos
+                        cujo tamanho/mtime mudou desde a última varredura.
+            historico: HistoricoEncode opcional — calibra as estimativas com
+                       os resultados reais do CompressorVideo.
+            profundo: Se True, lê também os pacotes do vídeo (GOP, B-frames,
+                      pico de bitrate, timestamps) — mais lento, só demux.
+        """
         if pasta is None:
             entrada, _ = obter_pastas_entrada_saida("videos")
             self.pasta = Path(entrada)
         else:
             self.pasta = Path(pasta)
+        self.recursivo = recursivo
+        # ffprobe passa a maior parte do tempo esperando I/O — mais workers que cores
+        self.workers = workers or min(16, (os.cpu_count() or 4) * 2)
+        self.inventario = inventario
+        self.historico = historico
+        self.profundo = profundo
+        self.reaproveitados = 0
 
     def _obter_info_video(self, arquivo: Path) -> Optional[Dict]:
         """Obtém informações completas do vídeo via ffprobe (1 chamada)."""
@@ -124,29 +161,99 @@ class AnalisadorMidia:
 
         return info
 
-    def _estimar_compressao(self, info: Dict, preset: str = "stream_720p") -> str:
+    def _sondar(self, arquivo: Path) -> Optional[Dict]:
+        """Probe básico e, no modo profundo, estatísticas de pacotes no mesmo dict."""
+        info = self._obter_info_video(arquivo)
+        if info is None or not self.profundo:
+            return info
+        estatisticas = analisar_pacotes(arquivo, info.get("fps_valor"))
+        if estatisticas:
+            info.update(estatisticas)
+        return info
+
+    def _formatar_profundo(self, info: Dict) -> Optional[str]:
+        """Linha complementar do modo profundo (GOP, B-frames, pico, timestamps)."""
+        if info.get("pacotes") is None:
+            return None
+        partes = []
+        if info.get("gop_medio_s"):
+            partes.append(
+                f"GOP {info['gop_medio_s']:.1f}s/{info['gop_medio_quadros']:.0f}q "
+                f"(máx {info['gop_max_s']:.1f}s)"
+            )
+        else:
+            partes.append(f"GOP ? ({info['keyframes']} keyframe(s))")
+        partes.append(f"B-frames {info['b_frames_pct']:.0f}%")
+        if info.get("pico_media"):
+            partes.append(
+                f"pico {info['bitrate_pico_kbps']}k = {info['pico_media']:.1f}× a média"
+            )
+        irregulares = info["saltos_timestamp"] + info["dts_fora_ordem"] + info["pts_ausentes"]
+        if irregulares:
+            partes.append(
+                f"⚠️  timestamps: {info['saltos_timestamp']} salto(s), "
+                f"{info['dts_fora_ordem']} DTS fora de ordem, {info['pts_ausentes']} sem PTS"
+            )
+        return "    ↳ " + " | ".join(partes)
+
+    def _estimar(self, info: Dict, preset: str = "stream_720p") -> Optional[Dict]:
         """
-        Estima tamanho pós-compressão baseado no bitrate médio do preset.
-        Leva em conta redução de resolução para 720p quando aplicável.
+        Estima tamanho (e tempo de encode, se houver histórico) pós-compressão.
+
+        Usa o histórico real do CompressorVideo quando o bucket da fonte tem
+        amostras suficientes; senão, o bitrate médio fixo do preset.
+
+        Returns:
+            dict com estimado_bytes, min_bytes, max_bytes, tempo_s, tempo_min_s,
+            tempo_max_s (None sem histórico) e calibrado — ou None sem duração.
         """
         dur = info["duracao_s"]
         if dur <= 0:
-            return "?"
+            return None
 
-        # Bitrates médios por preset (vídeo + áudio)
-        bitrates = {
-            "stream_720p": 800_000,   # 700k vídeo + 96k áudio
-            "stream_540p": 500_000,   # 404k vídeo + 96k áudio
-            "stream_480p": 300_000,   # 204k vídeo + 96k áudio
+        calibrada = None
+        if self.historico is not None:
+            calibrada = self.historico.estimar(
+                info.get("codec"), info.get("altura", 0), info.get("fps_valor", 0), preset
+            )
+
+        if calibrada is None:
+            estimado = dur * self.BITRATES_PRESET.get(preset, 800_000) / 8
+            return {
+                "estimado_bytes": estimado, "min_bytes": estimado, "max_bytes": estimado,
+                "tempo_s": None, "tempo_min_s": None, "tempo_max_s": None,
+                "calibrado": False,
+            }
+
+        # kbps → bytes: dur × kbps × 1000 / 8
+        return {
+            "estimado_bytes": dur * calibrada["kbps"] * 125,
+            "min_bytes": dur * calibrada["kbps_min"] * 125,
+            "max_bytes": dur * calibrada["kbps_max"] * 125,
+            "tempo_s": dur * calibrada["custo"],
+            "tempo_min_s": dur * calibrada["custo_min"],
+            "tempo_max_s": dur * calibrada["custo_max"],
+            "calibrado": True,
         }
-        bitrate_bps = bitrates.get(preset, 800_000)
-        estimado_bytes = dur * bitrate_bps / 8
+
+    def _estimar_compressao(self, info: Dict, preset: str = "stream_720p") -> str:
+        """
+        Estima tamanho pós-compressão (histórico real ou bitrate médio do preset).
+        Leva em conta redução de resolução para 720p quando aplicável.
+        Estimativas calibradas pelo histórico são marcadas com '*'.
+        """
+        estimativa = self._estimar(info, preset)
+        if estimativa is None:
+            return "?"
+
+        estimado_bytes = estimativa["estimado_bytes"]
         original = info["tamanho_bytes"]
         if original <= 0:
             return "?"
         reducao = (1 - estimado_bytes / original) * 100
         sinal = "-" if reducao >= 0 else "+"
-        return f"~{_formatar_tamanho(estimado_bytes)} ({sinal}{abs(reducao):.0f}%)"
+        marca = "*" if estimativa["calibrado"] else ""
+        return f"~{_formatar_tamanho(estimado_bytes)} ({sinal}{abs(reducao):.0f}%){marca}"
 
     def _recomendar_preset(self, info: Dict) -> str:
         """Recomenda preset baseado no codec, FPS e resolução."""
@@ -166,34 +273,54 @@ class AnalisadorMidia:
             return "stream_720p"
         return "stream_720p"
 
-    def analisar(self) -> List[Dict]:
+    def varrer(self) -> Iterator[Tuple[Path, Optional[Dict]]]:
         """
-        Analisa todos os vídeos da pasta e retorna lista de informações.
+        Varre a pasta e faz o probe dos vídeos em paralelo, em fluxo.
 
-        Returns:
-            Lista de dicts com informações de cada arquivo.
+        Os arquivos são descobertos com os.scandir enquanto os probes já
+        rodam; cada resultado é entregue assim que fica pronto (fora de ordem).
+        Com inventário, arquivos inalterados vêm do SQLite sem ffprobe.
+
+        Yields:
+            (arquivo, info) — info é None quando o ffprobe falha.
         """
+        self.reaproveitados = 0
         pasta = self.pasta.resolve()
         if not pasta.exists():
-            return []
+            return
+        arquivos = percorrer_arquivos(pasta, self.EXTENSOES_VIDEO, self.recursivo)
+
+        if self.inventario is None:
+            yield from mapear_paralelo(self._sondar, arquivos, self.workers)
+            return
+
+        # Sem subpastas a varredura é parcial — não apaga registros de subpastas
+        for arquivo, info, do_cache in self.inventario.sincronizar(
+            pasta, arquivos, self._sondar, self.workers,
+            remover_ausentes=self.recursivo, profundo=self.profundo,
+        ):
+            if do_cache:
+                self.reaproveitados += 1
+            yield arquivo, info
 
-        arquivos = sorted([
-            f for f in pasta.iterdir()
-            if f.is_file() and f.suffix.lower() in self.EXTENSOES_VIDEO
-        ])
-
-        infos = []
-        for arq in arquivos:
-            info = self._obter_info_video(arq)
-            if info:
-                infos.append(info)
+    def analisar(self) -> List[Dict]:
+        """
+        Analisa todos os vídeos da pasta e retorna lista de informações.
 
-        return infos
+        Returns:
+            Lista de dicts com informações de cada arquivo, ordenada por caminho.
+        """
+        infos = [(arq, info) for arq, info in self.varrer() if info]
+        infos.sort(key=lambda par: str(par[0]))
+        return [info for _, info in infos]
 
     def processar(self) -> dict:
         """
         Analisa pasta e imprime relatório completo no terminal.
 
+        As linhas da tabela são impressas conforme os probes terminam e os
+        totais são acumulados no caminho — nada é guardado por arquivo.
+
         Returns:
             dict: {"arquivos": N, "total_bytes": N, "total_duracao_s": N}
         """
@@ -205,32 +332,10 @@ class AnalisadorMidia:
             print(f"❌ Pasta não encontrada: {pasta}")
             return {}
 
-        arquivos = sorted([
-            f for f in pasta.iterdir()
-            if f.is_file() and f.suffix.lower() in self.EXTENSOES_VIDEO
-        ])
-
-        if not arquivos:
-            print(f"ℹ️  Nenhum vídeo encontrado em {pasta}")
-            return {}
-
-        print(f"\n⏳ Analisando {len(arquivos)} vídeo(s)...")
-
-        infos = []
-        for arq in arquivos:
-            info = self._obter_info_video(arq)
-            if info:
-                infos.append(info)
-                print(f"  ✓ {arq.name}")
-            else:
-                print(f"  ✗ {arq.name} (falha ao ler)")
-
-        if not infos:
-            print("❌ Nenhum arquivo analisado com sucesso.")
-            return {}
-
-        total_bytes = sum(i["tamanho_bytes"] for i in infos)
-        total_duracao = sum(i["duracao_s"] for i in infos)
+        modo = "recursivo" if self.recursivo else "sem subpastas"
+        if self.profundo:
+            modo += ", profundo"
+        print(f"\n⏳ Analisando vídeos ({modo}, {self.workers} workers)...")
 
         # --- Tabela principal ---
         print("\n" + "=" * 110)
@@ -245,11 +350,45 @@ class AnalisadorMidia:
         )
         print("-" * 110)
 
-        for info in infos:
-            nome = info["nome"]
+        analisados = 0
+        falhas = []
+        total_bytes = 0
+        total_duracao = 0.0
+        # Estimativa total: soma por arquivo (mantém o original quando o encode cresceria)
+        estimado_total = 0.0
+        estimado_min = 0.0
+        estimado_max = 0.0
+        tempo_total = 0.0
+        tempo_min = 0.0
+        tempo_max = 0.0
+        calibrados = 0
+
+        for arq, info in self.varrer():
+            if not info:
+                falhas.append(arq)
+                continue
+
+            analisados += 1
+            total_bytes += info["tamanho_bytes"]
+            total_duracao += info["duracao_s"]
+
+            # Caminho relativo mostra a subpasta na varredura recursiva
+            nome = str(arq.relative_to(pasta)) if self.recursivo else info["nome"]
             if len(nome) > col_nome:
                 nome = nome[: col_nome - 1] + "…"
 
+            estimativa_arq = self._estimar(info)
+            if estimativa_arq is not None:
+                original = info["tamanho_bytes"]
+                estimado_total += min(original, estimativa_arq["estimado_bytes"])
+                estimado_min += min(original, estimativa_arq["min_bytes"])
+                estimado_max += min(original, estimativa_arq["max_bytes"])
+                if estimativa_arq["calibrado"]:
+                    calibrados += 1
+                    tempo_total += estimativa_arq["tempo_s"]
+                    tempo_min += estimativa_arq["tempo_min_s"]
+                    tempo_max += estimativa_arq["tempo_max_s"]
+
             estimativa = self._estimar_compressao(info)
             recomendacao = self._recomendar_preset(info)
             bitrate_str = f"{info['bitrate_kbps']}k" if info["bitrate_kbps"] else "?"
@@ -265,23 +404,53 @@ class AnalisadorMidia:
                 f"{estimativa:<18} "
                 f"{recomendacao}"
             )
+            if self.profundo:
+                linha_profunda = self._formatar_profundo(info)
+                if linha_profunda:
+                    print(linha_profunda)
 
         print("=" * 110)
+
+        for arq in falhas:
+            print(f"  ✗ {arq.name} (falha ao ler)")
+
+        if not analisados:
+            if falhas:
+                print("❌ Nenhum arquivo analisado com sucesso.")
+            else:
+                print(f"ℹ️  Nenhum vídeo encontrado em {pasta}")
+            return {}
+
         print(
-            f"\n📦 Total: {len(infos)} arquivo(s) | "
+            f"\n📦 Total: {analisados} arquivo(s) | "
             f"{_formatar_tamanho(total_bytes)} | "
             f"{_formatar_duracao(total_duracao)}"
         )
+        if self.inventario is not None:
+            print(
+                f"🗃️  Inventário: {self.reaproveitados} do cache, "
+                f"{analisados - self.reaproveitados} re-analisado(s) "
+                f"({self.inventario.caminho_banco.name})"
+            )
 
         # Estimativa total pós-compressão
-        if total_duracao > 0:
-            estimado_total = total_duracao * self.BITRATE_STREAM_720P_BPS / 8
+        if estimado_total > 0:
             reducao_total = (1 - estimado_total / total_bytes) * 100 if total_bytes > 0 else 0
             print(
                 f"💡 Estimativa pós H.265 stream_720p: "
                 f"~{_formatar_tamanho(estimado_total)} "
                 f"({reducao_total:.0f}% menor)"
             )
+            if calibrados:
+                print(
+                    f"   * {calibrados}/{analisados} calibrado(s) pelo histórico de encodes "
+                    f"— IC 95%: {_formatar_tamanho(estimado_min)}–{_formatar_tamanho(estimado_max)}"
+                )
+                print(
+                    f"⏱️  Tempo de encode estimado ({calibrados} arquivo(s)): "
+                    f"~{_formatar_duracao(tempo_total)} "
+                    f"(IC 95%: {_formatar_duracao(tempo_min)}–{_formatar_duracao(tempo_max)})"
+                )
 
         print("\nComandos:")
         print("  python otimizador-compressor-video.py --preset stream_720p  # compressão")
@@ -290,7 +459,7 @@ class AnalisadorMidia:
         print("=" * 110)
 
         return {
-            "arquivos": len(infos),
+            "arquivos": analisados,
             "total_bytes": total_bytes,
             "total_duracao_s": total_duracao,
         }
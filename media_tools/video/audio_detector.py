@@ -0,0 +1,166 @@
+"""
+Detector de vídeos duplicados pela faixa de áudio.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..common.grouping import agrupar_conectados
+from ..common.paths import obter_pastas_entrada_saida
+from ..common.scanner import mapear_paralelo, percorrer_arquivos
+from ..common.validators import verificar_ffmpeg
+from .audio_fingerprint import IndiceHashesAudio, eh_duplicata_integral, impressao_audio
+from .fingerprint import obter_metadados
+
+
+def _formatar_tempo(segundos: float) -> str:
+    minutos, segundos = divmod(int(round(segundos)), 60)
+    return f"{minutos}:{segundos:02d}"
+
+
+def _analisar(arquivo: Path) -> Optional[Dict]:
+    """Impressão de áudio + resolução e tamanho (para escolher quem manter)."""
+    impressao = impressao_audio(arquivo)
+    if impressao is None:
+        return None
+    metadados = obter_metadados(arquivo) or {}
+    impressao["largura"] = metadados.get("largura", 0)
+    impressao["altura"] = metadados.get("altura", 0)
+    impressao["tamanho"] = metadados.get("tamanho") or arquivo.stat().st_size
+    return impressao
+
+
+class DetectorDuplicatasAudio:
+    """
+    Encontra vídeos com o mesmo áudio — útil quando a imagem difere
+    (marca d'água, crop, letterbox) e a assinatura visual não casa.
+
+    Reporta duplicatas (áudio praticamente inteiro em comum) e trechos
+    sobrepostos com o deslocamento entre os arquivos. Nada é removido: a
+    mesma trilha sonora não prova que a imagem é a mesma.
+    """
+
+    EXTENSOES_VALIDAS = {".mp4", ".m4v", ".mov", ".webm", ".avi", ".mkv"}
+
+    def __init__(
+        self,
+        pasta_origem: Path = None,
+        workers: int = None,
+    ):
+        """
+        Inicializa o detector.
+
+        Args:
+            pasta_origem: Pasta com vídeos para verificar (None = padrão, inclui subpastas).
+            workers: Decodificações simultâneas (None = metade dos cores).
+        """
+        if pasta_origem is None:
+            entrada, _ = obter_pastas_entrada_saida("videos")
+            self.pasta_origem = entrada
+        else:
+            self.pasta_origem = pasta_origem
+
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+
+    def _extrair_impressoes(self, arquivos: List[Path]) -> Tuple[List[Path], List[Dict]]:
+        """Decodifica o áudio e gera as impressões em paralelo."""
+        caminhos: List[Path] = []
+        impressoes: List[Dict] = []
+        sem_audio = 0
+        for concluidos, (arquivo, impressao) in enumerate(
+            mapear_paralelo(_analisar, arquivos, self.workers), 1
+        ):
+            if impressao is None:
+                sem_audio += 1
+            else:
+                caminhos.append(arquivo)
+                impressoes.append(impressao)
+            print(f"\r   {concluidos}/{len(arquivos)} impressões", end="", flush=True)
+        print(f"\r   ✅ {len(impressoes)} impressões ({sem_audio} sem áudio/falha){'':20}")
+        return caminhos, impressoes
+
+    def processar(self) -> dict:
+        """
+        Processa e detecta duplicatas de áudio.
+
+        Returns:
+            dict: Estatísticas do processamento.
+        """
+        vazio = {"duplicatas": 0, "trechos": 0}
+        if not verificar_ffmpeg():
+            return vazio
+
+        pasta_origem = Path(self.pasta_origem).resolve()
+        if not pasta_origem.exists():
+            print(f"❌ Erro: Pasta não encontrada: {pasta_origem}")
+            return vazio
+
+        arquivos = list(percorrer_arquivos(pasta_origem, self.EXTENSOES_VALIDAS))
+        if len(arquivos) < 2:
+            print("ℹ️  É necessário pelo menos 2 vídeos para detectar duplicatas.")
+            return vazio
+
+        print(f"🚀 Analisando o áudio de {len(arquivos)} vídeo(s)...")
+        print(f"   (PCM mono 8 kHz, picos espectrais, {self.workers} workers)")
+        print("-" * 60)
+
+        caminhos, impressoes = self._extrair_impressoes(arquivos)
+        if len(impressoes) < 2:
+            print("ℹ️  Menos de 2 vídeos com áudio — nada a comparar.")
+            return vazio
+
+        indice = IndiceHashesAudio(impressoes)
+        integrais: List[Tuple[int, int]] = []
+        trechos: List[Tuple] = []
+        # Consultas ao índice também em paralelo (numpy libera o GIL no sort/searchsorted)
+        consultas = mapear_paralelo(indice.correspondencias, range(len(impressoes)), self.workers)
+        for id_video, resultados in consultas:
+            for outro, total, deslocamento, inicio, fim in resultados or []:
+                if eh_duplicata_integral(
+                    impressoes[id_video]["duracao"], impressoes[outro]["duracao"], inicio, fim
+                ):
+                    integrais.append((id_video, outro))
+                else:
+                    trechos.append((id_video, outro, total, deslocamento, inicio, fim))
+
+        duplicatas_encontradas = 0
+
+        print("\n📊 Analisando resultados...")
+        print("-" * 60)
+
+        for grupo in agrupar_conectados(integrais):
+            # Sugere manter a maior resolução; empate → maior arquivo
+            grupo.sort(
+                key=lambda i: (impressoes[i]["largura"] * impressoes[i]["altura"], impressoes[i]["tamanho"]),
+                reverse=True,
+            )
+            original, duplicados = grupo[0], grupo[1:]
+            duplicatas_encontradas += len(duplicados)
+
+            info = impressoes[original]
+            print(f"\n🔊 Mesmo áudio ({len(grupo)} arquivos, {_formatar_tempo(info['duracao'])}):")
+            print(f"   ✅ Maior resolução: {caminhos[original].name} ({info['largura']}x{info['altura']})")
+            for dup in duplicados:
+                info_dup = impressoes[dup]
+                print(f"   🔁 Mesmo áudio: {caminhos[dup].name} ({info_dup['largura']}x{info_dup['altura']})")
+
+        if trechos:
+            print(f"\n✂️  Trechos de áudio em comum:")
+            for a, b, total, deslocamento, inicio, fim in trechos:
+                # deslocamento = tempo em b − tempo em a
+                print(
+                    f"   🔗 {caminhos[a].name} [{_formatar_tempo(inicio)}–{_formatar_tempo(fim)}] "
+                    f"= {caminhos[b].name} [{_formatar_tempo(inicio + deslocamento)}–"
+                    f"{_formatar_tempo(fim + deslocamento)}] ({total} marcos)"
+                )
+
+        print("\n" + "=" * 60)
+        print("📊 RESUMO")
+        print("-" * 60)
+        print(f"🔊 Duplicatas de áudio: {duplicatas_encontradas}")
+        print(f"✂️  Trechos em comum: {len(trechos)}")
+        print("💡 O modo áudio só reporta; confira a imagem (ex: --perceptual) antes de apagar")
+        print("-" * 60)
+
+        return {"duplicatas": duplicatas_encontradas, "trechos": len(trechos)}
@@ -0,0 +1,294 @@
+"""
+Impressão digital de áudio por marcos espectrais (pares de picos).
+
+O áudio é decodificado pelo ffmpeg direto para PCM mono de baixa taxa no
+stdout e lido com np.frombuffer — sem WAV temporário. Cada par de picos do
+espectrograma vira um hash (freq1, freq2, Δt) com o tempo do primeiro pico;
+duas faixas com o mesmo conteúdo acumulam muitos hashes iguais com a mesma
+diferença de tempo, mesmo com vídeo diferente (marca d'água, crop, letterbox).
+"""
+
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# PCM mono 8 kHz: voz e música até 4 kHz bastam para os picos
+TAXA_AMOSTRAGEM = 8000
+
+# STFT: janela de 64 ms, salto de 32 ms
+JANELA = 512
+SALTO = 256
+SEGUNDOS_POR_QUADRO = SALTO / TAXA_AMOSTRAGEM
+
+# Vizinhança (em quadros e bins) em que um pico precisa ser o máximo local
+VIZINHANCA_TEMPO = 10
+VIZINHANCA_FREQ = 10
+
+# Picos mantidos por segundo (os mais fortes) — limita ruído e tamanho do índice
+PICOS_POR_SEGUNDO = 30
+
+# Cada pico âncora é pareado com os próximos FAN_OUT picos a até MAX_DELTA quadros
+FAN_OUT = 8
+MAX_DELTA = 63
+
+# Quadros processados por bloco (~2 min) — memória limitada em faixas longas
+QUADROS_POR_BLOCO = 4096
+
+# Hashes com mais ocorrências no índice que isso (silêncio, tom contínuo) são ignorados
+MAX_OCORRENCIAS_HASH = 200
+
+# Confirmação: hashes alinhados no melhor deslocamento e sobreposição mínima
+MIN_CORRESPONDENCIAS = 25
+MIN_SOBREPOSICAO_S = 10.0
+
+# Sobreposição cobrindo esta fração das duas faixas = duplicata (não trecho)
+FRACAO_INTEGRAL = 0.9
+
+_BITS_FREQ = 9
+_BITS_DELTA = 6
+
+
+def decodificar_audio(arquivo: Path) -> Optional[np.ndarray]:
+    """
+    Decodifica a primeira faixa de áudio como PCM s16le mono a TAXA_AMOSTRAGEM.
+
+    Returns:
+        Amostras int16 (visão sobre o buffer do ffmpeg) ou None se não houver áudio.
+    """
+    comando = [
+        "ffmpeg", "-v", "error", "-nostats",
+        "-i", str(arquivo),
+        "-map", "0:a:0", "-vn", "-sn",
+        "-ac", "1", "-ar", str(TAXA_AMOSTRAGEM),
+        "-f", "s16le", "-",
+    ]
+    try:
+        resultado = subprocess.run(
+            comando, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=1800
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if resultado.returncode != 0 or len(resultado.stdout) < JANELA * 2:
+        return None
+    tamanho = len(resultado.stdout) // 2 * 2
+    return np.frombuffer(resultado.stdout[:tamanho], dtype=np.int16)
+
+
+def _espectrograma(amostras: np.ndarray) -> np.ndarray:
+    """Log-magnitude da STFT (quadros × bins), com FFT vetorizada por bloco."""
+    quadros = sliding_window_view(amostras, JANELA)[::SALTO]
+    janela = np.hanning(JANELA).astype(np.float32)
+    espectro = np.fft.rfft(quadros.astype(np.float32) * janela, axis=1)
+    return np.log1p(np.abs(espectro)).astype(np.float32)
+
+
+def _maximo_local(matriz: np.ndarray, raio: int, eixo: int) -> np.ndarray:
+    """Máximo deslizante de largura 2·raio+1 ao longo de um eixo (bordas = -inf)."""
+    largura = [(0, 0), (0, 0)]
+    largura[eixo] = (raio, raio)
+    preenchida = np.pad(matriz, largura, constant_values=-np.inf)
+    return sliding_window_view(preenchida, 2 * raio + 1, axis=eixo).max(axis=-1)
+
+
+def _picos_bloco(espectro: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Picos do bloco: máximos locais acima da média, limitados por PICOS_POR_SEGUNDO.
+
+    Returns:
+        (quadros, bins) dos picos, ordenados por quadro.
+    """
+    vizinhanca = _maximo_local(
+        _maximo_local(espectro, VIZINHANCA_TEMPO, 0), VIZINHANCA_FREQ, 1
+    )
+    mascara = (espectro == vizinhanca) & (espectro > espectro.mean())
+    quadros, bins = np.nonzero(mascara)
+
+    limite = max(1, int(len(espectro) * SEGUNDOS_POR_QUADRO * PICOS_POR_SEGUNDO))
+    if len(quadros) > limite:
+        mais_fortes = np.argpartition(espectro[quadros, bins], -limite)[-limite:]
+        quadros, bins = quadros[mais_fortes], bins[mais_fortes]
+
+    ordem = np.lexsort((bins, quadros))
+    return quadros[ordem], bins[ordem]
+
+
+def extrair_picos(amostras: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Picos espectrais da faixa inteira, processada em blocos de QUADROS_POR_BLOCO.
+
+    Cada bloco é calculado com margem de VIZINHANCA_TEMPO quadros de cada lado
+    para que os máximos locais na emenda não dependam do corte.
+
+    Returns:
+        (quadros int32, bins int32) dos picos, em ordem de tempo.
+    """
+    total_quadros = 1 + (len(amostras) - JANELA) // SALTO
+    todos_quadros: List[np.ndarray] = []
+    todos_bins: List[np.ndarray] = []
+
+    for inicio in range(0, total_quadros, QUADROS_POR_BLOCO):
+        fim = min(inicio + QUADROS_POR_BLOCO, total_quadros)
+        com_margem_ini = max(0, inicio - VIZINHANCA_TEMPO)
+        com_margem_fim = min(total_quadros, fim + VIZINHANCA_TEMPO)
+        trecho = amostras[com_margem_ini * SALTO:(com_margem_fim - 1) * SALTO + JANELA]
+
+        quadros, bins = _picos_bloco(_espectrograma(trecho))
+        quadros = quadros + com_margem_ini
+        dentro = (quadros >= inicio) & (quadros < fim)
+        todos_quadros.append(quadros[dentro])
+        todos_bins.append(bins[dentro])
+
+    if not todos_quadros:
+        return np.empty(0, np.int32), np.empty(0, np.int32)
+    return (
+        np.concatenate(todos_quadros).astype(np.int32),
+        np.concatenate(todos_bins).astype(np.int32),
+    )
+
+
+def gerar_hashes(quadros: np.ndarray, bins: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pareia cada pico com os FAN_OUT seguintes (Δt de 1 a MAX_DELTA quadros).
+
+    Hash de 24 bits = freq_âncora (9) | freq_alvo (9) | Δt (6).
+
+    Returns:
+        (hashes uint32, tempos int32 do pico âncora)
+    """
+    freq_max = (1 << _BITS_FREQ) - 1
+    hashes: List[np.ndarray] = []
+    tempos: List[np.ndarray] = []
+    for passo in range(1, FAN_OUT + 1):
+        if len(quadros) <= passo:
+            break
+        delta = quadros[passo:] - quadros[:-passo]
+        validos = (delta >= 1) & (delta <= MAX_DELTA)
+        f1 = np.minimum(bins[:-passo][validos], freq_max).astype(np.uint32)
+        f2 = np.minimum(bins[passo:][validos], freq_max).astype(np.uint32)
+        hashes.append(
+            (f1 << (_BITS_FREQ + _BITS_DELTA)) | (f2 << _BITS_DELTA) | delta[validos].astype(np.uint32)
+        )
+        tempos.append(quadros[:-passo][validos])
+
+    if not hashes:
+        return np.empty(0, np.uint32), np.empty(0, np.int32)
+    return np.concatenate(hashes), np.concatenate(tempos).astype(np.int32)
+
+
+def impressao_audio(arquivo: Path) -> Optional[Dict]:
+    """
+    Gera a impressão digital de áudio do arquivo.
+
+    Returns:
+        dict com duracao (s), hashes (uint32) e tempos (quadros), ou None
+        se o arquivo não tiver áudio legível.
+    """
+    amostras = decodificar_audio(arquivo)
+    if amostras is None:
+        return None
+    quadros, bins = extrair_picos(amostras)
+    hashes, tempos = gerar_hashes(quadros, bins)
+    if len(hashes) == 0:
+        return None
+    return {
+        "duracao": len(amostras) / TAXA_AMOSTRAGEM,
+        "hashes": hashes,
+        "tempos": tempos,
+    }
+
+
+class IndiceHashesAudio:
+    """
+    Índice invertido hash → (vídeo, tempo).
+
+    Guardado como arrays ordenados por hash: a busca de todos os hashes de uma
+    faixa é um searchsorted vetorizado, sem dicionário de milhões de chaves.
+    """
+
+    def __init__(self, impressoes: List[Dict]):
+        self.impressoes = impressoes
+        hashes = np.concatenate([imp["hashes"] for imp in impressoes])
+        ids = np.concatenate(
+            [np.full(len(imp["hashes"]), i, dtype=np.int32) for i, imp in enumerate(impressoes)]
+        )
+        tempos = np.concatenate([imp["tempos"] for imp in impressoes])
+
+        ordem = np.argsort(hashes, kind="stable")
+        self.hashes = hashes[ordem]
+        self.ids = ids[ordem]
+        self.tempos = tempos[ordem]
+
+    def _buscar(self, hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Todas as ocorrências indexadas dos hashes informados.
+
+        Returns:
+            (posição do hash consultado, posição no índice) de cada ocorrência.
+        """
+        inicio = np.searchsorted(self.hashes, hashes, side="left")
+        fim = np.searchsorted(self.hashes, hashes, side="right")
+        contagem = fim - inicio
+        contagem[contagem > MAX_OCORRENCIAS_HASH] = 0
+
+        consulta = np.repeat(np.arange(len(hashes)), contagem)
+        # Posição dentro de cada faixa [inicio, fim) sem laço Python
+        deslocamento = np.arange(contagem.sum()) - np.repeat(np.cumsum(contagem) - contagem, contagem)
+        return consulta, np.repeat(inicio, contagem) + deslocamento
+
+    def correspondencias(self, id_video: int) -> List[Tuple]:
+        """
+        Compara um vídeo com os de id maior (cada par uma única vez).
+
+        Returns:
+            Lista de (id_outro, correspondencias, deslocamento_s, inicio_s, fim_s),
+            com deslocamento = tempo no outro − tempo neste vídeo e o trecho
+            [inicio_s, fim_s] medido neste vídeo.
+        """
+        imp = self.impressoes[id_video]
+        consulta, indice = self._buscar(imp["hashes"])
+        outros = self.ids[indice]
+        mascara = outros > id_video
+        if not mascara.any():
+            return []
+
+        outros = outros[mascara]
+        tempo_aqui = imp["tempos"][consulta[mascara]]
+        deltas = self.tempos[indice[mascara]] - tempo_aqui
+
+        # Histograma (vídeo, Δt): o pico de cada vídeo é o alinhamento
+        chaves = outros.astype(np.int64) << 32 | (deltas.astype(np.int64) & 0xFFFFFFFF)
+        unicas, votos = np.unique(chaves, return_counts=True)
+        videos_unicos = (unicas >> 32).astype(np.int32)
+
+        # Pico por vídeo (chaves ordenadas → vídeos contíguos); descarta cedo
+        # quem não alcança o mínimo nem somando os quadros vizinhos
+        inicios = np.flatnonzero(np.r_[True, videos_unicos[1:] != videos_unicos[:-1]])
+        picos = np.maximum.reduceat(votos, inicios)
+
+        resultados = []
+        for posicao in np.flatnonzero(picos * 3 >= MIN_CORRESPONDENCIAS):
+            ini = inicios[posicao]
+            fim_grupo = inicios[posicao + 1] if posicao + 1 < len(inicios) else len(unicas)
+            outro = videos_unicos[ini]
+            melhor = ini + int(np.argmax(votos[ini:fim_grupo]))
+            delta = int(np.int32(unicas[melhor] & 0xFFFFFFFF))
+
+            # Tolera ±1 quadro de jitter em torno do melhor deslocamento
+            alinhados = (outros == outro) & (np.abs(deltas - delta) <= 1)
+            total = int(alinhados.sum())
+            if total < MIN_CORRESPONDENCIAS:
+                continue
+            inicio = float(tempo_aqui[alinhados].min()) * SEGUNDOS_POR_QUADRO
+            fim = float(tempo_aqui[alinhados].max()) * SEGUNDOS_POR_QUADRO
+            if fim - inicio < MIN_SOBREPOSICAO_S:
+                continue
+            resultados.append((int(outro), total, delta * SEGUNDOS_POR_QUADRO, inicio, fim))
+        return resultados
+
+
+def eh_duplicata_integral(duracao_a: float, duracao_b: float, inicio_s: float, fim_s: float) -> bool:
+    """Sobreposição cobre quase toda a duração das duas faixas."""
+    return fim_s - inicio_s >= FRACAO_INTEGRAL * max(duracao_a, duracao_b)
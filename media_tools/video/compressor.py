@@ -8,6 +8,7 @@ import re
 import shutil
 import subprocess
 import threading
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional, Dict
@@ -28,7 +29,9 @@ from ..common.resource_control import (
     obter_cores_fisicos,
     obter_cores_encoder,
 )
+from . import encode_policy
 from .corrector import CorretorVideo
+from .history import HistoricoEncode
 
 
 class CompressorVideo:
@@ -40,35 +43,18 @@ class CompressorVideo:
     # Extensões suportadas
     EXTENSOES_VALIDAS = {".mp4", ".m4v", ".mov", ".webm", ".mkv", ".avi"}
 
-    # Limiar de bpp/s acima do qual HEVC→HEVC ainda vale o encode.
-    # Abaixo → conteúdo já eficiente; AMF CBR não consegue reduzir de forma confiável.
-    # 6.0 bpp/s ≈ 5500 kbps em 720p / 12400 kbps em 1080p.
-    HEVC_BPP_SKIP_LIMIT = 8.0
-    # Arquivos com bpp/s abaixo deste limite já estão tão comprimidos que
-    # o encode não consegue reduzir o tamanho — skip no passo 1.
-    # Aplica a qualquer codec em MP4. Ex: H.264 1350kbps 720p = 1.5 bpp/s → skip.
-    ENCODE_BPP_MINIMO = 2.0
-    # Quando bpp > HEVC_BPP_SKIP_LIMIT, usa este ratio sobre o kbps do limiar como alvo.
-    # Garante target agressivo proporcional à resolução, não 90% do source inflado.
-    # Ex 720p: 6.0 bpp * 921600px / 1000 * 0.85 ≈ 4700 kbps.
-    HEVC_BPP_TARGET_RATIO = 0.70
+    # Limiares de bpp/s da triagem — definidos em encode_policy (compartilhados
+    # com o OtimizadorVideo). Mantidos aqui como atributos para compatibilidade.
+    HEVC_BPP_SKIP_LIMIT = encode_policy.HEVC_BPP_SKIP_LIMIT
+    ENCODE_BPP_MINIMO = encode_policy.ENCODE_BPP_MINIMO
+    HEVC_BPP_TARGET_RATIO = encode_policy.HEVC_BPP_TARGET_RATIO
+    HEVC_FORCA_MB_POR_MIN = encode_policy.HEVC_FORCA_MB_POR_MIN
+    HEVC_FORCA_MIN_MB = encode_policy.HEVC_FORCA_MIN_MB
+    H264_BPP_SKIP_LIMIT = encode_policy.H264_BPP_SKIP_LIMIT
     # Offset de QP aplicado ao av1_amf sobre o CRF do preset.
     # AV1 é mais eficiente que HEVC — +4 QP mantém qualidade visual equivalente
     # ao HEVC no mesmo CRF, com arquivos ~15-25% menores.
     AV1_QP_OFFSET = 10
-    # Densidade MB/min acima da qual força re-encode mesmo com bpp já eficiente.
-    # Valida duração × tamanho em vez de tamanho absoluto — um clipe de 2min com
-    # 2 GB é diferente de uma gravação de 4h com 9 GB (28 MB/min vs 1000 MB/min).
-    # Nesses casos o target é source_kbps × HEVC_BPP_TARGET_RATIO.
-    HEVC_FORCA_MB_POR_MIN = 25   # ex: 4h 9GB = 28 MB/min → força; 8min 133MB = 17 → skip
-    # Tamanho mínimo para o gatilho MB/min — arquivos pequenos não justificam o encode
-    # mesmo com MB/min alto (bastos 74MB 26.8 MB/min ≠ flyckerx 8.3GB 28.6 MB/min)
-    HEVC_FORCA_MIN_MB = 2048  # 2 GB — abaixo disso MB/min não aciona encode
-    # H.264 já comprimido eficientemente (bpp/s abaixo deste limiar) raramente
-    # beneficia de re-encode AV1 — o encoder usa bits similares ou mais para
-    # reproduzir artefatos do H.264 original. Skip instantâneo nesses casos.
-    # Acima do limiar (H.264 sobre-encodado), AV1 consegue compressão real.
-    H264_BPP_SKIP_LIMIT = 4.0
     # Cap de FPS — frames acima deste valor são reduzidos antes do encode.
     # Reduz bitrate, acelera encode e converte VFR para CFR sem reescrever timestamps.
     MAX_FPS = 30
@@ -169,6 +155,7 @@ class CompressorVideo:
         preset_nome: str = None,
         corrigir_problemas: bool = True,
         ordem_fila: str = "menor",
+        registrar_historico: bool = True,
     ):
         """
         Inicializa o compressor.
@@ -179,6 +166,8 @@ class CompressorVideo:
             preset_nome: Nome do preset pré-configurado.
             corrigir_problemas: Se True, detecta e corrige problemas (VFR, timestamps, etc).
             ordem_fila: Ordem de processamento por tamanho — 'menor' (padrão) ou 'maior'.
+            registrar_historico: Se True, grava o resultado de cada encode no
+                                 histórico usado pelas estimativas do analisador.
         """
         if pasta_entrada is None or pasta_saida is None:
             entrada, saida = obter_pastas_entrada_saida("videos")
@@ -204,6 +193,7 @@ class CompressorVideo:
         self.max_bitrate = preset_config.get("max_bitrate")
         self.corrigir_problemas = corrigir_problemas
         self.ordem_fila = ordem_fila  # "menor" = menor→maior (padrão) | "maior" = maior→menor
+        self.registrar_historico = registrar_historico
 
         # Permite sobrescrever o preset de velocidade via env var
         # ENCODER_VELOCIDADE=rapido → faster | normal → medium | lento → slow
@@ -925,6 +915,9 @@ class CompressorVideo:
         stats_lock = threading.Lock()
         converter = []
 
+        # info do ffprobe obtida na triagem — reaproveitada no encode
+        infos_triagem = {}
+
         def _triar(arquivo_origem):
             tamanho_mb = arquivo_origem.stat().st_size / (1024 * 1024)
             eh_mp4 = arquivo_origem.suffix.lower() == '.mp4'
@@ -933,20 +926,28 @@ class CompressorVideo:
             if tamanho_mb < 1:
                 destino = pasta_saida / arquivo_origem.name
                 shutil.move(str(arquivo_origem), str(destino))
-                return ('skip', arquivo_origem, tamanho_mb, 0)
+                return ('skip', arquivo_origem, tamanho_mb, "< 1MB")
 
-            # HEVC + MP4 + resolução ok + FPS ok → já otimizado, move direto
+            # MP4 sem ajuste pendente e com bpp/s que o encode não reduz → move direto
+            # (outros containers sempre convertem — a troca para MP4 é o objetivo)
             if eh_mp4:
                 info = self._obter_info_video(arquivo_origem)
-                codec = info.get('codec', '')
+                with converter_lock:
+                    infos_triagem[arquivo_origem] = info
                 fps = float(info.get('fps') or 0)
-                resolucao_ok = self._construir_filtro_resolucao(info) is None
-                if codec == 'hevc' and resolucao_ok and 0 < fps <= self.MAX_FPS:
+                ajuste_pendente = (
+                    self._construir_filtro_resolucao(info) is not None
+                    or fps > self.MAX_FPS
+                )
+                vale_encode, motivo = encode_policy.avaliar_encode(
+                    info, codec_alvo="hevc", ajuste_pendente=ajuste_pendente
+                )
+                if not vale_encode:
                     destino = pasta_saida / arquivo_origem.name
                     shutil.move(str(arquivo_origem), str(destino))
-                    return ('skip', arquivo_origem, tamanho_mb, fps)
+                    return ('skip', arquivo_origem, tamanho_mb, f"{motivo}, {fps:.0f}fps")
 
-            return ('converter', arquivo_origem, 0, 0)
+            return ('converter', arquivo_origem, 0, None)
 
         workers = min(16, (os.cpu_count() or 4) * 2)
         print(f"\n⚡ Passo 1/2 — triagem paralela ({len(arquivos)} arquivos, {workers} workers)...")
@@ -954,7 +955,7 @@ class CompressorVideo:
         with ThreadPoolExecutor(max_workers=workers) as pool:
             futuros = {pool.submit(_triar, a): a for a in arquivos}
             for fut in as_completed(futuros):
-                resultado, arquivo, tamanho_mb, fps = fut.result()
+                resultado, arquivo, tamanho_mb, motivo = fut.result()
                 concluidos += 1
                 print(f"\r   {concluidos}/{len(arquivos)}", end="", flush=True)
                 if resultado == 'skip':
@@ -962,7 +963,7 @@ class CompressorVideo:
                         total_original_mb += tamanho_mb
                         total_novo_mb += tamanho_mb
                         pulados += 1
-                    print(f"\r   ⏩ {arquivo.name} ({tamanho_mb:.1f}MB, HEVC, {fps:.0f}fps){'':20}")
+                    print(f"\r   ⏩ {arquivo.name} ({tamanho_mb:.1f}MB, {motivo}){'':20}")
                 else:
                     with converter_lock:
                         converter.append(arquivo)
@@ -973,137 +974,163 @@ class CompressorVideo:
         print(f"\r   ✅ {pulados} pulados, {len(converter)} para converter{'':20}\n")
 
         # ── PASSO 2: encode dos arquivos restantes ────────────────────────────
-        for i, arquivo_origem in enumerate(converter, 1):
-            # Verifica recursos antes de processar (apenas em modo CPU)
-            if not self.encoder_gpu and not verificar_recursos_disponiveis(self.limite_cpu, self.limite_memoria):
+        historico = None
+        if self.registrar_historico and converter:
+            try:
+                historico = HistoricoEncode()
+            except Exception as e:
+                print(f"⚠️  Histórico de encodes indisponível: {e}")
+
+        try:
+            for i, arquivo_origem in enumerate(converter, 1):
+                # Verifica recursos antes de processar (apenas em modo CPU)
+                if not self.encoder_gpu and not verificar_recursos_disponiveis(self.limite_cpu, self.limite_memoria):
+                    print(
+                        f"\n⏸️  Aguardando recursos disponíveis (CPU < {self.limite_cpu:.0f}%, Memória < {self.limite_memoria:.0f}%)..."
+                    )
+                    if not aguardar_recursos_disponiveis(
+                        self.limite_cpu, self.limite_memoria, timeout=120.0
+                    ):
+                        print("⚠️  Timeout aguardando recursos. Continuando com cautela...")
+
+                arquivo_destino = pasta_saida / (arquivo_origem.stem + ".mp4")
+                tamanho_original = arquivo_origem.stat().st_size / (1024 * 1024)
+
+                print(f"\n[{i}/{len(converter)}] 📹 {arquivo_origem.name}")
+
+                # Obtém informações antes (reaproveita o probe da triagem)
+                info_antes = infos_triagem.get(arquivo_origem) or self._obter_info_video(arquivo_origem)
                 print(
-                    f"\n⏸️  Aguardando recursos disponíveis (CPU < {self.limite_cpu:.0f}%, Memória < {self.limite_memoria:.0f}%)..."
+                    f"   Antes: {info_antes['width']}x{info_antes['height']} | "
+                    f"{info_antes['codec']} | "
+                    f"{info_antes['bitrate_total']:.0f}kbps | {tamanho_original:.2f}MB"
+                    if info_antes.get("bitrate_total")
+                    else f"{tamanho_original:.2f}MB"
                 )
-                if not aguardar_recursos_disponiveis(
-                    self.limite_cpu, self.limite_memoria, timeout=120.0
-                ):
-                    print("⚠️  Timeout aguardando recursos. Continuando com cautela...")
-
-            arquivo_destino = pasta_saida / (arquivo_origem.stem + ".mp4")
-            tamanho_original = arquivo_origem.stat().st_size / (1024 * 1024)
-
-            print(f"\n[{i}/{len(converter)}] 📹 {arquivo_origem.name}")
-
-            # Obtém informações antes
-            info_antes = self._obter_info_video(arquivo_origem)
-            print(
-                f"   Antes: {info_antes['width']}x{info_antes['height']} | "
-                f"{info_antes['codec']} | "
-                f"{info_antes['bitrate_total']:.0f}kbps | {tamanho_original:.2f}MB"
-                if info_antes.get("bitrate_total")
-                else f"{tamanho_original:.2f}MB"
-            )
 
-            codec_fonte = info_antes.get('codec', '')
-            _max_bitrate_override = None
+                codec_fonte = info_antes.get('codec', '')
+                _max_bitrate_override = None
 
-            _max_bitrate_salvo = self.max_bitrate
-            if _max_bitrate_override:
-                self.max_bitrate = _max_bitrate_override
-            try:
-                sucesso, erro = self._converter_video(arquivo_origem, arquivo_destino, info_antes)
+                _max_bitrate_salvo = self.max_bitrate
+                if _max_bitrate_override:
+                    self.max_bitrate = _max_bitrate_override
+                inicio_encode = time.monotonic()
+                encoder_usado = self.encoder_gpu or "libx265"
+                try:
+                    sucesso, erro = self._converter_video(arquivo_origem, arquivo_destino, info_antes)
 
-                # Cadeia de fallback: hevc_amf → av1_amf → CPU libx265
-                if not sucesso and self.encoder_gpu:
-                    if arquivo_destino.exists():
-                        try: arquivo_destino.unlink()
-                        except OSError: pass
-
-                    # HEVC falhou → tenta AV1
-                    if self.encoder_av1_gpu and self.encoder_gpu != self.encoder_av1_gpu:
-                        print(f"   🔄 HEVC falhou, tentando AV1 ({self.encoder_av1_gpu})...")
-                        encoder_backup = self.encoder_gpu
-                        self.encoder_gpu = self.encoder_av1_gpu
-                        sucesso, erro = self._converter_video(arquivo_origem, arquivo_destino, info_antes)
-                        self.encoder_gpu = encoder_backup
-                        if not sucesso and arquivo_destino.exists():
+                    # Cadeia de fallback: hevc_amf → av1_amf → CPU libx265
+                    if not sucesso and self.encoder_gpu:
+                        if arquivo_destino.exists():
                             try: arquivo_destino.unlink()
                             except OSError: pass
 
-                    # Último recurso: CPU libx265
-                    if not sucesso:
-                        print(f"   🔄 GPU falhou, tentando CPU (libx265)...")
-                        encoder_backup = self.encoder_gpu
-                        self.encoder_gpu = None
-                        sucesso, erro = self._converter_video(arquivo_origem, arquivo_destino, info_antes)
-                        self.encoder_gpu = encoder_backup
-            finally:
-                self.max_bitrate = _max_bitrate_salvo
-
-            if sucesso and arquivo_destino.exists():
-                tamanho_novo = arquivo_destino.stat().st_size / (1024 * 1024)
-
-                info_depois = self._obter_info_video(arquivo_destino)
-                reducao = 100 - (tamanho_novo / tamanho_original * 100)
-                total_original_mb += tamanho_original
-
-                # Output maior que original — descarta encode e move o original para saída
-                if tamanho_novo >= tamanho_original:
-                    if arquivo_origem.suffix.lower() == '.mp4':
-                        # Mesmo formato — não vale a pena, descarta encode e move original
+                        # HEVC falhou → tenta AV1
+                        if self.encoder_av1_gpu and self.encoder_gpu != self.encoder_av1_gpu:
+                            print(f"   🔄 HEVC falhou, tentando AV1 ({self.encoder_av1_gpu})...")
+                            encoder_backup = self.encoder_gpu
+                            self.encoder_gpu = self.encoder_av1_gpu
+                            inicio_encode = time.monotonic()  # mede só a tentativa final
+                            sucesso, erro = self._converter_video(arquivo_origem, arquivo_destino, info_antes)
+                            self.encoder_gpu = encoder_backup
+                            encoder_usado = self.encoder_av1_gpu
+                            if not sucesso and arquivo_destino.exists():
+                                try: arquivo_destino.unlink()
+                                except OSError: pass
+
+                        # Último recurso: CPU libx265
+                        if not sucesso:
+                            print(f"   🔄 GPU falhou, tentando CPU (libx265)...")
+                            encoder_backup = self.encoder_gpu
+                            self.encoder_gpu = None
+                            inicio_encode = time.monotonic()
+                            sucesso, erro = self._converter_video(arquivo_origem, arquivo_destino, info_antes)
+                            self.encoder_gpu = encoder_backup
+                            encoder_usado = "libx265"
+                finally:
+                    self.max_bitrate = _max_bitrate_salvo
+                tempo_encode = time.monotonic() - inicio_encode
+
+                if sucesso and arquivo_destino.exists():
+                    tamanho_novo = arquivo_destino.stat().st_size / (1024 * 1024)
+
+                    # Registra o resultado real (inclusive encodes maiores que o original)
+                    if historico is not None:
+                        historico.registrar(
+                            info_antes, self.preset_nome, encoder_usado,
+                            arquivo_destino.stat().st_size, tempo_encode,
+                        )
+
+                    info_depois = self._obter_info_video(arquivo_destino)
+                    reducao = 100 - (tamanho_novo / tamanho_original * 100)
+                    total_original_mb += tamanho_original
+
+                    # Output maior que original — descarta encode e move o original para saída
+                    if tamanho_novo >= tamanho_original:
+                        if arquivo_origem.suffix.lower() == '.mp4':
+                            # Mesmo formato — não vale a pena, descarta encode e move original
+                            try:
+                                arquivo_destino.unlink()
+                            except OSError:
+                                pass
+                            destino_original = pasta_saida / arquivo_origem.name
+                            shutil.move(str(arquivo_origem), str(destino_original))
+                            total_novo_mb += tamanho_original
+                            print(f"   ⏩ Já otimizado — encode maior ({tamanho_original:.2f}MB -> {tamanho_novo:.2f}MB). Original movido para saída.")
+                            pulados += 1
+                            continue
+                        else:
+                            # Formato diferente (webm/mov/mkv) — mantém MP4 convertido
+                            # e apaga original (objetivo é padronizar para MP4)
+                            try:
+                                arquivo_origem.unlink()
+                            except OSError:
+                                pass
+                            total_novo_mb += tamanho_novo
+                            print(f"   🔄 Convertido para MP4 ({tamanho_original:.2f}MB {arquivo_origem.suffix} -> {tamanho_novo:.2f}MB mp4). Original removido.")
+                            sucessos += 1
+                            continue
+
+                    total_novo_mb += tamanho_novo
+
+                    economizado_acum = total_original_mb - total_novo_mb
+                    print(f"   ✅ Finalizado.")
+                    print(
+                        f"   📊 Redução: {reducao:.1f}% ({tamanho_original:.2f}MB -> {tamanho_novo:.2f}MB)"
+                        f" | 💾 Total poupado: {economizado_acum:.0f}MB"
+                    )
+                    print(
+                        f"   Depois: {info_depois['width']}x{info_depois['height']} | "
+                        f"{info_depois['codec']} | "
+                        f"{info_depois['bitrate_total']:.0f}kbps"
+                        if info_depois.get("bitrate_total")
+                        else "N/A"
+                    )
+
+                    if deletar_originais:
                         try:
-                            arquivo_destino.unlink()
+                            arquivo_origem.unlink()
+                            print("   🗑️  Original removido.")
                         except OSError:
                             pass
-                        destino_original = pasta_saida / arquivo_origem.name
-                        shutil.move(str(arquivo_origem), str(destino_original))
-                        total_novo_mb += tamanho_original
-                        print(f"   ⏩ Já otimizado — encode maior ({tamanho_original:.2f}MB -> {tamanho_novo:.2f}MB). Original movido para saída.")
-                        pulados += 1
-                        continue
-                    else:
-                        # Formato diferente (webm/mov/mkv) — mantém MP4 convertido
-                        # e apaga original (objetivo é padronizar para MP4)
+                    sucessos += 1
+
+                    # Pausa entre vídeos
+                    if i < len(converter):
+                        pausar_entre_processamentos(self.pausa_entre_videos)
+                else:
+                    # Remove arquivo corrompido/incompleto gerado pela falha
+                    if arquivo_destino.exists():
                         try:
-                            arquivo_origem.unlink()
+                            arquivo_destino.unlink()
                         except OSError:
                             pass
-                        total_novo_mb += tamanho_novo
-                        print(f"   🔄 Convertido para MP4 ({tamanho_original:.2f}MB {arquivo_origem.suffix} -> {tamanho_novo:.2f}MB mp4). Original removido.")
-                        sucessos += 1
-                        continue
-
-                total_novo_mb += tamanho_novo
-
-                economizado_acum = total_original_mb - total_novo_mb
-                print(f"   ✅ Finalizado.")
-                print(
-                    f"   📊 Redução: {reducao:.1f}% ({tamanho_original:.2f}MB -> {tamanho_novo:.2f}MB)"
-                    f" | 💾 Total poupado: {economizado_acum:.0f}MB"
-                )
-                print(
-                    f"   Depois: {info_depois['width']}x{info_depois['height']} | "
-                    f"{info_depois['codec']} | "
-                    f"{info_depois['bitrate_total']:.0f}kbps"
-                    if info_depois.get("bitrate_total")
-                    else "N/A"
-                )
-
-                if deletar_originais:
-                    try:
-                        arquivo_origem.unlink()
-                        print("   🗑️  Original removido.")
-                    except OSError:
-                        pass
-                sucessos += 1
-
-                # Pausa entre vídeos
-                if i < len(converter):
-                    pausar_entre_processamentos(self.pausa_entre_videos)
-            else:
-                # Remove arquivo corrompido/incompleto gerado pela falha
-                if arquivo_destino.exists():
-                    try:
-                        arquivo_destino.unlink()
-                    except OSError:
-                        pass
-                print(f"   ❌ Erro: {erro}")
-                falhas += 1
+                    print(f"   ❌ Erro: {erro}")
+                    falhas += 1
+        finally:
+            # Fecha a conexão mesmo se o lote for interrompido
+            if historico is not None:
+                historico.fechar()
 
         print("\n" + "=" * 60)
         print(f"✅ Compressão concluída!")
@@ -2,12 +2,21 @@
 Detector de vídeos duplicados.
 """
 
-import hashlib
+import os
 from pathlib import Path
-from typing import Dict, List
 
+from ..common.hashing import conteudo_identico, encontrar_identicos
+from ..common.library_index import IndiceBiblioteca
 from ..common.paths import obter_pastas_entrada_saida
-from ..common.progress import ProgressBar
+from ..common.scanner import percorrer_arquivos
+from .fingerprint import (
+    GRADE_S,
+    LIMIAR_HAMMING,
+    MIN_FRACAO_SIMILAR,
+    MIN_PONTOS_SOBREPOSTOS,
+    eh_copia_integral,
+    impressao_video,
+)
 
 
 class DetectorDuplicatasVideos:
@@ -21,6 +30,8 @@ class DetectorDuplicatasVideos:
         self,
         pasta_origem: Path = None,
         remover_automaticamente: bool = False,
+        confirmar_completo: bool = False,
+        leitores_por_dispositivo: int = 1,
     ):
         """
         Inicializa o detector.
@@ -28,6 +39,10 @@ class DetectorDuplicatasVideos:
         Args:
             pasta_origem: Pasta com vídeos para verificar (None = padrão).
             remover_automaticamente: Se True, remove duplicatas automaticamente.
+            confirmar_completo: Se True, confirma cada duplicata com BLAKE2 do
+                                arquivo inteiro (lento, mas sem falso positivo).
+                                Com remover_automaticamente a confirmação é sempre feita.
+            leitores_por_dispositivo: Threads de leitura por disco (1 = HDD, 4+ = SSD).
         """
         if pasta_origem is None:
             entrada, _ = obter_pastas_entrada_saida("videos")
@@ -36,36 +51,8 @@ class DetectorDuplicatasVideos:
             self.pasta_origem = pasta_origem
 
         self.remover_automaticamente = remover_automaticamente
-
-    def _calcular_hash_arquivo(self, caminho: Path) -> str:
-        """
-        Calcula hash MD5 do arquivo (amostra para vídeos grandes).
-
-        Args:
-            caminho: Caminho do arquivo.
-
-        Returns:
-            str: Hash MD5.
-        """
-        hash_md5 = hashlib.md5()
-        try:
-            tamanho = caminho.stat().st_size
-            # Para vídeos grandes, usa amostra (primeiros 10MB + últimos 10MB)
-            with open(caminho, "rb") as f:
-                # Primeiros 10MB
-                chunk_size = 10 * 1024 * 1024
-                chunk = f.read(chunk_size)
-                hash_md5.update(chunk)
-
-                # Últimos 10MB se o arquivo for grande
-                if tamanho > chunk_size * 2:
-                    f.seek(tamanho - chunk_size)
-                    chunk = f.read(chunk_size)
-                    hash_md5.update(chunk)
-
-            return hash_md5.hexdigest()
-        except Exception:
-            return ""
+        self.confirmar_completo = confirmar_completo
+        self.leitores_por_dispositivo = leitores_por_dispositivo
 
     def processar(self) -> dict:
         """
@@ -90,24 +77,26 @@ class DetectorDuplicatasVideos:
             print("ℹ️  É necessário pelo menos 2 vídeos para detectar duplicatas.")
             return {"duplicatas": 0, "removidos": 0}
 
+        # Nada é apagado com base só em amostras: remover exige o arquivo inteiro
+        confirmar_completo = self.confirmar_completo or self.remover_automaticamente
+
         print(f"🚀 Analisando {len(arquivos)} vídeo(s) para duplicatas...")
-        print("   (Usando amostra de arquivos grandes para velocidade)")
+        if confirmar_completo:
+            print("   (Tamanho → cabeçalho → amostras → BLAKE2 completo)")
+        else:
+            print("   (Tamanho → cabeçalho → amostras; use --completo para confirmar byte a byte —")
+            print("    com --remover a confirmação completa é sempre feita)")
         print("-" * 60)
 
-        # Mapa de hash -> lista de arquivos
-        hash_map: Dict[str, List[Path]] = {}
-
-        # Calcula hashes
-        with ProgressBar(
-            total=len(arquivos), desc="Calculando hashes", unit="vídeo"
-        ).context() as pbar:
-            for arquivo in arquivos:
-                hash_val = self._calcular_hash_arquivo(arquivo)
-                if hash_val:
-                    if hash_val not in hash_map:
-                        hash_map[hash_val] = []
-                    hash_map[hash_val].append(arquivo)
-                pbar.update(1)
+        def _relatar_estagio(estagio: str, candidatos: int) -> None:
+            print(f"   🔎 {estagio:<10} {candidatos} candidato(s)")
+
+        grupos = encontrar_identicos(
+            arquivos,
+            confirmar_completo=confirmar_completo,
+            leitores_por_dispositivo=self.leitores_por_dispositivo,
+            ao_concluir_estagio=_relatar_estagio,
+        )
 
         # Encontra duplicatas
         duplicatas_encontradas = 0
@@ -116,7 +105,7 @@ class DetectorDuplicatasVideos:
         print("\n📊 Analisando resultados...")
         print("-" * 60)
 
-        for hash_val, arquivos_duplicados in hash_map.items():
+        for arquivos_duplicados in grupos:
             if len(arquivos_duplicados) > 1:
                 duplicatas_encontradas += len(arquivos_duplicados) - 1
 
@@ -151,4 +140,126 @@ class DetectorDuplicatasVideos:
 
         return {"duplicatas": duplicatas_encontradas, "removidos": removidos}
 
+    def indexar_biblioteca(self, indice: IndiceBiblioteca, pasta: Path = None, perceptual: bool = True) -> dict:
+        """
+        Adiciona/atualiza a biblioteca no índice (só arquivos novos ou alterados).
+
+        Args:
+            indice: Índice persistente.
+            pasta: Pasta da biblioteca (None = saida/videos, com subpastas).
+            perceptual: Se True, guarda também a assinatura de keyframes
+                        (decodifica cada vídeo novo uma vez).
+
+        Returns:
+            dict: Estatísticas da sincronização.
+        """
+        if pasta is None:
+            _, pasta = obter_pastas_entrada_saida("videos")
+        pasta = Path(pasta).resolve()
+        if not pasta.exists():
+            print(f"❌ Erro: Pasta não encontrada: {pasta}")
+            return {}
+
+        print(f"📚 Indexando biblioteca: {pasta}")
+        estatisticas = indice.sincronizar(
+            pasta,
+            percorrer_arquivos(pasta, self.EXTENSOES_VALIDAS),
+            "video",
+            lambda arquivo: impressao_video(arquivo, perceptual),
+            workers=max(1, (os.cpu_count() or 2) // 2),
+            ao_progresso=lambda n: print(f"\r   {n} vídeo(s) lido(s)", end="", flush=True),
+        )
+        print(
+            f"\r   ✅ {estatisticas['novos']} novo(s), {estatisticas['atualizados']} atualizado(s), "
+            f"{estatisticas['inalterados']} inalterado(s), {estatisticas['removidos']} removido(s) do índice"
+        )
+        if estatisticas["falhas"]:
+            print(f"   ⚠️  {estatisticas['falhas']} arquivo(s) não puderam ser lidos")
+        return estatisticas
+
+    def comparar_com_biblioteca(self, indice: IndiceBiblioteca, perceptual: bool = True) -> dict:
+        """
+        Checa os vídeos da pasta de origem contra a biblioteca indexada.
+
+        Só os vídeos novos são lidos. O hash do índice é amostrado: com
+        remover_automaticamente ou confirmar_completo, cada correspondência
+        exata é confirmada byte a byte contra o arquivo da biblioteca antes
+        de contar (e de remover). Re-encodes e trechos são apenas reportados.
+
+        Returns:
+            dict: Estatísticas do processamento.
+        """
+        pasta_origem = Path(self.pasta_origem).resolve()
+        if not pasta_origem.exists():
+            print(f"❌ Erro: Pasta não encontrada: {pasta_origem}")
+            return {"duplicatas": 0, "similares": 0, "removidos": 0}
+
+        arquivos = [
+            f
+            for f in pasta_origem.iterdir()
+            if f.is_file() and f.suffix.lower() in self.EXTENSOES_VALIDAS
+        ]
+        print(f"🚀 Comparando {len(arquivos)} vídeo(s) com a biblioteca ({indice.total('video')} indexados)...")
+        print("-" * 60)
+
+        duplicatas = 0
+        similares = 0
+        removidos = 0
+        for arquivo, impressao, correspondencias in indice.verificar_arquivos(
+            arquivos,
+            "video",
+            lambda arquivo: impressao_video(arquivo, perceptual),
+            workers=max(1, (os.cpu_count() or 2) // 2),
+            limiar_hamming=LIMIAR_HAMMING,
+            min_sobrepostos=MIN_PONTOS_SOBREPOSTOS,
+            min_fracao=MIN_FRACAO_SIMILAR,
+        ):
+            if impressao is None:
+                print(f"   ⚠️  {arquivo.name}: não foi possível ler")
+                continue
+            if not correspondencias:
+                continue
+
+            exatas = [c for c in correspondencias if c["correspondencia"] == "exata"]
+            if exatas and (self.remover_automaticamente or self.confirmar_completo):
+                confirmadas = [c for c in exatas if conteudo_identico(arquivo, c["caminho"])]
+                for c in exatas:
+                    if c not in confirmadas:
+                        print(f"\n⚠️  {arquivo.name}: mesmo hash amostrado que {c['caminho']}, mas o conteúdo difere")
+                correspondencias = [c for c in correspondencias if c not in exatas]
+                exatas = confirmadas
+            if exatas:
+                duplicatas += 1
+                print(f"\n❌ {arquivo.name} já está na biblioteca:")
+                print(f"   ✅ {exatas[0]['caminho']}")
+                if self.remover_automaticamente:
+                    try:
+                        arquivo.unlink()
+                        print(f"      🗑️  Removido")
+                        removidos += 1
+                    except Exception as e:
+                        print(f"      ⚠️  Erro ao remover: {e}")
+                continue
+            if not correspondencias:
+                continue
+
+            similares += 1
+            print(f"\n🔍 {arquivo.name} ({impressao['largura']}x{impressao['altura']}) tem o mesmo conteúdo que:")
+            for c in correspondencias[:5]:
+                # Deslocamento do índice: novo[j] ~ biblioteca[j + desloc]
+                if eh_copia_integral({"duracao": c["duracao_s"]}, impressao, c["deslocamento"]):
+                    detalhe = "cópia integral"
+                else:
+                    detalhe = f"trecho a partir de {max(0, c['deslocamento']) * GRADE_S:.0f}s"
+                print(f"   ≈ {c['caminho']} ({c['largura']}x{c['altura']}, {detalhe}, {c['fracao']:.0%})")
+
+        print("\n" + "=" * 60)
+        print("📊 RESUMO")
+        print("-" * 60)
+        print(f"🔍 Já na biblioteca (exatas): {duplicatas}")
+        print(f"≈  Mesmo conteúdo na biblioteca: {similares}")
+        if self.remover_automaticamente:
+            print(f"🗑️  Arquivos removidos: {removidos}")
+        print("-" * 60)
 
+        return {"duplicatas": duplicatas, "similares": similares, "removidos": removidos}
@@ -0,0 +1,120 @@
+"""
+Política de decisão de encode por bits por pixel (bpp/s).
+Compartilhada pela triagem do CompressorVideo (H.265) e do OtimizadorVideo (H.264):
+arquivos que o encode não consegue reduzir nunca entram na fila.
+
+bpp/s = bitrate real (bits/s) / pixels do quadro. Ex: H.264 1350kbps 720p ≈ 1.5.
+"""
+
+from typing import Dict, Optional, Tuple
+
+# Limiar de bpp/s acima do qual HEVC→HEVC ainda vale o encode.
+# Abaixo → conteúdo já eficiente; AMF CBR não consegue reduzir de forma confiável.
+# 6.0 bpp/s ≈ 5500 kbps em 720p / 12400 kbps em 1080p.
+HEVC_BPP_SKIP_LIMIT = 8.0
+# Arquivos com bpp/s abaixo deste limite já estão tão comprimidos que
+# o encode não consegue reduzir o tamanho — skip na triagem.
+# Aplica a qualquer codec. Ex: H.264 1350kbps 720p = 1.5 bpp/s → skip.
+ENCODE_BPP_MINIMO = 2.0
+# Quando bpp > HEVC_BPP_SKIP_LIMIT, usa este ratio sobre o kbps do limiar como alvo.
+# Garante target agressivo proporcional à resolução, não 90% do source inflado.
+# Ex 720p: 6.0 bpp * 921600px / 1000 * 0.85 ≈ 4700 kbps.
+HEVC_BPP_TARGET_RATIO = 0.70
+# Densidade MB/min acima da qual força re-encode mesmo com bpp já eficiente.
+# Valida duração × tamanho em vez de tamanho absoluto — um clipe de 2min com
+# 2 GB é diferente de uma gravação de 4h com 9 GB (28 MB/min vs 1000 MB/min).
+HEVC_FORCA_MB_POR_MIN = 25   # ex: 4h 9GB = 28 MB/min → força; 8min 133MB = 17 → skip
+# Tamanho mínimo para o gatilho MB/min — arquivos pequenos não justificam o encode
+# mesmo com MB/min alto (bastos 74MB 26.8 MB/min ≠ flyckerx 8.3GB 28.6 MB/min)
+HEVC_FORCA_MIN_MB = 2048  # 2 GB — abaixo disso MB/min não aciona encode
+# H.264 já comprimido eficientemente (bpp/s abaixo deste limiar) raramente
+# beneficia de re-encode — o encoder usa bits similares ou mais para
+# reproduzir artefatos do H.264 original. Skip instantâneo nesses casos.
+H264_BPP_SKIP_LIMIT = 4.0
+
+# Codecs de geração HEVC ou posterior — só vale re-encodar com bpp muito alto
+CODECS_EFICIENTES = {"hevc", "av1", "vp9"}
+
+
+def calcular_bitrate_real_kbps(info: Dict) -> Optional[float]:
+    """
+    Bitrate real em kbps a partir de tamanho/duração.
+    Mais confiável que o campo bit_rate do ffprobe em conteúdo VFR.
+
+    Args:
+        info: Dict de _obter_info_video (tamanho, duracao, bitrate_total).
+
+    Returns:
+        float ou None se não houver dados suficientes.
+    """
+    tamanho = info.get("tamanho") or 0
+    duracao = info.get("duracao") or 0
+    if tamanho > 0 and duracao > 0:
+        return tamanho * 8 / duracao / 1000
+    return info.get("bitrate_total") or None
+
+
+def calcular_bpp(info: Dict) -> Optional[float]:
+    """
+    Calcula bits por pixel por segundo (bpp/s) do vídeo.
+
+    Args:
+        info: Dict de _obter_info_video (width, height, tamanho, duracao).
+
+    Returns:
+        float ou None se resolução/bitrate forem desconhecidos.
+    """
+    pixels = (info.get("width") or 0) * (info.get("height") or 0)
+    kbps = calcular_bitrate_real_kbps(info)
+    if not pixels or not kbps:
+        return None
+    return kbps * 1000 / pixels
+
+
+def avaliar_encode(
+    info: Dict, codec_alvo: str = "hevc", ajuste_pendente: bool = False
+) -> Tuple[bool, str]:
+    """
+    Decide se o encode tem chance real de reduzir o arquivo.
+
+    Args:
+        info: Dict de _obter_info_video do arquivo de origem.
+        codec_alvo: Codec que o processador vai gerar ('hevc' ou 'h264').
+            Com alvo 'h264', fontes em outro codec sempre são convertidas.
+        ajuste_pendente: True se a fonte precisa de downscale/cap de FPS —
+            nesse caso o encode acontece independente do bpp.
+
+    Returns:
+        (vale_encode, motivo): motivo curto para exibir na triagem.
+    """
+    if ajuste_pendente:
+        return True, "ajuste de resolução/FPS"
+
+    bpp = calcular_bpp(info)
+    if bpp is None:
+        return True, "bitrate desconhecido"
+
+    codec = (info.get("codec") or "").lower()
+
+    # Alvo H.264 com fonte em outro codec → a conversão é o objetivo (compatibilidade)
+    if codec_alvo == "h264" and codec != "h264":
+        return True, f"conversão {codec.upper() or '?'} → H.264"
+
+    # Gravações longas e densas: força encode mesmo com bpp "eficiente"
+    tamanho_mb = (info.get("tamanho") or 0) / (1024 * 1024)
+    duracao_min = (info.get("duracao") or 0) / 60
+    if tamanho_mb >= HEVC_FORCA_MIN_MB and duracao_min > 0:
+        mb_por_min = tamanho_mb / duracao_min
+        if mb_por_min >= HEVC_FORCA_MB_POR_MIN:
+            return True, f"{mb_por_min:.0f} MB/min"
+
+    if bpp < ENCODE_BPP_MINIMO:
+        return False, f"{bpp:.1f} bpp/s (já comprimido)"
+
+    if codec in CODECS_EFICIENTES and bpp < HEVC_BPP_SKIP_LIMIT:
+        return False, f"{codec.upper()} {bpp:.1f} bpp/s"
+
+    if codec == "h264" and bpp < H264_BPP_SKIP_LIMIT:
+        return False, f"H.264 {bpp:.1f} bpp/s"
+
+    return True, f"{bpp:.1f} bpp/s"
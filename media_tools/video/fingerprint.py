@@ -0,0 +1,303 @@
+"""
+Assinatura perceptual de vídeo (dHash de keyframes) e índice LSH.
+
+Só os keyframes são decodificados (-skip_frame nokey), já reduzidos para 9x8
+em escala de cinza. Os hashes são projetados numa grade de tempo fixa a partir
+do primeiro quadro, então re-encodes, downscales e cortes do mesmo conteúdo
+produzem sequências alinháveis por um deslocamento inteiro da grade.
+"""
+
+import json
+import re
+import subprocess
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..common.hamming import comparar_sequencias, popcount64
+from ..common.hashing import hash_amostras
+
+# Grade da linha do tempo normalizada (segundos entre pontos)
+GRADE_S = 5.0
+
+# dHash 9x8 → 64 bits por quadro
+LARGURA_HASH = 9
+ALTURA_HASH = 8
+
+# Quadros com poucos (ou quase todos) bits ligados são planos (tela preta,
+# fade) — casam com qualquer vídeo e são ignorados no índice e na comparação
+MIN_BITS_HASH = 6
+
+# Distância de Hamming máxima para dois quadros serem "o mesmo"
+LIMIAR_HAMMING = 12
+
+# LSH: o hash de 64 bits é dividido em bandas; quadros que compartilham
+# uma banda inteira viram candidatos
+BANDAS_LSH = 4
+
+# Buckets maiores que isso são "stop words" (quadros genéricos) e são ignorados
+MAX_BUCKET_LSH = 256
+
+# Deslocamentos mais votados verificados por par de candidatos
+TOP_DESLOCAMENTOS = 3
+
+# Pontos da grade sobrepostos mínimos (6 × 5s = 30s) e fração de quadros parecidos
+MIN_PONTOS_SOBREPOSTOS = 6
+MIN_FRACAO_SIMILAR = 0.7
+
+# Pré-filtro: o vídeo mais curto precisa ter ao menos esta fração do mais longo
+PROPORCAO_MIN_DURACAO = 0.5
+
+# Diferença de duração tolerada para considerar cópia integral (não trecho)
+TOLERANCIA_DURACAO_S = 2.0
+TOLERANCIA_DURACAO_PCT = 0.02
+
+_REGEX_PTS = re.compile(r"pts_time:\s*(-?[\d.]+)")
+
+
+def obter_metadados(arquivo: Path) -> Optional[Dict]:
+    """Duração, resolução e tamanho via ffprobe."""
+    comando = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=width,height:format=duration",
+        "-of", "json", str(arquivo),
+    ]
+    try:
+        resultado = subprocess.run(
+            comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30
+        )
+        dados = json.loads(resultado.stdout or "{}")
+        stream = (dados.get("streams") or [{}])[0]
+        return {
+            "duracao": float(dados.get("format", {}).get("duration") or 0),
+            "largura": int(stream.get("width") or 0),
+            "altura": int(stream.get("height") or 0),
+            "tamanho": arquivo.stat().st_size,
+        }
+    except Exception:
+        return None
+
+
+def extrair_keyframes(arquivo: Path) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Decodifica só os keyframes, já em 9x8 cinza, e calcula o dHash de cada um.
+
+    Os quadros saem como rawvideo no stdout; os tempos vêm do showinfo no stderr.
+
+    Returns:
+        (tempos_s, hashes uint64) relativos ao primeiro keyframe, ou None.
+    """
+    comando = [
+        "ffmpeg", "-v", "info", "-nostats",
+        "-skip_frame", "nokey",
+        "-i", str(arquivo),
+        "-map", "0:v:0", "-an", "-sn",
+        "-vf", f"scale={LARGURA_HASH}:{ALTURA_HASH}:flags=area,format=gray,showinfo",
+        "-fps_mode", "passthrough",
+        "-f", "rawvideo", "-",
+    ]
+    try:
+        resultado = subprocess.run(
+            comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=1800
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if resultado.returncode != 0:
+        return None
+
+    tamanho_quadro = LARGURA_HASH * ALTURA_HASH
+    quadros = np.frombuffer(resultado.stdout, dtype=np.uint8)
+    total = len(quadros) // tamanho_quadro
+    tempos = [
+        float(m.group(1))
+        for m in _REGEX_PTS.finditer(resultado.stderr.decode("utf-8", "replace"))
+    ]
+    total = min(total, len(tempos))
+    if total == 0:
+        return None
+
+    quadros = quadros[: total * tamanho_quadro].reshape(total, ALTURA_HASH, LARGURA_HASH)
+    # dHash: cada bit = pixel mais claro que o vizinho da direita
+    bits = quadros[:, :, 1:] > quadros[:, :, :-1]
+    hashes = np.packbits(bits.reshape(total, -1), axis=1).view(">u8").ravel().astype(np.uint64)
+
+    tempos_arr = np.asarray(tempos[:total], dtype=np.float64)
+    ordem = np.argsort(tempos_arr, kind="stable")
+    tempos_arr = tempos_arr[ordem]
+    return tempos_arr - tempos_arr[0], hashes[ordem]
+
+
+def assinatura_video(arquivo: Path) -> Optional[Dict]:
+    """
+    Gera a assinatura perceptual do vídeo.
+
+    Cada ponto da grade (0, GRADE_S, 2·GRADE_S, ...) recebe o hash do keyframe
+    mais próximo. Pontos sem keyframe a menos de GRADE_S ou com quadro plano
+    ficam inválidos (máscara False).
+
+    Returns:
+        dict com duracao, largura, altura, tamanho, hashes (uint64) e
+        validos (bool) — ou None se o vídeo não puder ser lido.
+    """
+    metadados = obter_metadados(arquivo)
+    keyframes = extrair_keyframes(arquivo)
+    if metadados is None or keyframes is None:
+        return None
+    tempos, hashes_kf = keyframes
+
+    duracao = metadados["duracao"] or float(tempos[-1])
+    pontos = np.arange(0.0, max(duracao, GRADE_S), GRADE_S)
+
+    # Keyframe mais próximo de cada ponto da grade
+    direita = np.clip(np.searchsorted(tempos, pontos), 0, len(tempos) - 1)
+    esquerda = np.clip(direita - 1, 0, len(tempos) - 1)
+    usar_esquerda = np.abs(tempos[esquerda] - pontos) < np.abs(tempos[direita] - pontos)
+    indices = np.where(usar_esquerda, esquerda, direita)
+
+    hashes = hashes_kf[indices]
+    bits = popcount64(hashes)
+    validos = (
+        (np.abs(tempos[indices] - pontos) <= GRADE_S)
+        & (bits >= MIN_BITS_HASH)
+        & (bits <= 64 - MIN_BITS_HASH)
+    )
+
+    metadados.update({"duracao": duracao, "hashes": hashes, "validos": validos})
+    return metadados
+
+
+def impressao_video(arquivo: Path, perceptual: bool = True) -> Optional[Dict]:
+    """
+    Impressão para o índice da biblioteca: hash exato (amostrado) + assinatura.
+
+    Args:
+        arquivo: Caminho do vídeo.
+        perceptual: Se False, só o hash exato (sem decodificar keyframes).
+
+    Returns:
+        dict com hash_exato, quadros, validos, largura, altura e duracao —
+        ou None se o arquivo não puder ser lido.
+    """
+    hash_exato = hash_amostras(arquivo)
+    if hash_exato is None:
+        return None
+    impressao = {"hash_exato": hash_exato, "quadros": None, "validos": None,
+                 "largura": 0, "altura": 0, "duracao": 0.0}
+    assinatura = assinatura_video(arquivo) if perceptual else None
+    if assinatura is not None:
+        impressao.update({
+            "quadros": assinatura["hashes"],
+            "validos": assinatura["validos"],
+            "largura": assinatura["largura"],
+            "altura": assinatura["altura"],
+            "duracao": assinatura["duracao"],
+        })
+    return impressao
+
+
+def comparar_alinhado(a: Dict, b: Dict, deslocamento: int) -> Tuple[float, int]:
+    """
+    Compara duas assinaturas com b[j] alinhado a a[j + deslocamento].
+
+    Returns:
+        (fração de pontos parecidos, pontos válidos sobrepostos)
+    """
+    return comparar_sequencias(
+        a["hashes"], a["validos"], b["hashes"], b["validos"], deslocamento, LIMIAR_HAMMING
+    )
+
+
+def duracoes_compativeis(duracao_a: float, duracao_b: float) -> bool:
+    """Pré-filtro de duração: descarta pares em que um é curto demais perto do outro."""
+    curta, longa = sorted((duracao_a, duracao_b))
+    return longa > 0 and curta >= longa * PROPORCAO_MIN_DURACAO
+
+
+def _tolerancia_duracao(a: Dict, b: Dict) -> float:
+    """Diferença de duração (s) ainda aceita como a mesma cópia."""
+    return max(TOLERANCIA_DURACAO_S, TOLERANCIA_DURACAO_PCT * max(a["duracao"], b["duracao"]))
+
+
+def eh_copia_integral(a: Dict, b: Dict, deslocamento: int) -> bool:
+    """Mesma duração (dentro da tolerância) e sem deslocamento relevante."""
+    tolerancia = _tolerancia_duracao(a, b)
+    return (
+        abs(a["duracao"] - b["duracao"]) <= tolerancia
+        and abs(deslocamento) * GRADE_S <= tolerancia
+    )
+
+
+def confirmar_copia_integral(a: Dict, b: Dict) -> bool:
+    """
+    Compara a e b diretamente, sem depender do LSH: testa todo deslocamento
+    que eh_copia_integral aceita e exige a mesma semelhança do par confirmado.
+    """
+    tolerancia = _tolerancia_duracao(a, b)
+    if abs(a["duracao"] - b["duracao"]) > tolerancia:
+        return False
+    alcance = int(tolerancia // GRADE_S)
+    for deslocamento in range(-alcance, alcance + 1):
+        fracao, sobrepostos = comparar_alinhado(a, b, deslocamento)
+        if sobrepostos >= MIN_PONTOS_SOBREPOSTOS and fracao >= MIN_FRACAO_SIMILAR:
+            return True
+    return False
+
+
+class IndiceLSH:
+    """
+    Índice LSH de hashes de quadro.
+
+    Cada quadro válido é inserido em BANDAS_LSH buckets (um por faixa de
+    16 bits). Pares de vídeos que dividem buckets acumulam votos por
+    deslocamento da grade — só esses pares são comparados.
+    """
+
+    def __init__(self):
+        self.buckets: Dict[Tuple[int, int], List[Tuple[int, int]]] = defaultdict(list)
+        self.duracoes: Dict[int, float] = {}
+
+    def adicionar(self, id_video: int, assinatura: Dict) -> None:
+        """Indexa os quadros válidos da assinatura."""
+        self.duracoes[id_video] = assinatura["duracao"]
+        hashes = assinatura["hashes"]
+        bits_banda = 64 // BANDAS_LSH
+        mascara = np.uint64((1 << bits_banda) - 1)
+        for posicao in np.flatnonzero(assinatura["validos"]):
+            valor = hashes[posicao]
+            for banda in range(BANDAS_LSH):
+                chave = int((valor >> np.uint64(banda * bits_banda)) & mascara)
+                self.buckets[(banda, chave)].append((id_video, int(posicao)))
+
+    def candidatos(self) -> Iterator[Tuple[int, int, List[int]]]:
+        """
+        Pares candidatos com os deslocamentos mais votados.
+
+        Yields:
+            (id_a, id_b, [deslocamentos]) com id_a < id_b e b[j] ~ a[j + desloc].
+        """
+        votos: Dict[Tuple[int, int], Counter] = defaultdict(Counter)
+        for entradas in self.buckets.values():
+            if len(entradas) < 2 or len(entradas) > MAX_BUCKET_LSH:
+                continue
+            for i, (video_a, pos_a) in enumerate(entradas):
+                for video_b, pos_b in entradas[i + 1:]:
+                    if video_a == video_b:
+                        continue
+                    if video_a > video_b:
+                        video_a_, pos_a_, video_b_, pos_b_ = video_b, pos_b, video_a, pos_a
+                    else:
+                        video_a_, pos_a_, video_b_, pos_b_ = video_a, pos_a, video_b, pos_b
+                    par = (video_a_, video_b_)
+                    if par not in votos and not duracoes_compativeis(
+                        self.duracoes[video_a_], self.duracoes[video_b_]
+                    ):
+                        continue
+                    votos[par][pos_a_ - pos_b_] += 1
+
+        for (video_a, video_b), contagem in votos.items():
+            if sum(contagem.values()) < MIN_PONTOS_SOBREPOSTOS:
+                continue
+            yield video_a, video_b, [d for d, _ in contagem.most_common(TOP_DESLOCAMENTOS)]
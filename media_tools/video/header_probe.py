@@ -0,0 +1,87 @@
+"""
+Codec, resolução e duração lidos do cabeçalho do contêiner.
+
+MP4/MOV e MKV/WebM são lidos direto (poucos KB por arquivo, sem abrir
+decoder); os demais formatos — ou cabeçalhos atípicos — caem no ffprobe.
+"""
+
+import json
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+
+from .mkv_parser import analisar_mkv
+from .mp4_parser import CODECS_SAMPLE_ENTRY, analisar_mp4
+
+EXTENSOES_MP4 = {".mp4", ".m4v", ".mov"}
+EXTENSOES_MATROSKA = {".mkv", ".webm"}
+
+
+def _via_ffprobe(arquivo: Path) -> Optional[Dict]:
+    comando = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=codec_name,width,height:format=duration",
+        "-of", "json", str(arquivo),
+    ]
+    try:
+        resultado = subprocess.run(
+            comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30
+        )
+        dados = json.loads(resultado.stdout or "{}")
+    except Exception:
+        return None
+    streams = dados.get("streams") or []
+    if not streams:
+        return None
+    stream = streams[0]
+    duracao = dados.get("format", {}).get("duration")
+    return {
+        "codec": stream.get("codec_name"),
+        "largura": int(stream.get("width") or 0),
+        "altura": int(stream.get("height") or 0),
+        "duracao": float(duracao) if duracao else None,
+        "fonte": "ffprobe",
+    }
+
+
+def ler_info_cabecalho(arquivo: Path, usar_ffprobe: bool = True) -> Optional[Dict]:
+    """
+    Lê codec, resolução e duração sem decodificar quadros.
+
+    Args:
+        arquivo: Caminho do vídeo.
+        usar_ffprobe: Se True, recorre ao ffprobe quando o cabeçalho não é
+                      reconhecido ou está incompleto.
+
+    Returns:
+        dict com codec (nome do ffprobe), largura, altura, duracao (s ou None)
+        e fonte ("mp4", "mkv" ou "ffprobe") — ou None se nada puder ser lido.
+    """
+    extensao = arquivo.suffix.lower()
+    info = None
+    if extensao in EXTENSOES_MP4:
+        mp4 = analisar_mp4(arquivo)
+        if mp4 and mp4.get("largura") and mp4.get("altura"):
+            codec = mp4.get("video_codec")
+            info = {
+                "codec": CODECS_SAMPLE_ENTRY.get(codec, codec),
+                "largura": mp4["largura"],
+                "altura": mp4["altura"],
+                "duracao": mp4.get("duracao_s"),
+                "fonte": "mp4",
+            }
+    elif extensao in EXTENSOES_MATROSKA:
+        mkv = analisar_mkv(arquivo)
+        if mkv and mkv.get("largura") and mkv.get("altura"):
+            info = {
+                "codec": mkv.get("video_codec"),
+                "largura": mkv["largura"],
+                "altura": mkv["altura"],
+                "duracao": mkv.get("duracao_s"),
+                "fonte": "mkv",
+            }
+
+    if info is None and usar_ffprobe:
+        info = _via_ffprobe(arquivo)
+    return info
@@ -0,0 +1,197 @@
+"""
+Histórico de encodes do CompressorVideo em SQLite.
+Cada job concluído grava o perfil da fonte e o resultado real (kbps de saída,
+tempo de encode); o AnalisadorMidia usa esses dados para calibrar estimativas.
+"""
+
+import math
+import sqlite3
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from ..common.paths import obter_diretorio_base
+from . import encode_policy
+
+# Amostras mínimas num bucket para a estimativa ser usada
+MIN_AMOSTRAS = 5
+
+# z para intervalo de ~95% (aproximação normal — sem scipy)
+Z_95 = 1.96
+
+# Faixas de altura usadas nos buckets (a fonte cai na primeira >= altura)
+FAIXAS_ALTURA = (480, 720, 1080, 1440, 2160)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS encodes (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    registrado_em   REAL NOT NULL,
+    codec_origem    TEXT,
+    largura         INTEGER,
+    altura          INTEGER,
+    faixa_altura    INTEGER,
+    fps             REAL,
+    faixa_fps       INTEGER,
+    bpp             REAL,
+    preset          TEXT NOT NULL,
+    encoder         TEXT,
+    duracao_s       REAL NOT NULL,
+    tamanho_origem  INTEGER,
+    tamanho_saida   INTEGER NOT NULL,
+    kbps_saida      REAL NOT NULL,
+    tempo_encode_s  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_encodes_bucket
+    ON encodes (preset, faixa_altura, faixa_fps, codec_origem);
+"""
+
+
+def _faixa_altura(altura: int) -> int:
+    """Arredonda a altura para a faixa padrão imediatamente acima (ex: 1088 → 1440)."""
+    for faixa in FAIXAS_ALTURA:
+        if altura <= faixa:
+            return faixa
+    return FAIXAS_ALTURA[-1] * 2
+
+
+def _faixa_fps(fps: float) -> int:
+    """Agrupa FPS em 30 (até 30) ou 60 (acima)."""
+    return 60 if (fps or 0) > 30 else 30
+
+
+def _intervalo(valores: list) -> Tuple[float, float, float]:
+    """
+    Média e intervalo de predição ~95% para uma nova amostra.
+
+    Returns:
+        (media, minimo, maximo) — minimo nunca negativo.
+    """
+    media = statistics.fmean(valores)
+    desvio = statistics.stdev(valores) if len(valores) > 1 else 0.0
+    margem = Z_95 * desvio * math.sqrt(1 + 1 / len(valores))
+    return media, max(0.0, media - margem), media + margem
+
+
+class HistoricoEncode:
+    """
+    Store SQLite com o resultado real de cada encode.
+
+    Buckets de estimativa: preset × faixa de altura × faixa de FPS × codec
+    de origem. Sem amostras suficientes, o bucket é alargado (sem codec,
+    depois sem FPS); se ainda assim faltar dado, estimar() devolve None e o
+    chamador usa as constantes.
+    """
+
+    NOME_BANCO = "historico-encode.db"
+
+    def __init__(self, caminho_banco: Path = None):
+        """
+        Args:
+            caminho_banco: Arquivo SQLite (None = historico-encode.db na raiz do projeto).
+        """
+        self.caminho_banco = Path(caminho_banco or obter_diretorio_base() / self.NOME_BANCO)
+        self.caminho_banco.parent.mkdir(parents=True, exist_ok=True)
+        self.conexao = sqlite3.connect(str(self.caminho_banco))
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.executescript(ESQUEMA)
+        self._cache: Dict[tuple, Optional[Dict]] = {}
+
+    def fechar(self) -> None:
+        """Fecha a conexão com o banco."""
+        self.conexao.close()
+
+    def registrar(
+        self,
+        info_origem: Dict,
+        preset: str,
+        encoder: str,
+        tamanho_saida: int,
+        tempo_encode_s: float,
+    ) -> bool:
+        """
+        Grava o resultado de um encode concluído.
+
+        Args:
+            info_origem: Dict de CompressorVideo._obter_info_video da fonte.
+            preset: Nome do preset usado.
+            encoder: Encoder que efetivamente gerou o arquivo (ex: hevc_amf, libx265).
+            tamanho_saida: Tamanho do arquivo gerado em bytes.
+            tempo_encode_s: Tempo de parede do encode.
+
+        Returns:
+            bool: True se gravou (False se faltar duração).
+        """
+        duracao = info_origem.get("duracao") or 0
+        if duracao <= 0 or tempo_encode_s <= 0:
+            return False
+
+        altura = info_origem.get("height") or 0
+        fps = float(info_origem.get("fps") or 0)
+        try:
+            self.conexao.execute(
+                "INSERT INTO encodes (registrado_em, codec_origem, largura, altura, faixa_altura, "
+                "fps, faixa_fps, bpp, preset, encoder, duracao_s, tamanho_origem, tamanho_saida, "
+                "kbps_saida, tempo_encode_s) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(), info_origem.get("codec"), info_origem.get("width"), altura,
+                    _faixa_altura(altura), fps, _faixa_fps(fps),
+                    encode_policy.calcular_bpp(info_origem), preset, encoder, duracao,
+                    info_origem.get("tamanho"), tamanho_saida,
+                    tamanho_saida * 8 / duracao / 1000, tempo_encode_s,
+                ),
+            )
+            self.conexao.commit()
+        except sqlite3.Error as e:
+            print(f"   ⚠️  Histórico não gravado: {e}")
+            return False
+        self._cache.clear()
+        return True
+
+    def estimar(self, codec: str, altura: int, fps: float, preset: str) -> Optional[Dict]:
+        """
+        Estima kbps de saída e custo de encode para uma fonte.
+
+        Args:
+            codec: Codec de vídeo da fonte.
+            altura: Altura da fonte em pixels.
+            fps: FPS da fonte.
+            preset: Preset do compressor.
+
+        Returns:
+            dict com kbps/kbps_min/kbps_max, custo/custo_min/custo_max
+            (segundos de encode por segundo de vídeo), amostras e bucket —
+            ou None se o histórico for insuficiente.
+        """
+        faixa_h = _faixa_altura(altura or 0)
+        faixa_f = _faixa_fps(fps)
+        chave = (codec, faixa_h, faixa_f, preset)
+        if chave in self._cache:
+            return self._cache[chave]
+
+        # Do bucket mais específico ao mais amplo
+        tentativas = [
+            ("codec_origem = ? AND faixa_fps = ?", (codec, faixa_f), f"{codec} {faixa_h}p{faixa_f}"),
+            ("faixa_fps = ?", (faixa_f,), f"{faixa_h}p{faixa_f}"),
+            ("1 = 1", (), f"{faixa_h}p"),
+        ]
+        estimativa = None
+        for condicao, parametros, rotulo in tentativas:
+            linhas = self.conexao.execute(
+                f"SELECT kbps_saida, tempo_encode_s / duracao_s FROM encodes "
+                f"WHERE preset = ? AND faixa_altura = ? AND {condicao}",
+                (preset, faixa_h) + parametros,
+            ).fetchall()
+            if len(linhas) < MIN_AMOSTRAS:
+                continue
+            kbps, kbps_min, kbps_max = _intervalo([l[0] for l in linhas])
+            custo, custo_min, custo_max = _intervalo([l[1] for l in linhas])
+            estimativa = {
+                "kbps": kbps, "kbps_min": kbps_min, "kbps_max": kbps_max,
+                "custo": custo, "custo_min": custo_min, "custo_max": custo_max,
+                "amostras": len(linhas), "bucket": rotulo,
+            }
+            break
+
+        self._cache[chave] = estimativa
+        return estimativa
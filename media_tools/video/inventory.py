@@ -0,0 +1,332 @@
+"""
+Inventário de mídia persistente em SQLite.
+Guarda o resultado do ffprobe por arquivo e só refaz o probe quando
+tamanho ou mtime mudam — re-análises de bibliotecas grandes ficam incrementais.
+"""
+
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..common.paths import obter_diretorio_base
+
+# Registros gravados por transação durante a varredura
+LOTE_COMMIT = 200
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS arquivos (
+    caminho      TEXT PRIMARY KEY,
+    tamanho      INTEGER NOT NULL,
+    mtime_ns     INTEGER NOT NULL,
+    codec        TEXT,
+    largura      INTEGER,
+    altura       INTEGER,
+    fps          REAL,
+    bitrate_kbps INTEGER,
+    duracao_s    REAL,
+    audio_codec  TEXT,
+    visto_em     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_arquivos_codec ON arquivos (codec, altura);
+CREATE INDEX IF NOT EXISTS idx_arquivos_visto ON arquivos (visto_em);
+"""
+
+COLUNAS = (
+    "caminho", "tamanho", "mtime_ns", "codec", "largura", "altura",
+    "fps", "bitrate_kbps", "duracao_s", "audio_codec", "visto_em",
+)
+
+# Estatísticas do modo --deep (packet_stats) — NULL enquanto não analisadas
+COLUNAS_PROFUNDAS = {
+    "pacotes": "INTEGER",
+    "keyframes": "INTEGER",
+    "gop_medio_s": "REAL",
+    "gop_max_s": "REAL",
+    "gop_medio_quadros": "REAL",
+    "b_frames_pct": "REAL",
+    "bitrate_medio_kbps": "INTEGER",
+    "bitrate_pico_kbps": "INTEGER",
+    "pico_media": "REAL",
+    "dts_fora_ordem": "INTEGER",
+    "pts_ausentes": "INTEGER",
+    "saltos_timestamp": "INTEGER",
+}
+
+
+def _info_de_registro(registro: sqlite3.Row) -> Dict:
+    """Reconstrói o dict de info do AnalisadorMidia a partir de uma linha do banco."""
+    largura = registro["largura"] or 0
+    altura = registro["altura"] or 0
+    fps = registro["fps"] or 0.0
+    if fps:
+        fps_str = f"{fps:.0f}" if fps == int(fps) else f"{fps:.1f}"
+    else:
+        fps_str = "?"
+    info = {
+        "nome": Path(registro["caminho"]).name,
+        "tamanho_bytes": registro["tamanho"],
+        "codec": registro["codec"] or "?",
+        "resolucao": f"{largura}x{altura}" if largura and altura else "?",
+        "largura": largura,
+        "altura": altura,
+        "fps": fps_str,
+        "fps_valor": fps,
+        "bitrate_kbps": registro["bitrate_kbps"] or 0,
+        "duracao_s": registro["duracao_s"] or 0.0,
+        "audio_codec": registro["audio_codec"] or "?",
+    }
+    if registro["pacotes"] is not None:
+        info.update({coluna: registro[coluna] for coluna in COLUNAS_PROFUNDAS})
+    return info
+
+
+class InventarioMidia:
+    """
+    Inventário SQLite dos vídeos analisados.
+
+    Cada linha guarda caminho, tamanho, mtime e os metadados do ffprobe.
+    Na re-varredura, arquivos com (tamanho, mtime_ns) iguais vêm do banco
+    sem novo probe; os demais são analisados e atualizados.
+    """
+
+    NOME_BANCO = "inventario-midia.db"
+
+    def __init__(self, caminho_banco: Path = None):
+        """
+        Args:
+            caminho_banco: Arquivo SQLite (None = inventario-midia.db na raiz do projeto).
+        """
+        self.caminho_banco = Path(caminho_banco or obter_diretorio_base() / self.NOME_BANCO)
+        self.caminho_banco.parent.mkdir(parents=True, exist_ok=True)
+        self.conexao = sqlite3.connect(str(self.caminho_banco))
+        self.conexao.row_factory = sqlite3.Row
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.executescript(ESQUEMA)
+        self._migrar()
+
+    def _migrar(self) -> None:
+        """Adiciona colunas novas em bancos criados por versões anteriores."""
+        existentes = {linha[1] for linha in self.conexao.execute("PRAGMA table_info(arquivos)")}
+        for coluna, tipo in COLUNAS_PROFUNDAS.items():
+            if coluna not in existentes:
+                self.conexao.execute(f"ALTER TABLE arquivos ADD COLUMN {coluna} {tipo}")
+        self.conexao.commit()
+
+    def fechar(self) -> None:
+        """Fecha a conexão com o banco."""
+        self.conexao.close()
+
+    def _carregar_estado(self, pasta: Path) -> Dict[str, Tuple[int, int, bool]]:
+        """Carrega (tamanho, mtime_ns, tem_profundo) dos arquivos já inventariados sob a pasta."""
+        prefixo = str(pasta).rstrip(os.sep) + os.sep
+        cursor = self.conexao.execute(
+            "SELECT caminho, tamanho, mtime_ns, pacotes IS NOT NULL FROM arquivos "
+            "WHERE substr(caminho, 1, ?) = ?",
+            (len(prefixo), prefixo),
+        )
+        return {linha[0]: (linha[1], linha[2], bool(linha[3])) for linha in cursor}
+
+    def _gravar(self, arquivo: Path, stat: os.stat_result, info: Dict, agora: float) -> None:
+        """Insere ou substitui o registro do arquivo (com estatísticas --deep, se houver)."""
+        colunas = COLUNAS + tuple(COLUNAS_PROFUNDAS)
+        self.conexao.execute(
+            f"INSERT OR REPLACE INTO arquivos ({', '.join(colunas)}) "
+            f"VALUES ({', '.join('?' * len(colunas))})",
+            (
+                str(arquivo), stat.st_size, stat.st_mtime_ns,
+                info.get("codec"), info.get("largura"), info.get("altura"),
+                info.get("fps_valor"), info.get("bitrate_kbps"), info.get("duracao_s"),
+                info.get("audio_codec"), agora,
+            ) + tuple(info.get(coluna) for coluna in COLUNAS_PROFUNDAS),
+        )
+
+    def sincronizar(
+        self,
+        pasta: Path,
+        arquivos: Iterable[Path],
+        sondar: Callable[[Path], Optional[Dict]],
+        workers: int,
+        remover_ausentes: bool = True,
+        profundo: bool = False,
+    ) -> Iterator[Tuple[Path, Optional[Dict], bool]]:
+        """
+        Sincroniza o inventário com os arquivos da pasta.
+
+        Arquivos inalterados saem do banco na hora; os novos/alterados passam
+        por `sondar` em paralelo. Toda escrita no SQLite acontece nesta thread.
+        Se o probe de um arquivo falha, o registro antigo dele é apagado.
+
+        Args:
+            pasta: Pasta raiz da varredura (delimita a remoção de ausentes).
+            arquivos: Iterável de arquivos encontrados.
+            sondar: Função de probe (ex: AnalisadorMidia._obter_info_video).
+            workers: Número de probes simultâneos.
+            remover_ausentes: Se True, apaga do banco os arquivos da pasta
+                que não foram vistos nesta varredura.
+            profundo: Se True, registros sem estatísticas --deep são re-analisados.
+
+        Yields:
+            (arquivo, info, do_cache) — info é None quando o probe falha.
+        """
+        agora = time.time()
+        conhecidos = self._carregar_estado(pasta)
+        pendentes_commit = 0
+        workers = max(1, workers)
+        limite = workers * 2
+        em_voo: Dict[Future, Tuple[Path, os.stat_result]] = {}
+
+        def _registrar(arquivo: Path, stat: os.stat_result, info: Optional[Dict]) -> None:
+            nonlocal pendentes_commit
+            if info:
+                self._gravar(arquivo, stat, info, agora)
+            else:
+                # Probe falhou: a linha antiga descreve outro conteúdo, não pode ficar
+                self.conexao.execute("DELETE FROM arquivos WHERE caminho = ?", (str(arquivo),))
+            pendentes_commit += 1
+            if pendentes_commit >= LOTE_COMMIT:
+                self.conexao.commit()
+                pendentes_commit = 0
+
+        def _colher(prontos) -> Iterator[Tuple[Path, Optional[Dict], bool]]:
+            for fut in prontos:
+                arquivo, stat = em_voo.pop(fut)
+                try:
+                    info = fut.result()
+                except Exception:
+                    info = None
+                _registrar(arquivo, stat, info)
+                yield arquivo, info, False
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for arquivo in arquivos:
+                try:
+                    stat = arquivo.stat()
+                except OSError:
+                    continue
+                anterior = conhecidos.pop(str(arquivo), None)
+                if (
+                    anterior is not None
+                    and anterior[:2] == (stat.st_size, stat.st_mtime_ns)
+                    and (anterior[2] or not profundo)
+                ):
+                    # Cache hit sai na hora, sem esperar os probes em voo
+                    yield from self._entregar_cache(arquivo, agora)
+                    continue
+                em_voo[pool.submit(sondar, arquivo)] = (arquivo, stat)
+                if len(em_voo) >= limite:
+                    prontos, _ = wait(em_voo, return_when=FIRST_COMPLETED)
+                else:
+                    prontos = [fut for fut in em_voo if fut.done()]
+                yield from _colher(prontos)
+
+            while em_voo:
+                prontos, _ = wait(em_voo, return_when=FIRST_COMPLETED)
+                yield from _colher(prontos)
+
+        # O que sobrou em `conhecidos` não existe mais na pasta
+        if remover_ausentes and conhecidos:
+            self.conexao.executemany(
+                "DELETE FROM arquivos WHERE caminho = ?", ((c,) for c in conhecidos)
+            )
+        self.conexao.commit()
+
+    def _entregar_cache(self, arquivo: Path, agora: float) -> Iterator[Tuple[Path, Dict, bool]]:
+        """Marca o arquivo como visto e devolve a info salva."""
+        self.conexao.execute(
+            "UPDATE arquivos SET visto_em = ? WHERE caminho = ?", (agora, str(arquivo))
+        )
+        registro = self.conexao.execute(
+            "SELECT * FROM arquivos WHERE caminho = ?", (str(arquivo),)
+        ).fetchone()
+        if registro is not None:
+            yield arquivo, _info_de_registro(registro), True
+
+    def consultar(
+        self,
+        codec: str = None,
+        altura_min: int = None,
+        bitrate_min_kbps: int = None,
+        pasta: Path = None,
+    ) -> List[Dict]:
+        """
+        Consulta o inventário direto no banco (sem ffprobe).
+
+        Ex: consultar(codec="h264", altura_min=1081, bitrate_min_kbps=8000)
+        → todos os H.264 acima de 1080p com mais de 8 Mbps.
+
+        Args:
+            codec: Codec de vídeo exato (ex: "h264", "hevc").
+            altura_min: Altura mínima em pixels.
+            bitrate_min_kbps: Bitrate total mínimo em kbps.
+            pasta: Restringe a arquivos sob esta pasta.
+
+        Returns:
+            Lista de dicts com caminho + info, do maior para o menor.
+        """
+        condicoes = []
+        parametros: list = []
+        if codec:
+            condicoes.append("codec = ?")
+            parametros.append(codec.lower())
+        if altura_min:
+            condicoes.append("altura >= ?")
+            parametros.append(altura_min)
+        if bitrate_min_kbps:
+            condicoes.append("bitrate_kbps >= ?")
+            parametros.append(bitrate_min_kbps)
+        if pasta:
+            prefixo = str(Path(pasta).resolve()).rstrip(os.sep) + os.sep
+            condicoes.append("substr(caminho, 1, ?) = ?")
+            parametros.extend([len(prefixo), prefixo])
+
+        sql = "SELECT * FROM arquivos"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += " ORDER BY tamanho DESC"
+
+        resultados = []
+        for registro in self.conexao.execute(sql, parametros):
+            info = _info_de_registro(registro)
+            info["caminho"] = registro["caminho"]
+            resultados.append(info)
+        return resultados
+
+    def economia_por_preset(self, bitrates_bps: Dict[str, int], pasta: Path = None) -> Dict[str, Dict]:
+        """
+        Estima a economia total por preset com uma agregação SQL.
+
+        Arquivos em que o preset geraria um resultado maior contam como
+        mantidos (o compressor preserva o original nesses casos).
+
+        Args:
+            bitrates_bps: {preset: bitrate médio vídeo+áudio em bps}.
+            pasta: Restringe a arquivos sob esta pasta.
+
+        Returns:
+            {preset: {"original_bytes", "estimado_bytes", "economia_bytes"}}
+        """
+        filtro = "duracao_s > 0"
+        parametros: list = []
+        if pasta:
+            prefixo = str(Path(pasta).resolve()).rstrip(os.sep) + os.sep
+            filtro += " AND substr(caminho, 1, ?) = ?"
+            parametros.extend([len(prefixo), prefixo])
+
+        economia = {}
+        for preset, bps in bitrates_bps.items():
+            original, estimado = self.conexao.execute(
+                f"SELECT COALESCE(SUM(tamanho), 0), "
+                f"COALESCE(SUM(MIN(tamanho, duracao_s * ? / 8)), 0) "
+                f"FROM arquivos WHERE {filtro}",
+                [bps] + parametros,
+            ).fetchone()
+            economia[preset] = {
+                "original_bytes": original,
+                "estimado_bytes": estimado,
+                "economia_bytes": original - estimado,
+            }
+        return economia
@@ -0,0 +1,222 @@
+"""
+Leitura do cabeçalho Matroska/WebM (EBML) sem decodificar o vídeo.
+Só percorre Segment → Info/Tracks, que ficam antes do primeiro Cluster.
+"""
+
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+# IDs EBML (com os bits de marcação, como na especificação)
+ID_EBML = 0x1A45DFA3
+ID_SEGMENT = 0x18538067
+ID_INFO = 0x1549A966
+ID_TRACKS = 0x1654AE6B
+ID_CLUSTER = 0x1F43B675
+ID_TIMECODE_SCALE = 0x2AD7B1
+ID_DURATION = 0x4489
+ID_TRACK_ENTRY = 0xAE
+ID_TRACK_TYPE = 0x83
+ID_CODEC_ID = 0x86
+ID_VIDEO = 0xE0
+ID_PIXEL_WIDTH = 0xB0
+ID_PIXEL_HEIGHT = 0xBA
+
+TRACK_TYPE_VIDEO = 1
+
+# Elementos de cabeçalho acima disso não são lidos (arquivo corrompido)
+TAMANHO_MAX_ELEMENTO = 16 * 1024 * 1024
+
+# Quantos filhos do Segment examinar antes de desistir
+MAX_ELEMENTOS_SEGMENT = 64
+
+# CodecID Matroska → nome de codec do ffprobe
+CODECS_MATROSKA = {
+    "V_MPEG4/ISO/AVC": "h264",
+    "V_MPEGH/ISO/HEVC": "hevc",
+    "V_AV1": "av1",
+    "V_VP8": "vp8",
+    "V_VP9": "vp9",
+    "V_MPEG4/ISO/ASP": "mpeg4",
+    "V_MPEG4/ISO/SP": "mpeg4",
+    "V_MPEG2": "mpeg2video",
+    "V_THEORA": "theora",
+}
+
+
+def _ler_vint(f: BinaryIO, manter_marcador: bool) -> Optional[Tuple[int, int]]:
+    """
+    Lê um inteiro de tamanho variável EBML.
+
+    Returns:
+        (valor, bytes lidos) — valor -1 para tamanho desconhecido (todos os
+        bits em 1) — ou None no fim do arquivo.
+    """
+    primeiro = f.read(1)
+    if not primeiro:
+        return None
+    b0 = primeiro[0]
+    comprimento = 1
+    mascara = 0x80
+    while comprimento <= 8 and not b0 & mascara:
+        mascara >>= 1
+        comprimento += 1
+    if comprimento > 8:
+        return None
+    resto = f.read(comprimento - 1)
+    if len(resto) != comprimento - 1:
+        return None
+    valor = b0 if manter_marcador else b0 & (mascara - 1)
+    for b in resto:
+        valor = (valor << 8) | b
+    if not manter_marcador and valor == (1 << (7 * comprimento)) - 1:
+        return -1, comprimento
+    return valor, comprimento
+
+
+def _ler_cabecalho(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """(id, tamanho do conteúdo) do próximo elemento; tamanho -1 = desconhecido."""
+    lido_id = _ler_vint(f, manter_marcador=True)
+    if lido_id is None:
+        return None
+    lido_tamanho = _ler_vint(f, manter_marcador=False)
+    if lido_tamanho is None:
+        return None
+    return lido_id[0], lido_tamanho[0]
+
+
+def _iterar_elementos(dados: bytes, inicio: int, fim: int) -> Iterator[Tuple[int, int, int]]:
+    """Percorre elementos filhos em memória: (id, início do conteúdo, fim)."""
+    pos = inicio
+    while pos < fim:
+        # ID: o número de zeros à esquerda do primeiro byte dá o comprimento
+        b0 = dados[pos]
+        n_id = 1
+        while n_id <= 4 and not b0 & (0x80 >> (n_id - 1)):
+            n_id += 1
+        if n_id > 4 or pos + n_id >= fim:
+            return
+        id_elemento = int.from_bytes(dados[pos:pos + n_id], "big")
+        pos += n_id
+
+        b0 = dados[pos]
+        n_tam = 1
+        while n_tam <= 8 and not b0 & (0x80 >> (n_tam - 1)):
+            n_tam += 1
+        if n_tam > 8 or pos + n_tam > fim:
+            return
+        tamanho = b0 & ((0x80 >> (n_tam - 1)) - 1)
+        for b in dados[pos + 1:pos + n_tam]:
+            tamanho = (tamanho << 8) | b
+        pos += n_tam
+
+        fim_elemento = min(pos + tamanho, fim)
+        yield id_elemento, pos, fim_elemento
+        pos = fim_elemento
+
+
+def _uint(dados: bytes, inicio: int, fim: int) -> int:
+    return int.from_bytes(dados[inicio:fim], "big")
+
+
+def _float(dados: bytes, inicio: int, fim: int) -> Optional[float]:
+    if fim - inicio == 4:
+        return struct.unpack_from(">f", dados, inicio)[0]
+    if fim - inicio == 8:
+        return struct.unpack_from(">d", dados, inicio)[0]
+    return None
+
+
+def _analisar_info(dados: bytes) -> Optional[float]:
+    """Duração em segundos (Duration × TimecodeScale)."""
+    escala = 1_000_000
+    duracao = None
+    for id_elemento, inicio, fim in _iterar_elementos(dados, 0, len(dados)):
+        if id_elemento == ID_TIMECODE_SCALE:
+            escala = _uint(dados, inicio, fim) or escala
+        elif id_elemento == ID_DURATION:
+            duracao = _float(dados, inicio, fim)
+    if duracao is None:
+        return None
+    return duracao * escala / 1e9
+
+
+def _analisar_tracks(dados: bytes) -> Optional[Dict]:
+    """Primeira faixa de vídeo: codec e dimensões."""
+    for id_faixa, ini_faixa, fim_faixa in _iterar_elementos(dados, 0, len(dados)):
+        if id_faixa != ID_TRACK_ENTRY:
+            continue
+        faixa: Dict = {}
+        for id_elemento, inicio, fim in _iterar_elementos(dados, ini_faixa, fim_faixa):
+            if id_elemento == ID_TRACK_TYPE:
+                faixa["tipo"] = _uint(dados, inicio, fim)
+            elif id_elemento == ID_CODEC_ID:
+                faixa["codec_id"] = dados[inicio:fim].rstrip(b"\x00").decode("ascii", "replace")
+            elif id_elemento == ID_VIDEO:
+                for id_video, ini_v, fim_v in _iterar_elementos(dados, inicio, fim):
+                    if id_video == ID_PIXEL_WIDTH:
+                        faixa["largura"] = _uint(dados, ini_v, fim_v)
+                    elif id_video == ID_PIXEL_HEIGHT:
+                        faixa["altura"] = _uint(dados, ini_v, fim_v)
+        if faixa.get("tipo") == TRACK_TYPE_VIDEO:
+            return faixa
+    return None
+
+
+def analisar_mkv(arquivo: Path) -> Optional[Dict]:
+    """
+    Lê codec, resolução e duração do cabeçalho Matroska/WebM.
+
+    Args:
+        arquivo: Caminho do arquivo MKV/WebM.
+
+    Returns:
+        dict com video_codec (nome do ffprobe), codec_id, largura, altura e
+        duracao_s — ou None se o arquivo não for Matroska ou se as faixas não
+        estiverem antes do primeiro Cluster.
+    """
+    try:
+        with open(arquivo, "rb") as f:
+            cabecalho = _ler_cabecalho(f)
+            if cabecalho is None or cabecalho[0] != ID_EBML or cabecalho[1] < 0:
+                return None
+            f.seek(cabecalho[1], 1)
+
+            cabecalho = _ler_cabecalho(f)
+            if cabecalho is None or cabecalho[0] != ID_SEGMENT:
+                return None
+
+            faixa = None
+            duracao = None
+            for _ in range(MAX_ELEMENTOS_SEGMENT):
+                cabecalho = _ler_cabecalho(f)
+                if cabecalho is None:
+                    break
+                id_elemento, tamanho = cabecalho
+                if id_elemento == ID_CLUSTER or tamanho < 0:
+                    break
+                if id_elemento in (ID_INFO, ID_TRACKS):
+                    if tamanho > TAMANHO_MAX_ELEMENTO:
+                        return None
+                    dados = f.read(tamanho)
+                    if id_elemento == ID_INFO:
+                        duracao = _analisar_info(dados)
+                    else:
+                        faixa = _analisar_tracks(dados)
+                    if faixa is not None and duracao is not None:
+                        break
+                else:
+                    f.seek(tamanho, 1)
+    except OSError:
+        return None
+
+    if faixa is None:
+        return None
+    codec_id = faixa.get("codec_id")
+    return {
+        "video_codec": CODECS_MATROSKA.get(codec_id, codec_id),
+        "codec_id": codec_id,
+        "largura": faixa.get("largura"),
+        "altura": faixa.get("altura"),
+        "duracao_s": duracao,
+    }
@@ -0,0 +1,275 @@
+"""
+Leitura do layout de boxes MP4/MOV (ISO BMFF) sem decodificar o vídeo.
+Usado na triagem para saber a posição do moov atom, codec, perfil e nível.
+"""
+
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+# Boxes que só contêm outros boxes — percorridos recursivamente
+CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts", b"dinf"}
+
+# moov acima disso não é lido (arquivo corrompido ou atípico)
+TAMANHO_MAX_MOOV = 64 * 1024 * 1024
+
+# Perfis H.264 (AVCProfileIndication)
+PERFIS_H264 = {
+    66: "baseline",
+    77: "main",
+    88: "extended",
+    100: "high",
+    110: "high10",
+    122: "high422",
+    244: "high444",
+}
+
+# objectTypeIndication do esds que corresponde a AAC (MPEG-4 e MPEG-2)
+OTI_AAC = {0x40, 0x66, 0x67, 0x68}
+
+# Sample entry → nome de codec do ffprobe
+CODECS_SAMPLE_ENTRY = {
+    "avc1": "h264",
+    "avc3": "h264",
+    "hvc1": "hevc",
+    "hev1": "hevc",
+    "av01": "av1",
+    "vp09": "vp9",
+    "mp4v": "mpeg4",
+}
+
+
+def _ler_header_box(f: BinaryIO, fim: int) -> Optional[Tuple[bytes, int, int]]:
+    """
+    Lê o header de um box na posição atual.
+
+    Returns:
+        (tipo, tamanho_total, tamanho_header) ou None no fim/erro.
+    """
+    inicio = f.tell()
+    if fim - inicio < 8:
+        return None
+    header = f.read(8)
+    if len(header) < 8:
+        return None
+    tamanho, tipo = struct.unpack(">I4s", header)
+    tamanho_header = 8
+    if tamanho == 1:
+        extendido = f.read(8)
+        if len(extendido) < 8:
+            return None
+        tamanho = struct.unpack(">Q", extendido)[0]
+        tamanho_header = 16
+    elif tamanho == 0:
+        tamanho = fim - inicio
+    if tamanho < tamanho_header:
+        return None
+    return tipo, tamanho, tamanho_header
+
+
+def ler_boxes_topo(arquivo: Path) -> List[Tuple[str, int, int]]:
+    """
+    Lista os boxes de nível superior do arquivo (ftyp, moov, mdat, ...).
+
+    Lê apenas os headers — salta o conteúdo com seek, então o custo é
+    constante mesmo para arquivos de vários GB.
+
+    Args:
+        arquivo: Caminho do arquivo MP4/MOV.
+
+    Returns:
+        Lista de (tipo, offset, tamanho). Vazia se não for ISO BMFF.
+    """
+    boxes = []
+    try:
+        fim = arquivo.stat().st_size
+        with open(arquivo, "rb") as f:
+            while f.tell() < fim:
+                offset = f.tell()
+                header = _ler_header_box(f, fim)
+                if header is None:
+                    break
+                tipo, tamanho, _ = header
+                boxes.append((tipo.decode("latin-1"), offset, tamanho))
+                f.seek(offset + tamanho)
+    except OSError:
+        return []
+
+    if not boxes or boxes[0][0] not in ("ftyp", "wide", "free", "moov", "mdat", "skip"):
+        return []
+    return boxes
+
+
+def _iterar_boxes(dados: bytes, inicio: int, fim: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Itera (tipo, inicio_payload, fim_box) dos boxes em dados[inicio:fim]."""
+    pos = inicio
+    while pos + 8 <= fim:
+        tamanho, tipo = struct.unpack_from(">I4s", dados, pos)
+        header = 8
+        if tamanho == 1:
+            if pos + 16 > fim:
+                return
+            tamanho = struct.unpack_from(">Q", dados, pos + 8)[0]
+            header = 16
+        elif tamanho == 0:
+            tamanho = fim - pos
+        if tamanho < header or pos + tamanho > fim:
+            return
+        yield tipo, pos + header, pos + tamanho
+        pos += tamanho
+
+
+def _ler_descritor_tamanho(dados: bytes, pos: int) -> Tuple[int, int]:
+    """Lê o tamanho variável (até 4 bytes, 7 bits cada) de um descritor MPEG-4."""
+    tamanho = 0
+    for _ in range(4):
+        if pos >= len(dados):
+            break
+        byte = dados[pos]
+        pos += 1
+        tamanho = (tamanho << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            break
+    return tamanho, pos
+
+
+def _oti_esds(dados: bytes, inicio: int, fim: int) -> Optional[int]:
+    """Extrai o objectTypeIndication do box esds (ES_Descriptor → DecoderConfig)."""
+    pos = inicio + 4  # version + flags
+    if pos >= fim or dados[pos] != 0x03:
+        return None
+    _, pos = _ler_descritor_tamanho(dados, pos + 1)
+    if pos + 3 > fim:
+        return None
+    flags = dados[pos + 2]
+    pos += 3
+    if flags & 0x80:  # streamDependenceFlag
+        pos += 2
+    if flags & 0x40:  # URL_Flag
+        if pos >= fim:
+            return None
+        pos += 1 + dados[pos]
+    if flags & 0x20:  # OCRstreamFlag
+        pos += 2
+    if pos >= fim or dados[pos] != 0x04:
+        return None
+    _, pos = _ler_descritor_tamanho(dados, pos + 1)
+    return dados[pos] if pos < fim else None
+
+
+def _analisar_stsd(dados: bytes, inicio: int, fim: int, faixa: Dict) -> None:
+    """Lê a primeira sample entry do stsd (codec, resolução, perfil/nível ou OTI)."""
+    pos = inicio + 8  # version/flags + entry_count
+    for tipo, payload, fim_entry in _iterar_boxes(dados, pos, fim):
+        faixa["codec"] = tipo.decode("latin-1")
+        if faixa.get("handler") == "vide":
+            # VisualSampleEntry: 78 bytes fixos antes dos boxes filhos
+            if payload + 28 <= fim_entry:
+                faixa["largura"], faixa["altura"] = struct.unpack_from(">HH", dados, payload + 24)
+            for filho, p_filho, f_filho in _iterar_boxes(dados, payload + 78, fim_entry):
+                if filho == b"avcC" and p_filho + 4 <= f_filho:
+                    faixa["perfil"] = dados[p_filho + 1]
+                    faixa["nivel"] = dados[p_filho + 3]
+        elif faixa.get("handler") == "soun":
+            # AudioSampleEntry (QuickTime v1/v2 têm campos extras)
+            versao = struct.unpack_from(">H", dados, payload + 8)[0] if payload + 10 <= fim_entry else 0
+            base = payload + {0: 28, 1: 44, 2: 64}.get(versao, 28)
+            for filho, p_filho, f_filho in _iterar_boxes(dados, base, fim_entry):
+                if filho == b"esds":
+                    faixa["oti"] = _oti_esds(dados, p_filho, f_filho)
+                elif filho == b"wave":
+                    # QuickTime encapsula o esds dentro de 'wave'
+                    for neto, p_neto, f_neto in _iterar_boxes(dados, p_filho, f_filho):
+                        if neto == b"esds":
+                            faixa["oti"] = _oti_esds(dados, p_neto, f_neto)
+        return  # só a primeira entry interessa
+
+
+def _coletar_faixas(dados: bytes, inicio: int, fim: int, faixas: List[Dict], faixa: Optional[Dict] = None) -> None:
+    """Percorre moov recursivamente preenchendo uma entrada por trak."""
+    for tipo, payload, fim_box in _iterar_boxes(dados, inicio, fim):
+        if tipo == b"trak":
+            nova = {}
+            faixas.append(nova)
+            _coletar_faixas(dados, payload, fim_box, faixas, nova)
+        elif tipo in CONTAINERS:
+            _coletar_faixas(dados, payload, fim_box, faixas, faixa)
+        elif faixa is not None and tipo == b"hdlr" and payload + 12 <= fim_box:
+            faixa["handler"] = dados[payload + 8:payload + 12].decode("latin-1")
+        elif faixa is not None and tipo == b"stsd":
+            _analisar_stsd(dados, payload, fim_box, faixa)
+
+
+def _duracao_mvhd(dados: bytes, inicio: int, fim: int) -> Optional[float]:
+    """Duração do filme (s) a partir do mvhd filho direto do moov."""
+    for tipo, payload, fim_box in _iterar_boxes(dados, inicio, fim):
+        if tipo != b"mvhd" or payload + 4 > fim_box:
+            continue
+        if dados[payload] == 1:
+            if payload + 32 > fim_box:
+                return None
+            escala, duracao = struct.unpack_from(">IQ", dados, payload + 20)
+        else:
+            if payload + 20 > fim_box:
+                return None
+            escala, duracao = struct.unpack_from(">II", dados, payload + 12)
+        return duracao / escala if escala else None
+    return None
+
+
+def analisar_mp4(arquivo: Path) -> Optional[Dict]:
+    """
+    Analisa o layout MP4: posição do moov, codec/perfil/nível do vídeo e codec do áudio.
+
+    Args:
+        arquivo: Caminho do arquivo MP4/MOV.
+
+    Returns:
+        dict com moov_no_inicio, fragmentado, video_codec, perfil, nivel,
+        largura, altura, duracao_s, audio_codec, audio_aac, faixas_audio — ou None se o
+        arquivo não for ISO BMFF legível.
+    """
+    boxes = ler_boxes_topo(arquivo)
+    if not boxes:
+        return None
+
+    tipos = [b[0] for b in boxes]
+    moov = next((b for b in boxes if b[0] == "moov"), None)
+    if moov is None or moov[2] > TAMANHO_MAX_MOOV:
+        return None
+
+    idx_moov = tipos.index("moov")
+    idx_mdat = tipos.index("mdat") if "mdat" in tipos else len(tipos)
+
+    try:
+        with open(arquivo, "rb") as f:
+            f.seek(moov[1])
+            dados = f.read(moov[2])
+    except OSError:
+        return None
+
+    faixas: List[Dict] = []
+    # Pula o header do próprio moov e percorre o conteúdo
+    header = 16 if struct.unpack_from(">I", dados, 0)[0] == 1 else 8
+    _coletar_faixas(dados, header, len(dados), faixas)
+
+    video = next((t for t in faixas if t.get("handler") == "vide"), {})
+    audios = [t for t in faixas if t.get("handler") == "soun"]
+    audio = audios[0] if audios else {}
+
+    return {
+        "moov_no_inicio": idx_moov < idx_mdat,
+        "fragmentado": "moof" in tipos,
+        "video_codec": video.get("codec"),
+        "perfil": video.get("perfil"),
+        "perfil_nome": PERFIS_H264.get(video.get("perfil")),
+        "nivel": video.get("nivel"),
+        "largura": video.get("largura"),
+        "altura": video.get("altura"),
+        "duracao_s": _duracao_mvhd(dados, header, len(dados)),
+        "audio_codec": audio.get("codec"),
+        "audio_aac": bool(audios) and all(
+            t.get("codec") == "mp4a" and t.get("oti") in OTI_AAC for t in audios
+        ),
+        "faixas_audio": len(audios),
+    }
@@ -7,6 +7,7 @@ import os
 import re
 import subprocess
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional, Dict
 
@@ -24,6 +25,7 @@ from ..common.resource_control import (
     definir_prioridade_processo,
     pausar_entre_processamentos,
 )
+from . import encode_policy
 from .corrector import CorretorVideo
 
 
@@ -237,6 +239,10 @@ class OtimizadorVideo:
         """
         Verifica se o vídeo já está otimizado.
 
+        Usa a política de bpp/s compartilhada com o CompressorVideo: um H.264
+        só é considerado otimizado se o bitrate for baixo para a sua resolução
+        (ex: 480p a 4.9 Mbps é re-encodado, 4K a 6 Mbps não).
+
         Args:
             info_original: Informações do vídeo original.
             crf_target: CRF alvo.
@@ -244,15 +250,8 @@ class OtimizadorVideo:
         Returns:
             bool: True se já está otimizado.
         """
-        # Se já é H.264 e tem resolução razoável, pode estar otimizado
-        if info_original["codec"] == "h264":
-            # Verifica se tem bitrate baixo (indicando compressão)
-            if info_original["bitrate_total"]:
-                # Bitrate muito alto pode indicar que não foi otimizado
-                if info_original["bitrate_total"] > 5000:  # > 5 Mbps
-                    return False
-            return True
-        return False
+        vale_encode, _ = encode_policy.avaliar_encode(info_original, codec_alvo="h264")
+        return not vale_encode
 
     def _obter_duracao_video(self, arquivo: Path) -> float:
         """
@@ -320,7 +319,11 @@ class OtimizadorVideo:
         return self.corretor.detectar_problemas(arquivo)
 
     def _converter_video(
-        self, arquivo_entrada: Path, arquivo_saida: Path, apenas_corrigir: bool = False
+        self,
+        arquivo_entrada: Path,
+        arquivo_saida: Path,
+        apenas_corrigir: bool = False,
+        problemas: Dict = None,
     ) -> tuple[bool, Optional[str]]:
         """
         Converte o vídeo usando FFmpeg com barra de progresso.
@@ -329,6 +332,7 @@ class OtimizadorVideo:
             arquivo_entrada: Caminho do arquivo de entrada.
             arquivo_saida: Caminho do arquivo de saída.
             apenas_corrigir: Se True, apenas corrige problemas sem re-encodar (usa copy).
+            problemas: Problemas já detectados na triagem (None = detecta aqui).
 
         Returns:
             Tuple[bool, Optional[str]]: (sucesso, mensagem_erro)
@@ -338,8 +342,9 @@ class OtimizadorVideo:
         if duracao_total == 0:
             duracao_total = 100  # Fallback
 
-        # Detecta problemas se habilitado
-        problemas = self._detectar_problemas(arquivo_entrada)
+        # Detecta problemas se habilitado (reaproveita a triagem quando disponível)
+        if problemas is None:
+            problemas = self._detectar_problemas(arquivo_entrada)
         aplicar_correcoes = self.corrigir_problemas and any(problemas.values())
 
         if aplicar_correcoes:
@@ -688,8 +693,40 @@ class OtimizadorVideo:
         falhas = 0
         pulados = 0
 
-        # Processamento sequencial com informações detalhadas
-        for i, arquivo_origem in enumerate(arquivos, 1):
+        # ── PASSO 1: triagem paralela — probe + política bpp/s + problemas ────
+        triagem = {}
+
+        def _triar(arquivo_origem):
+            info = self._obter_info_video(arquivo_origem)
+            ja_otimizado = self._ja_otimizado(info, self.crf)
+            problemas = None
+            if ja_otimizado and self.corrigir_problemas:
+                problemas = self._detectar_problemas(arquivo_origem)
+            return arquivo_origem, info, ja_otimizado, problemas
+
+        workers = min(16, (os.cpu_count() or 4) * 2)
+        print(f"\n⚡ Passo 1/2 — triagem paralela ({len(arquivos)} arquivos, {workers} workers)...")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futuros = [pool.submit(_triar, a) for a in arquivos]
+            for concluidos, fut in enumerate(as_completed(futuros), 1):
+                arquivo, info, ja_otimizado, problemas = fut.result()
+                triagem[arquivo] = (info, ja_otimizado, problemas)
+                print(f"\r   {concluidos}/{len(arquivos)}", end="", flush=True)
+
+        # Otimizados sem problemas (ou com correções desabilitadas) nunca entram na fila
+        fila = []
+        for arquivo_origem in arquivos:
+            info_antes, ja_otimizado, problemas = triagem[arquivo_origem]
+            if ja_otimizado and not (problemas and any(problemas.values())):
+                _, motivo = encode_policy.avaliar_encode(info_antes, codec_alvo="h264")
+                print(f"\r   ⏭️  {arquivo_origem.name}: já otimizado ({motivo}){'':20}")
+                pulados += 1
+            else:
+                fila.append(arquivo_origem)
+        print(f"\r   ✅ {pulados} pulados, {len(fila)} para processar{'':20}")
+
+        # ── PASSO 2: encode/correção sequencial ───────────────────────────────
+        for i, arquivo_origem in enumerate(fila, 1):
             # Verifica recursos antes de processar
             if not verificar_recursos_disponiveis(self.limite_cpu, self.limite_memoria):
                 print(
@@ -701,48 +738,13 @@ class OtimizadorVideo:
                     print("⚠️  Timeout aguardando recursos. Continuando com cautela...")
 
             arquivo_destino = pasta_saida / arquivo_origem.name
+            info_antes, ja_otimizado, problemas = triagem[arquivo_origem]
 
-            # Obtém informações antes
-            info_antes = self._obter_info_video(arquivo_origem)
-
-            # Verifica se já está otimizado
-            ja_otimizado = self._ja_otimizado(info_antes, self.crf)
-
-            # Se está otimizado, verifica se tem problemas que precisam correção
-            if ja_otimizado and self.corrigir_problemas:
-                problemas = self._detectar_problemas(arquivo_origem)
-                tem_problemas = any(problemas.values())
-
-                if not tem_problemas:
-                    # Está otimizado E sem problemas - pode pular
-                    print(
-                        f"\n[{i}/{len(arquivos)}] ⏭️  {arquivo_origem.name}: já otimizado"
-                    )
-                    print(
-                        f"   Info: {info_antes['width']}x{info_antes['height']} | "
-                        f"{info_antes['codec']} | "
-                        f"{info_antes['bitrate_total']:.0f}kbps"
-                        if info_antes.get("bitrate_total")
-                        else "N/A"
-                    )
-                    pulados += 1
-                    continue
-                else:
-                    # Está otimizado MAS tem problemas - precisa corrigir
-                    print(
-                        f"\n[{i}/{len(arquivos)}] 🔧 {arquivo_origem.name}: otimizado, mas com problemas"
-                    )
-                    print(
-                        f"   Info: {info_antes['width']}x{info_antes['height']} | "
-                        f"{info_antes['codec']} | "
-                        f"{info_antes['bitrate_total']:.0f}kbps"
-                        if info_antes.get("bitrate_total")
-                        else "N/A"
-                    )
-                    print(f"   ⚠️  Aplicando apenas correções (sem re-otimizar)")
-            elif ja_otimizado and not self.corrigir_problemas:
-                # Está otimizado e correções desabilitadas - pode pular
-                print(f"\n[{i}/{len(arquivos)}] ⏭️  {arquivo_origem.name}: já otimizado")
+            # Está otimizado MAS tem problemas - precisa corrigir
+            if ja_otimizado:
+                print(
+                    f"\n[{i}/{len(fila)}] 🔧 {arquivo_origem.name}: otimizado, mas com problemas"
+                )
                 print(
                     f"   Info: {info_antes['width']}x{info_antes['height']} | "
                     f"{info_antes['codec']} | "
@@ -750,8 +752,7 @@ class OtimizadorVideo:
                     if info_antes.get("bitrate_total")
                     else "N/A"
                 )
-                pulados += 1
-                continue
+                print(f"   ⚠️  Aplicando apenas correções (sem re-otimizar)")
 
             tamanho_original = arquivo_origem.stat().st_size / (1024 * 1024)
 
@@ -759,7 +760,7 @@ class OtimizadorVideo:
             apenas_corrigir = ja_otimizado and self.corrigir_problemas
 
             if not apenas_corrigir:
-                print(f"\n[{i}/{len(arquivos)}] 📹 {arquivo_origem.name}")
+                print(f"\n[{i}/{len(fila)}] 📹 {arquivo_origem.name}")
             print(
                 f"   Antes: {info_antes['width']}x{info_antes['height']} | "
                 f"{info_antes['codec']} | "
@@ -769,7 +770,10 @@ class OtimizadorVideo:
             )
 
             sucesso, erro = self._converter_video(
-                arquivo_origem, arquivo_destino, apenas_corrigir=apenas_corrigir
+                arquivo_origem,
+                arquivo_destino,
+                apenas_corrigir=apenas_corrigir,
+                problemas=problemas,
             )
 
             if sucesso and arquivo_destino.exists():
@@ -801,7 +805,7 @@ class OtimizadorVideo:
                 falhas += 1
 
             # Pausa entre processamentos para dar tempo ao sistema se recuperar
-            if i < len(arquivos):  # Não pausa após o último vídeo
+            if i < len(fila):  # Não pausa após o último vídeo
                 pausar_entre_processamentos(self.pausa_entre_videos)
 
         print("\n" + "=" * 60)
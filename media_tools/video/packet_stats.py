@@ -0,0 +1,228 @@
+"""
+Estatísticas de GOP e bitrate a partir dos pacotes do stream de vídeo.
+Lê a saída compact do ffprobe linha a linha — memória constante mesmo
+em gravações de várias horas (nenhum JSON completo é montado).
+"""
+
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+
+# Salto de DTS acima deste múltiplo da duração de quadro conta como irregularidade
+FATOR_SALTO_TIMESTAMP = 5.0
+
+
+def _para_float(valor: str) -> Optional[float]:
+    """Converte campo do ffprobe ('N/A' → None)."""
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+class EstatisticasPacotes:
+    """
+    Acumulador incremental de estatísticas de pacotes.
+
+    Recebe os pacotes em ordem de decodificação e guarda só contadores e o
+    segundo corrente de bitrate — o custo em memória não depende da duração.
+    """
+
+    def __init__(self, fps: float = None):
+        """
+        Args:
+            fps: FPS nominal (define o limiar de salto de timestamp).
+                 None = estimado pela média dos deltas de DTS.
+        """
+        self.fps = fps if fps and fps > 0 else None
+        self.pacotes = 0
+        self.bytes_total = 0
+
+        # GOP
+        self.keyframes = 0
+        self.ultimo_keyframe_pts: Optional[float] = None
+        self.soma_intervalo_gop = 0.0
+        self.max_intervalo_gop = 0.0
+        self.quadros_desde_keyframe = 0
+        self.soma_quadros_gop = 0
+        self.gops_completos = 0
+
+        # Reordenação (B-frames): pacote exibido antes de um já decodificado
+        self.max_pts: Optional[float] = None
+        self.reordenados = 0
+
+        # Bitrate por segundo (agrupado pelo DTS)
+        self.segundo_atual: Optional[int] = None
+        self.bytes_segundo = 0
+        self.segundos = 0
+        self.pico_bytes_segundo = 0
+
+        # Timestamps
+        self.ultimo_dts: Optional[float] = None
+        self.primeiro_dts: Optional[float] = None
+        self.dts_fora_ordem = 0
+        self.pts_ausentes = 0
+        self.saltos = 0
+        self.soma_deltas = 0.0
+        self.deltas = 0
+
+    def adicionar(self, pts: Optional[float], dts: Optional[float], tamanho: int, chave: bool) -> None:
+        """Processa um pacote (ordem de decodificação)."""
+        self.pacotes += 1
+        self.bytes_total += tamanho
+
+        if pts is None:
+            self.pts_ausentes += 1
+        else:
+            if self.max_pts is not None and pts < self.max_pts:
+                self.reordenados += 1
+            if self.max_pts is None or pts > self.max_pts:
+                self.max_pts = pts
+
+        if chave:
+            self.keyframes += 1
+            if pts is not None and self.ultimo_keyframe_pts is not None:
+                intervalo = pts - self.ultimo_keyframe_pts
+                if intervalo > 0:
+                    self.soma_intervalo_gop += intervalo
+                    self.max_intervalo_gop = max(self.max_intervalo_gop, intervalo)
+                    self.soma_quadros_gop += self.quadros_desde_keyframe
+                    self.gops_completos += 1
+            if pts is not None:
+                self.ultimo_keyframe_pts = pts
+            self.quadros_desde_keyframe = 0
+        self.quadros_desde_keyframe += 1
+
+        tempo = dts if dts is not None else pts
+        if tempo is None:
+            return
+
+        if self.ultimo_dts is not None:
+            delta = tempo - self.ultimo_dts
+            if delta <= 0:
+                self.dts_fora_ordem += 1
+            else:
+                duracao_quadro = (1 / self.fps) if self.fps else (
+                    self.soma_deltas / self.deltas if self.deltas else None
+                )
+                if duracao_quadro and delta > duracao_quadro * FATOR_SALTO_TIMESTAMP:
+                    self.saltos += 1
+                else:
+                    self.soma_deltas += delta
+                    self.deltas += 1
+        else:
+            self.primeiro_dts = tempo
+        if self.ultimo_dts is None or tempo > self.ultimo_dts:
+            self.ultimo_dts = tempo
+
+        segundo = int(tempo - (self.primeiro_dts or 0))
+        if segundo != self.segundo_atual:
+            self._fechar_segundo()
+            self.segundo_atual = segundo
+        self.bytes_segundo += tamanho
+
+    def _fechar_segundo(self) -> None:
+        """Contabiliza o segundo corrente no pico de bitrate."""
+        if self.segundo_atual is not None:
+            self.segundos += 1
+            self.pico_bytes_segundo = max(self.pico_bytes_segundo, self.bytes_segundo)
+        self.bytes_segundo = 0
+
+    def resultado(self) -> Dict:
+        """
+        Consolida as estatísticas.
+
+        Returns:
+            dict com pacotes, keyframes, gop_medio_s, gop_max_s, gop_medio_quadros,
+            b_frames_pct, bitrate_medio_kbps, bitrate_pico_kbps, pico_media,
+            dts_fora_ordem, pts_ausentes, saltos_timestamp.
+        """
+        self._fechar_segundo()
+        self.segundo_atual = None
+
+        duracao = (
+            self.ultimo_dts - self.primeiro_dts
+            if self.ultimo_dts is not None and self.primeiro_dts is not None
+            else 0.0
+        )
+        # Último pacote ocupa um quadro a mais na linha do tempo
+        if self.deltas:
+            duracao += self.soma_deltas / self.deltas
+
+        medio_kbps = self.bytes_total * 8 / duracao / 1000 if duracao > 0 else 0.0
+        pico_kbps = self.pico_bytes_segundo * 8 / 1000
+
+        return {
+            "pacotes": self.pacotes,
+            "keyframes": self.keyframes,
+            "gop_medio_s": (
+                round(self.soma_intervalo_gop / self.gops_completos, 3) if self.gops_completos else None
+            ),
+            "gop_max_s": round(self.max_intervalo_gop, 3) if self.gops_completos else None,
+            "gop_medio_quadros": (
+                round(self.soma_quadros_gop / self.gops_completos, 1) if self.gops_completos else None
+            ),
+            "b_frames_pct": round(self.reordenados / self.pacotes * 100, 1) if self.pacotes else 0.0,
+            "bitrate_medio_kbps": round(medio_kbps),
+            "bitrate_pico_kbps": round(pico_kbps),
+            "pico_media": round(pico_kbps / medio_kbps, 2) if medio_kbps else None,
+            "dts_fora_ordem": self.dts_fora_ordem,
+            "pts_ausentes": self.pts_ausentes,
+            "saltos_timestamp": self.saltos,
+        }
+
+
+def analisar_pacotes(arquivo: Path, fps: float = None) -> Optional[Dict]:
+    """
+    Lê os pacotes do primeiro stream de vídeo e calcula GOP/B-frames/bitrate.
+
+    Só demux — nenhum quadro é decodificado. A saída do ffprobe é consumida
+    em fluxo pelo EstatisticasPacotes.
+
+    Args:
+        arquivo: Caminho do vídeo.
+        fps: FPS nominal do stream (melhora a detecção de saltos).
+
+    Returns:
+        dict de EstatisticasPacotes.resultado() ou None se o ffprobe falhar.
+    """
+    comando = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,dts_time,size,flags",
+        "-of", "compact=p=0",
+        str(arquivo),
+    ]
+    estatisticas = EstatisticasPacotes(fps)
+    try:
+        processo = subprocess.Popen(
+            comando, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, bufsize=1024 * 1024,
+        )
+    except OSError:
+        return None
+
+    try:
+        for linha in processo.stdout:
+            # Formato: pts_time=1.001|dts_time=0.967|size=1234|flags=K__
+            campos = dict(
+                parte.split("=", 1) for parte in linha.rstrip("\n").split("|") if "=" in parte
+            )
+            tamanho = campos.get("size", "")
+            if not tamanho.isdigit():
+                continue
+            estatisticas.adicionar(
+                _para_float(campos.get("pts_time")),
+                _para_float(campos.get("dts_time")),
+                int(tamanho),
+                campos.get("flags", "").startswith("K"),
+            )
+        processo.wait()
+    finally:
+        if processo.poll() is None:
+            processo.kill()
+            processo.wait()
+
+    if processo.returncode != 0 or estatisticas.pacotes == 0:
+        return None
+    return estatisticas.resultado()
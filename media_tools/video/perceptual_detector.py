@@ -0,0 +1,216 @@
+"""
+Detector de vídeos quase duplicados (re-encodes, downscales e cortes).
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from ..common.grouping import agrupar_conectados
+from ..common.paths import obter_pastas_entrada_saida
+from ..common.scanner import mapear_paralelo, percorrer_arquivos
+from ..common.validators import verificar_ffmpeg
+from .fingerprint import (
+    IndiceLSH,
+    MIN_FRACAO_SIMILAR,
+    MIN_PONTOS_SOBREPOSTOS,
+    GRADE_S,
+    assinatura_video,
+    comparar_alinhado,
+    confirmar_copia_integral,
+    eh_copia_integral,
+)
+
+
+def _formatar_mb(bytes_: int) -> str:
+    return f"{bytes_ / (1024 * 1024):.1f} MB"
+
+
+class DetectorDuplicatasPerceptuais:
+    """
+    Encontra o mesmo conteúdo em arquivos diferentes (H.264 1080p vs HEVC 720p,
+    cópia cortada, etc.) por assinatura perceptual de keyframes.
+
+    Candidatos saem de um índice LSH — não há comparação de todos os pares.
+    """
+
+    EXTENSOES_VALIDAS = {".mp4", ".m4v", ".mov", ".webm", ".avi", ".mkv"}
+
+    def __init__(
+        self,
+        pasta_origem: Path = None,
+        remover_automaticamente: bool = False,
+        workers: int = None,
+    ):
+        """
+        Inicializa o detector.
+
+        Args:
+            pasta_origem: Pasta com vídeos para verificar (None = padrão, inclui subpastas).
+            remover_automaticamente: Se True, remove cópias integrais (mantém a de
+                                     maior resolução). Trechos nunca são removidos.
+            workers: Decodificações simultâneas (None = metade dos cores).
+        """
+        if pasta_origem is None:
+            entrada, _ = obter_pastas_entrada_saida("videos")
+            self.pasta_origem = entrada
+        else:
+            self.pasta_origem = pasta_origem
+
+        self.remover_automaticamente = remover_automaticamente
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+
+    def _extrair_assinaturas(self, arquivos: List[Path]) -> Tuple[List[Path], List[Dict]]:
+        """Extrai as assinaturas em paralelo, mostrando o progresso."""
+        caminhos: List[Path] = []
+        assinaturas: List[Dict] = []
+        falhas = 0
+        for concluidos, (arquivo, assinatura) in enumerate(
+            mapear_paralelo(assinatura_video, arquivos, self.workers), 1
+        ):
+            if assinatura is None:
+                falhas += 1
+            else:
+                caminhos.append(arquivo)
+                assinaturas.append(assinatura)
+            print(f"\r   {concluidos}/{len(arquivos)} assinaturas", end="", flush=True)
+        print(f"\r   ✅ {len(assinaturas)} assinaturas ({falhas} falha(s)){'':20}")
+        return caminhos, assinaturas
+
+    def _verificar_candidatos(self, indice: IndiceLSH, assinaturas: List[Dict]) -> List[Tuple]:
+        """
+        Confirma os pares do LSH alinhando as sequências inteiras.
+
+        Returns:
+            Lista de (id_a, id_b, fracao, sobrepostos, deslocamento).
+        """
+        confirmados = []
+        for id_a, id_b, deslocamentos in indice.candidatos():
+            melhor = None
+            for deslocamento in deslocamentos:
+                fracao, sobrepostos = comparar_alinhado(
+                    assinaturas[id_a], assinaturas[id_b], deslocamento
+                )
+                if sobrepostos >= MIN_PONTOS_SOBREPOSTOS and fracao >= MIN_FRACAO_SIMILAR:
+                    if melhor is None or (fracao, sobrepostos) > melhor[:2]:
+                        melhor = (fracao, sobrepostos, deslocamento)
+            if melhor:
+                confirmados.append((id_a, id_b) + melhor)
+        return confirmados
+
+    def processar(self) -> dict:
+        """
+        Processa e detecta duplicatas perceptuais.
+
+        Returns:
+            dict: Estatísticas do processamento.
+        """
+        vazio = {"duplicatas": 0, "trechos": 0, "removidos": 0}
+        if not verificar_ffmpeg():
+            return vazio
+
+        pasta_origem = Path(self.pasta_origem).resolve()
+        if not pasta_origem.exists():
+            print(f"❌ Erro: Pasta não encontrada: {pasta_origem}")
+            return vazio
+
+        arquivos = list(percorrer_arquivos(pasta_origem, self.EXTENSOES_VALIDAS))
+        if len(arquivos) < 2:
+            print("ℹ️  É necessário pelo menos 2 vídeos para detectar duplicatas.")
+            return vazio
+
+        print(f"🚀 Analisando {len(arquivos)} vídeo(s) por assinatura perceptual...")
+        print(f"   (Keyframes em 9x8, dHash a cada {GRADE_S:.0f}s, {self.workers} workers)")
+        print("-" * 60)
+
+        caminhos, assinaturas = self._extrair_assinaturas(arquivos)
+
+        indice = IndiceLSH()
+        for id_video, assinatura in enumerate(assinaturas):
+            indice.adicionar(id_video, assinatura)
+        confirmados = self._verificar_candidatos(indice, assinaturas)
+
+        integrais = []
+        trechos = []
+        for par in confirmados:
+            a, b, _, _, desloc = par
+            if eh_copia_integral(assinaturas[a], assinaturas[b], desloc):
+                integrais.append((a, b))
+            else:
+                trechos.append(par)
+
+        duplicatas_encontradas = 0
+        removidos = 0
+
+        print("\n📊 Analisando resultados...")
+        print("-" * 60)
+
+        for grupo in agrupar_conectados(integrais):
+            # Mantém a maior resolução; empate → maior arquivo
+            grupo.sort(
+                key=lambda i: (
+                    assinaturas[i]["largura"] * assinaturas[i]["altura"],
+                    assinaturas[i]["tamanho"],
+                ),
+                reverse=True,
+            )
+            original = grupo[0]
+
+            # O agrupamento é transitivo: só é duplicata quem bate com o mantido
+            duplicados, parecidos = [], []
+            for membro in grupo[1:]:
+                if confirmar_copia_integral(assinaturas[original], assinaturas[membro]):
+                    duplicados.append(membro)
+                else:
+                    parecidos.append(membro)
+            duplicatas_encontradas += len(duplicados)
+
+            info = assinaturas[original]
+            print(f"\n🔍 Mesmo conteúdo ({len(grupo)} arquivos):")
+            print(
+                f"   ✅ Mantido: {caminhos[original].name} "
+                f"({info['largura']}x{info['altura']}, {_formatar_mb(info['tamanho'])})"
+            )
+            for dup in duplicados:
+                info_dup = assinaturas[dup]
+                print(
+                    f"   ❌ Duplicata: {caminhos[dup].name} "
+                    f"({info_dup['largura']}x{info_dup['altura']}, {_formatar_mb(info_dup['tamanho'])})"
+                )
+                if self.remover_automaticamente:
+                    try:
+                        caminhos[dup].unlink()
+                        print(f"      🗑️  Removido")
+                        removidos += 1
+                    except Exception as e:
+                        print(f"      ⚠️  Erro ao remover: {e}")
+            for parecido in parecidos:
+                info_par = assinaturas[parecido]
+                print(
+                    f"   ≈ Parecido (longe do mantido, não removido): {caminhos[parecido].name} "
+                    f"({info_par['largura']}x{info_par['altura']}, {_formatar_mb(info_par['tamanho'])})"
+                )
+
+        if trechos:
+            print(f"\n✂️  Trechos em comum (cortes — nunca removidos automaticamente):")
+            for a, b, fracao, sobrepostos, desloc in trechos:
+                # b[j] ~ a[j + desloc]: desloc > 0 → b começa depois do início de a
+                inicio = abs(desloc) * GRADE_S
+                contido, base = (b, a) if desloc >= 0 else (a, b)
+                print(
+                    f"   🔗 {caminhos[contido].name} ⊂ {caminhos[base].name} "
+                    f"a partir de {inicio:.0f}s (~{sobrepostos * GRADE_S:.0f}s, {fracao:.0%} similar)"
+                )
+
+        print("\n" + "=" * 60)
+        print("📊 RESUMO")
+        print("-" * 60)
+        print(f"🔍 Duplicatas perceptuais: {duplicatas_encontradas}")
+        print(f"✂️  Trechos em comum: {len(trechos)}")
+        if self.remover_automaticamente:
+            print(f"🗑️  Arquivos removidos: {removidos}")
+        else:
+            print("💡 Use --remover para remover duplicatas automaticamente")
+        print("-" * 60)
+
+        return {"duplicatas": duplicatas_encontradas, "trechos": len(trechos), "removidos": removidos}
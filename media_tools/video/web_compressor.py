@@ -6,10 +6,12 @@ Produz MP4 compatível com players web, permitindo seek antes do download comple
 import json
 import os
 import re
+import shutil
 import subprocess
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 
 from ..common.paths import criar_pastas, obter_pastas_entrada_saida
 from ..common.progress import ProgressBar
@@ -18,14 +20,19 @@ from ..common.resource_control import (
     usar_aceleracao_hardware,
     obter_cores_fisicos,
     obter_cores_encoder,
+    obter_workers_io,
     definir_prioridade_processo,
 )
+from .mp4_parser import analisar_mp4
 
 
 class CompressorWebVideo:
     """
     Converte vídeos para H.264 + faststart, otimizado para streaming web.
     Suporta seek antes do download completo (moov atom no início do arquivo).
+
+    Arquivos já em H.264 Main/High + AAC não são re-encodados: a triagem lê
+    o layout MP4 e, se só falta o moov no início, faz apenas remux em copy mode.
     """
 
     EXTENSOES_VALIDAS = {
@@ -37,6 +44,25 @@ class CompressorWebVideo:
     # Encoders H.264 GPU (em ordem de preferência AMD → NVIDIA → Intel)
     GPU_ENCODERS = ["h264_amf", "h264_nvenc", "h264_qsv", "h264_videotoolbox"]
 
+    # Contêineres ISO BMFF que podem ir direto para remux (sem re-encode)
+    EXTENSOES_REMUX = {".mp4", ".m4v", ".mov"}
+    # Perfis H.264 aceitos como web-ready: Main (77) e High (100)
+    PERFIS_WEB = {77, 100}
+    # Nível máximo aceito sem re-encode — 4.2 cobre 1080p60 em qualquer browser/TV
+    NIVEL_WEB_MAXIMO = 42
+
+    # Escada ABR: (lado curto, kbps de vídeo a 30fps). Só entram degraus ≤ fonte.
+    LADDER_ABR = [
+        (2160, 14000),
+        (1440, 8000),
+        (1080, 5000),
+        (720, 2800),
+        (480, 1400),
+        (360, 800),
+    ]
+    # Acima de 30fps o mesmo degrau precisa de mais bits para a mesma qualidade
+    ABR_FATOR_FPS_ALTO = 1.5
+
     def __init__(
         self,
         pasta_entrada: Path = None,
@@ -44,7 +70,21 @@ class CompressorWebVideo:
         crf: str = "22",
         preset: str = "medium",
         audio_bitrate: str = "192k",
+        abr: bool = False,
+        segmento_s: int = 6,
     ):
+        """
+        Inicializa o compressor web.
+
+        Args:
+            pasta_entrada: Pasta de entrada (None = padrão).
+            pasta_saida: Pasta de saída (None = padrão).
+            crf: Qualidade CRF do libx264.
+            preset: Preset de velocidade do libx264.
+            audio_bitrate: Bitrate do áudio AAC.
+            abr: Se True, gera escada HLS (fMP4/CMAF) em vez de um MP4 único.
+            segmento_s: Duração dos segmentos HLS em segundos (modo ABR).
+        """
         if pasta_entrada is None or pasta_saida is None:
             entrada, saida = obter_pastas_entrada_saida("videos")
             self.pasta_entrada = pasta_entrada or entrada
@@ -56,6 +96,8 @@ class CompressorWebVideo:
         self.crf = crf
         self.preset = preset
         self.audio_bitrate = audio_bitrate
+        self.abr = abr
+        self.segmento_s = max(1, int(segmento_s))
 
         env_device = os.getenv("GPU_DEVICE", "").strip()
         self.gpu_device_idx = int(env_device) if env_device.isdigit() else 0
@@ -115,7 +157,8 @@ class CompressorWebVideo:
 
             info: Dict = {
                 "codec": None, "audio_codec": None,
-                "width": None, "height": None,
+                "width": None, "height": None, "fps": None,
+                "bitrate_total": None,
                 "duracao": None, "tamanho": None,
             }
 
@@ -127,6 +170,11 @@ class CompressorWebVideo:
                 info["codec"] = video_stream.get("codec_name", "unknown")
                 info["width"] = video_stream.get("width", 0)
                 info["height"] = video_stream.get("height", 0)
+                r_frame_rate = video_stream.get("r_frame_rate", "")
+                if r_frame_rate and "/" in r_frame_rate:
+                    num, den = map(int, r_frame_rate.split("/"))
+                    if den > 0:
+                        info["fps"] = round(num / den, 2)
 
             if audio_stream:
                 info["audio_codec"] = audio_stream.get("codec_name")
@@ -135,11 +183,14 @@ class CompressorWebVideo:
                 fmt = data["format"]
                 info["duracao"] = float(fmt.get("duration", 0))
                 info["tamanho"] = int(fmt.get("size", 0))
+                if fmt.get("bit_rate"):
+                    info["bitrate_total"] = int(fmt["bit_rate"]) / 1000  # kbps
 
             return info
         except Exception:
             return {"codec": "unknown", "audio_codec": None, "width": 0,
-                    "height": 0, "duracao": 0, "tamanho": 0}
+                    "height": 0, "fps": None, "bitrate_total": None,
+                    "duracao": 0, "tamanho": 0}
 
     def _converter_tempo_para_segundos(self, tempo_str: str) -> float:
         try:
@@ -221,6 +272,20 @@ class CompressorWebVideo:
 
         comando.extend(["-progress", "pipe:1", str(arquivo_saida)])
 
+        return self._executar_ffmpeg(comando, duracao_total, f"🌐 {arquivo_entrada.name[:20]}...")
+
+    def _executar_ffmpeg(self, comando: list, duracao_total: float, desc: str) -> tuple:
+        """
+        Executa o FFmpeg (comando já com -progress pipe:1) exibindo barra de progresso.
+
+        Args:
+            comando: Linha de comando completa do FFmpeg.
+            duracao_total: Duração do vídeo em segundos (escala da barra).
+            desc: Descrição exibida na barra.
+
+        Returns:
+            (bool, Optional[str]): (sucesso, mensagem_erro)
+        """
         regex_tempo = re.compile(r"out_time=(\d{2}:\d{2}:\d{2}\.\d+)")
         stderr_output: list = []
         stderr_lock = threading.Lock()
@@ -247,10 +312,7 @@ class CompressorWebVideo:
             stderr_thread.start()
 
             total = max(int(duracao_total), 1)
-            with ProgressBar(
-                total=total, unit="s",
-                desc=f"🌐 {arquivo_entrada.name[:20]}...",
-            ).context() as pbar:
+            with ProgressBar(total=total, unit="s", desc=desc).context() as pbar:
                 tempo_anterior = 0.0
                 while True:
                     linha = processo.stdout.readline()
@@ -313,6 +375,230 @@ class CompressorWebVideo:
                         return False, f"Erro FFmpeg: {linhas_erro[-1][:200]}"
             return False, f"Erro ao executar FFmpeg: {str(e)}"
 
+    def _escolher_degraus(self, info: Dict) -> list:
+        """
+        Escolhe os degraus da escada ABR a partir da resolução e FPS da fonte.
+
+        Fontes maiores ganham mais degraus (1080p → 1080/720/480; 4K → 2160…480);
+        o bitrate de cada degrau nunca passa do bitrate da fonte escalado pela área.
+
+        Returns:
+            Lista de (lado_curto, video_kbps), do maior para o menor.
+        """
+        largura = info.get("width") or 0
+        altura = info.get("height") or 0
+        if not largura or not altura:
+            return []
+
+        lado_curto = min(largura, altura)
+        quantidade = 1 + sum(1 for limite in (480, 720, 1440, 2160) if lado_curto >= limite)
+        candidatos = [d for d in self.LADDER_ABR if d[0] <= lado_curto][:quantidade]
+        if not candidatos:
+            # Fonte menor que o menor degrau: um único degrau na resolução original
+            base_lado, base_kbps = self.LADDER_ABR[-1]
+            candidatos = [(lado_curto - lado_curto % 2, int(base_kbps * (lado_curto / base_lado) ** 2))]
+
+        fator_fps = self.ABR_FATOR_FPS_ALTO if (info.get("fps") or 0) > 30 else 1.0
+        fonte_kbps = info.get("bitrate_total") or 0
+
+        degraus = []
+        for lado, kbps in candidatos:
+            kbps = int(kbps * fator_fps)
+            if fonte_kbps:
+                # Não gasta mais bits que a fonte tinha para a mesma área
+                kbps = min(kbps, int(fonte_kbps * (lado / lado_curto) ** 2))
+            degraus.append((lado, max(kbps, 200)))
+        return degraus
+
+    def _gerar_abr(self, arquivo_entrada: Path, pasta_destino: Path, info: Dict) -> tuple:
+        """
+        Gera a escada HLS com um único decode: split → N scales → N encodes
+        libx264 com GOP fixo e alinhado à duração do segmento, empacotados
+        como fMP4/CMAF com master playlist.
+
+        Sempre usa libx264: o controle de taxa por rendição e o alinhamento
+        de keyframes precisam ser idênticos em todos os degraus.
+
+        Returns:
+            (bool, Optional[str]): (sucesso, mensagem_erro)
+        """
+        degraus = self._escolher_degraus(info)
+        if not degraus:
+            return False, "Resolução da fonte desconhecida"
+
+        portrait = (info.get("height") or 0) > (info.get("width") or 0)
+        fps = info.get("fps") or 30
+        gop = max(1, round(fps * self.segmento_s))
+        n = len(degraus)
+
+        # Um decode, N saídas escaladas
+        filtros = [f"[0:v]split={n}" + "".join(f"[s{i}]" for i in range(n))]
+        for i, (lado, _) in enumerate(degraus):
+            escala = f"scale={lado}:-2" if portrait else f"scale=-2:{lado}"
+            filtros.append(f"[s{i}]{escala}[v{i}]")
+
+        comando = ["ffmpeg", "-y", "-i", str(arquivo_entrada),
+                   "-filter_complex", ";".join(filtros)]
+
+        tem_audio = bool(info.get("audio_codec"))
+        mapa_variantes = []
+        for i, (lado, kbps) in enumerate(degraus):
+            comando.extend([
+                "-map", f"[v{i}]",
+                f"-c:v:{i}", "libx264",
+                f"-b:v:{i}", f"{kbps}k",
+                f"-maxrate:v:{i}", f"{int(kbps * 1.07)}k",
+                f"-bufsize:v:{i}", f"{int(kbps * 1.5)}k",
+            ])
+            variante = f"v:{i}"
+            if tem_audio:
+                comando.extend(["-map", "0:a:0"])
+                variante += f",a:{i}"
+            mapa_variantes.append(f"{variante},name:{lado}p")
+
+        comando.extend([
+            "-preset", self.preset,
+            "-threads", str(self.cores_encoder),
+            "-pix_fmt", "yuv420p",
+            # GOP fechado e fixo: todo segmento começa em keyframe em todos os degraus
+            "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+            "-force_key_frames", f"expr:gte(t,n_forced*{self.segmento_s})",
+        ])
+        if tem_audio:
+            comando.extend(["-c:a", "aac", "-b:a", self.audio_bitrate, "-ac", "2"])
+
+        comando.extend([
+            "-f", "hls",
+            "-hls_time", str(self.segmento_s),
+            "-hls_playlist_type", "vod",
+            "-hls_segment_type", "fmp4",
+            "-hls_fmp4_init_filename", "init.mp4",
+            "-hls_flags", "independent_segments",
+            "-master_pl_name", "master.m3u8",
+            "-hls_segment_filename", str(pasta_destino / "%v" / "seg_%05d.m4s"),
+            "-var_stream_map", " ".join(mapa_variantes),
+            "-progress", "pipe:1",
+            str(pasta_destino / "%v" / "index.m3u8"),
+        ])
+
+        return self._executar_ffmpeg(
+            comando, info.get("duracao") or 0, f"📶 {arquivo_entrada.name[:20]}..."
+        )
+
+    def _processar_abr(self, arquivos: list, pasta_saida: Path, deletar_originais: bool) -> dict:
+        """
+        Gera uma pasta HLS (master.m3u8 + um subdiretório por degrau) por vídeo.
+
+        Returns:
+            dict: Estatísticas do processamento.
+        """
+        sucessos = 0
+        falhas = 0
+        pulados = 0
+
+        for i, arquivo_origem in enumerate(arquivos, 1):
+            pasta_destino = pasta_saida / arquivo_origem.stem
+            master = pasta_destino / "master.m3u8"
+
+            if master.exists():
+                print(f"\n[{i}/{len(arquivos)}] ⏭️  {arquivo_origem.name} — escada já gerada, pulando")
+                pulados += 1
+                continue
+
+            info = self._obter_info_video(arquivo_origem)
+            degraus = self._escolher_degraus(info)
+            resolucao = f"{info['width']}x{info['height']}" if info.get("width") else "?"
+            print(f"\n[{i}/{len(arquivos)}] 📹 {arquivo_origem.name} ({resolucao})")
+            print("   Degraus: " + " | ".join(f"{lado}p@{kbps}k" for lado, kbps in degraus))
+
+            pasta_destino.mkdir(parents=True, exist_ok=True)
+            sucesso, erro = self._gerar_abr(arquivo_origem, pasta_destino, info)
+
+            if sucesso and master.exists():
+                print(f"   ✅ HLS gerado: {master}")
+                if deletar_originais:
+                    try:
+                        arquivo_origem.unlink()
+                        print("   🗑️  Original removido.")
+                    except OSError:
+                        pass
+                sucessos += 1
+            else:
+                # Remove escada incompleta para o resume não considerá-la pronta
+                shutil.rmtree(pasta_destino, ignore_errors=True)
+                print(f"   ❌ Erro: {erro}")
+                falhas += 1
+
+        print("\n" + "=" * 60)
+        print(f"✅ Escadas ABR concluídas!")
+        print(f"   Sucessos: {sucessos} | Falhas: {falhas} | Pulados: {pulados}")
+
+        return {"sucessos": sucessos, "falhas": falhas, "pulados": pulados}
+
+    def _avaliar_web_ready(self, arquivo: Path) -> Tuple[str, Optional[Dict]]:
+        """
+        Classifica o arquivo lendo apenas o layout de boxes MP4 (sem ffprobe).
+
+        Returns:
+            ('pronto' | 'remux' | 'converter', info_mp4): 'pronto' = já tem moov
+            no início; 'remux' = compatível, só falta mover o moov.
+        """
+        if arquivo.suffix.lower() not in self.EXTENSOES_REMUX:
+            return "converter", None
+
+        info = analisar_mp4(arquivo)
+        if not info or info["fragmentado"]:
+            return "converter", info
+
+        video_ok = (
+            info["video_codec"] in ("avc1", "avc3")
+            and info["perfil"] in self.PERFIS_WEB
+            and (info["nivel"] or 0) <= self.NIVEL_WEB_MAXIMO
+        )
+        # Sem áudio também é web-ready; com áudio, todas as faixas precisam ser AAC
+        audio_ok = info["faixas_audio"] == 0 or info["audio_aac"]
+        if not (video_ok and audio_ok):
+            return "converter", info
+
+        return ("pronto" if info["moov_no_inicio"] else "remux"), info
+
+    def _remuxar_faststart(self, arquivo_entrada: Path, arquivo_saida: Path) -> Tuple[bool, Optional[str]]:
+        """
+        Reempacota em copy mode movendo o moov atom para o início (sem re-encode).
+        Escreve em arquivo temporário e renomeia — nunca deixa saída parcial.
+
+        Returns:
+            (bool, Optional[str]): (sucesso, mensagem_erro)
+        """
+        temporario = arquivo_saida.with_name(arquivo_saida.stem + ".remux.tmp")
+        comando = [
+            "ffmpeg", "-y", "-v", "error",
+            "-i", str(arquivo_entrada),
+            "-map", "0:v:0", "-map", "0:a?",
+            "-c", "copy",
+            "-map_metadata", "0",
+            "-movflags", "+faststart",
+            "-f", "mp4", str(temporario),
+        ]
+        try:
+            resultado = subprocess.run(
+                comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+            )
+            if resultado.returncode == 0 and temporario.exists():
+                os.replace(temporario, arquivo_saida)
+                return True, None
+            linhas = [l.strip() for l in resultado.stderr.split("\n") if l.strip()]
+            return False, linhas[-1][:200] if linhas else f"FFmpeg retornou código {resultado.returncode}"
+        except Exception as e:
+            return False, f"Erro ao executar FFmpeg: {str(e)}"
+        finally:
+            if temporario.exists():
+                try:
+                    temporario.unlink()
+                except OSError:
+                    pass
+
     def processar(self, deletar_originais: bool = True) -> dict:
         """
         Converte todos os vídeos da pasta de entrada para H.264 web-otimizado.
@@ -356,20 +642,100 @@ class CompressorWebVideo:
         print(f"🔧 Encoder: {encoder_info}")
         print("-" * 60)
 
+        if self.abr:
+            print(f"📶 Modo ABR: HLS fMP4/CMAF, segmentos de {self.segmento_s}s (libx264)")
+            return self._processar_abr(arquivos, pasta_saida, deletar_originais)
+
         sucessos = 0
         falhas = 0
         pulados = 0
+        remuxados = 0
         total_original_mb = 0.0
         total_novo_mb = 0.0
 
-        for i, arquivo_origem in enumerate(arquivos, 1):
-            arquivo_destino = pasta_saida / (arquivo_origem.stem + ".mp4")
+        # ── PASSO 1: triagem paralela — lê só os boxes MP4 ─────────────────────
+        prontos = []
+        remux = []
+        converter = []
 
+        def _triar(arquivo_origem):
+            arquivo_destino = pasta_saida / (arquivo_origem.stem + ".mp4")
             # Resume: pula arquivos já convertidos
             if arquivo_destino.exists() and arquivo_destino.stat().st_size > 0:
-                print(f"\n[{i}/{len(arquivos)}] ⏭️  {arquivo_origem.name} — já convertido, pulando")
-                pulados += 1
-                continue
+                return "convertido", arquivo_origem, None
+            classe, info = self._avaliar_web_ready(arquivo_origem)
+            return classe, arquivo_origem, info
+
+        workers = obter_workers_io()
+        print(f"\n⚡ Passo 1/3 — triagem paralela ({len(arquivos)} arquivos, {workers} workers)...")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for fut in as_completed([pool.submit(_triar, a) for a in arquivos]):
+                classe, arquivo, info = fut.result()
+                if classe == "convertido":
+                    print(f"   ⏭️  {arquivo.name} — já convertido, pulando")
+                    pulados += 1
+                elif classe == "pronto":
+                    prontos.append(arquivo)
+                elif classe == "remux":
+                    remux.append(arquivo)
+                else:
+                    converter.append(arquivo)
+
+        # Restaura a ordem original (por tamanho) para o encode
+        ordem = {a: i for i, a in enumerate(arquivos)}
+        converter.sort(key=lambda a: ordem[a])
+        print(
+            f"   ✅ {len(prontos)} já web-ready, {len(remux)} só remux (faststart), "
+            f"{len(converter)} para converter"
+        )
+
+        # Já tem moov no início e codecs compatíveis — apenas entrega na saída
+        for arquivo_origem in prontos:
+            arquivo_destino = pasta_saida / (arquivo_origem.stem + ".mp4")
+            tamanho_mb = arquivo_origem.stat().st_size / (1024 * 1024)
+            if deletar_originais:
+                shutil.move(str(arquivo_origem), str(arquivo_destino))
+            else:
+                shutil.copy2(str(arquivo_origem), str(arquivo_destino))
+            print(f"   ⏩ {arquivo_origem.name} ({tamanho_mb:.1f}MB) — já web-ready")
+            pulados += 1
+
+        # ── PASSO 2: remux concorrente (puro I/O, sem decode) ─────────────────
+        if remux:
+            workers_remux = obter_workers_io()
+            print(f"\n📦 Passo 2/3 — remux faststart de {len(remux)} arquivo(s) ({workers_remux} workers)...")
+
+            def _remuxar(arquivo_origem):
+                arquivo_destino = pasta_saida / (arquivo_origem.stem + ".mp4")
+                sucesso, erro = self._remuxar_faststart(arquivo_origem, arquivo_destino)
+                return arquivo_origem, arquivo_destino, sucesso, erro
+
+            with ThreadPoolExecutor(max_workers=workers_remux) as pool:
+                for fut in as_completed([pool.submit(_remuxar, a) for a in remux]):
+                    arquivo_origem, arquivo_destino, sucesso, erro = fut.result()
+                    if not sucesso:
+                        # Remux falhou (stream atípico) — cai no encode normal
+                        print(f"   ⚠️  {arquivo_origem.name}: remux falhou ({erro}), será convertido")
+                        converter.append(arquivo_origem)
+                        continue
+                    tamanho_original = arquivo_origem.stat().st_size / (1024 * 1024)
+                    tamanho_novo = arquivo_destino.stat().st_size / (1024 * 1024)
+                    total_original_mb += tamanho_original
+                    total_novo_mb += tamanho_novo
+                    print(f"   ✅ {arquivo_origem.name} — moov movido para o início ({tamanho_novo:.2f}MB)")
+                    if deletar_originais:
+                        try:
+                            arquivo_origem.unlink()
+                        except OSError:
+                            pass
+                    remuxados += 1
+            converter.sort(key=lambda a: ordem[a])
+
+        if converter:
+            print(f"\n🎬 Passo 3/3 — encode H.264 de {len(converter)} arquivo(s)")
+
+        for i, arquivo_origem in enumerate(converter, 1):
+            arquivo_destino = pasta_saida / (arquivo_origem.stem + ".mp4")
 
             info = self._obter_info_video(arquivo_origem)
             duracao = info.get("duracao") or 0
@@ -377,7 +743,7 @@ class CompressorWebVideo:
             total_original_mb += tamanho_original
 
             resolucao = f"{info['width']}x{info['height']}" if info.get("width") else "?"
-            print(f"\n[{i}/{len(arquivos)}] 📹 {arquivo_origem.name}")
+            print(f"\n[{i}/{len(converter)}] 📹 {arquivo_origem.name}")
             print(f"   Antes: {resolucao} | {info['codec']} | {tamanho_original:.2f}MB")
 
             sucesso, erro = self._converter_video(arquivo_origem, arquivo_destino, duracao)
@@ -420,8 +786,8 @@ class CompressorWebVideo:
 
         print("\n" + "=" * 60)
         print(f"✅ Conversão web concluída!")
-        print(f"   Sucessos: {sucessos} | Falhas: {falhas} | Pulados: {pulados}")
-        if total_original_mb > 0 and sucessos > 0:
+        print(f"   Sucessos: {sucessos} | Remux: {remuxados} | Falhas: {falhas} | Pulados: {pulados}")
+        if total_original_mb > 0 and (sucessos > 0 or remuxados > 0):
             economizado_mb = total_original_mb - total_novo_mb
             reducao_total = 100 - (total_novo_mb / total_original_mb * 100)
             def fmt(mb):
@@ -431,4 +797,5 @@ class CompressorWebVideo:
             print(f"   🎉 Economizado:      {fmt(economizado_mb)} ({reducao_total:.1f}% menor)")
 
         return {"sucessos": sucessos, "falhas": falhas, "pulados": pulados,
+                "remuxados": remuxados,
                 "economizado_mb": round(total_original_mb - total_novo_mb, 2)}